@@ -0,0 +1,299 @@
+import argparse
+import json
+import math
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+# Association configuration (environment overrides)
+MIN_SUPPORT = float(os.environ.get("HEALTHAI_ASSOC_MIN_SUPPORT", 0.03))
+MIN_RULE_SUPPORT = float(os.environ.get("HEALTHAI_ASSOC_MIN_RULE_SUPPORT", 0.05))
+MIN_CONFIDENCE = float(os.environ.get("HEALTHAI_ASSOC_MIN_CONFIDENCE", 0.6))
+MIN_LIFT = float(os.environ.get("HEALTHAI_ASSOC_MIN_LIFT", 1.2))
+MAX_ANTECEDENTS = int(os.environ.get("HEALTHAI_ASSOC_MAX_ANTECEDENTS", 2))
+
+# Items from notebooks/4-medical_associations: comorbidity flags (the only
+# allowed rule consequents) and indicators derived from labs/demographics
+CONDITIONS = [
+    "diabetes_mellitus", "hypertension", "coronary_artery_disease",
+    "prior_cardiomyopathy", "chronic_kidney_disease",
+]
+INDICATORS = {
+    "glucose_high": lambda r: r["glucose_level"] >= 126,
+    "creatinine_high": lambda r: r["creatinine_level"] > 1.3,
+    "urea_high": lambda r: r["urea_level"] > 40,
+    "hb_low": lambda r: r["hemoglobin"] < 12,
+    "age_ge_60": lambda r: r["age"] >= 60,
+    "male": lambda r: r["gender"] == "M",
+}
+INDICATOR_SOURCES = ["glucose_level", "creatinine_level", "urea_level", "hemoglobin", "age", "gender"]
+
+# Binary columns of the dataset that are not diagnoses (see diagnosis_flags)
+LIFESTYLE = ["smoking_status", "alcohol_use"]
+
+# Antecedents are stored as uint64 item masks
+MAX_ITEMS = 64
+
+
+# Transactions
+def item_matrix(frame, conditions=CONDITIONS):
+    columns = {name: fn(frame) for name, fn in INDICATORS.items()}
+    columns.update({name: frame[name] != 0 for name in conditions})
+    items = list(columns)
+    return items, np.column_stack([np.asarray(columns[name], dtype=bool) for name in items])
+
+
+# One bit per transaction; AND of two Python ints and int.bit_count() run
+# as word-wise C loops (hardware popcount), with no per-row Python work.
+def to_bitsets(matrix):
+    packed = np.packbits(matrix, axis=0, bitorder="little")
+    return [int.from_bytes(packed[:, j].tobytes(), "little") for j in range(matrix.shape[1])]
+
+
+# Frequent Itemsets (Eclat)
+# Depth-first over items in ascending support order: each itemset carries
+# the bitset of transactions containing it, and an extension is only
+# explored if its AND still meets the support count (downward closure).
+def frequent_itemsets(bitsets, n_transactions, min_support=MIN_SUPPORT, max_len=None):
+    min_count = math.ceil(min_support * n_transactions - 1e-9)
+    counts = {}
+
+    def extend(prefix, candidates):
+        for i, (item, bits, count) in enumerate(candidates):
+            itemset = prefix + (item,)
+            counts[tuple(sorted(itemset))] = count
+            if max_len is not None and len(itemset) >= max_len:
+                continue
+
+            extensions = []
+            for other, other_bits, _ in candidates[i + 1:]:
+                joined = bits & other_bits
+                joined_count = joined.bit_count()
+                if joined_count >= min_count:
+                    extensions.append((other, joined, joined_count))
+            if extensions:
+                extend(itemset, extensions)
+
+    roots = [(item, bits, bits.bit_count()) for item, bits in enumerate(bitsets)]
+    roots = sorted((r for r in roots if r[2] >= min_count), key=lambda r: r[2])
+    extend((), roots)
+    return counts
+
+
+# Association Rules
+# Single-condition consequents and short antecedents, as in the notebook;
+# of the rules over the same itemset only the most confident one is kept.
+def mine_rules(counts, items, n_transactions, consequents=CONDITIONS,
+               min_rule_support=MIN_RULE_SUPPORT, min_confidence=MIN_CONFIDENCE,
+               min_lift=MIN_LIFT, max_antecedents=MAX_ANTECEDENTS):
+    allowed = {items.index(name) for name in consequents}
+    best = {}
+
+    for itemset, count in counts.items():
+        support = count / n_transactions
+        if len(itemset) < 2 or len(itemset) > max_antecedents + 1 or support < min_rule_support:
+            continue
+
+        for consequent in allowed.intersection(itemset):
+            antecedent = tuple(i for i in itemset if i != consequent)
+            confidence = count / counts[antecedent]
+            lift = confidence / (counts[(consequent,)] / n_transactions)
+            if confidence < min_confidence or lift < min_lift:
+                continue
+            if itemset not in best or confidence > best[itemset][2]:
+                best[itemset] = (antecedent, consequent, confidence, lift, support)
+
+    rules = sorted(best.values(), key=lambda r: (-r[3], -r[2]))
+    return [
+        {"antecedents": a, "consequent": c, "support": s, "confidence": conf, "lift": lift}
+        for a, c, conf, lift, s in rules
+    ]
+
+
+# Rules Index
+# Antecedents and consequents are item bitmasks, so "antecedent is a
+# subset of the patient's items" is one AND/compare over all rules.
+class RulesIndex:
+    def __init__(self, items, antecedents, consequents, support, confidence, lift, meta):
+        self.items = list(items)
+        self.positions = {name: i for i, name in enumerate(self.items)}
+        self.antecedents = np.asarray(antecedents, dtype=np.uint64)
+        self.consequents = np.asarray(consequents, dtype=np.intp)
+        self.consequent_masks = np.left_shift(np.uint64(1), self.consequents.astype(np.uint64))
+        self.support = np.asarray(support, dtype=np.float64)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+        self.lift = np.asarray(lift, dtype=np.float64)
+        self.meta = meta
+
+        # Response objects are built once, not per query
+        self.rules = [
+            {
+                "antecedents": self.names(int(mask)),
+                "consequent": self.items[c],
+                "support": round(float(s), 4),
+                "confidence": round(float(conf), 4),
+                "lift": round(float(lift), 4),
+            }
+            for mask, c, s, conf, lift in zip(
+                self.antecedents, self.consequents, self.support, self.confidence, self.lift
+            )
+        ]
+
+    @classmethod
+    def from_rules(cls, items, rules, meta):
+        if len(items) > MAX_ITEMS:
+            raise ValueError(f"at most {MAX_ITEMS} items are supported, got {len(items)}")
+        return cls(
+            items,
+            [sum(1 << i for i in r["antecedents"]) for r in rules],
+            [r["consequent"] for r in rules],
+            [r["support"] for r in rules],
+            [r["confidence"] for r in rules],
+            [r["lift"] for r in rules],
+            meta,
+        )
+
+    def names(self, mask):
+        return [name for i, name in enumerate(self.items) if mask >> i & 1]
+
+    def mask(self, items):
+        unknown = [name for name in items if name not in self.positions]
+        if unknown:
+            raise ValueError(f"unknown items {unknown}; expected any of {self.items}")
+        return np.uint64(sum(1 << self.positions[name] for name in set(items)))
+
+    # Condition names plus the indicators implied by raw measurements
+    def items_for(self, conditions=(), measurements=None):
+        self.mask(conditions)
+        items = set(conditions)
+        for name, fn in INDICATORS.items():
+            try:
+                if name in self.positions and fn(measurements or {}):
+                    items.add(name)
+            except (KeyError, TypeError):
+                continue
+        return sorted(items, key=self.positions.get)
+
+    def match(self, items, include_known=False, limit=None):
+        mask = self.mask(items)
+        hits = np.flatnonzero((self.antecedents & ~mask) == 0)
+        if not include_known:
+            hits = hits[(self.consequent_masks[hits] & mask) == 0]
+        if limit is not None:
+            hits = hits[:limit]
+        return [self.rules[i] for i in hits]
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                items=np.array(self.items),
+                antecedents=self.antecedents,
+                consequents=self.consequents,
+                support=self.support,
+                confidence=self.confidence,
+                lift=self.lift,
+                meta=np.array(json.dumps(self.meta)),
+            )
+
+
+def load_rules_index(path):
+    with np.load(path, allow_pickle=False) as data:
+        return RulesIndex(
+            data["items"].tolist(),
+            data["antecedents"],
+            data["consequents"],
+            data["support"],
+            data["confidence"],
+            data["lift"],
+            json.loads(data["meta"].item()),
+        )
+
+
+# Building (from the cleaned-data store, or cleaned_data.csv without one)
+def _read_cleaned(columns):
+    import data_store
+
+    try:
+        return data_store.load_cleaned(columns)
+    except data_store.StoreError:
+        import pandas as pd
+        return pd.read_csv(data_store.DATA_DIR / "cleaned_data.csv", usecols=columns)
+
+
+def load_transactions(conditions=CONDITIONS):
+    columns = INDICATOR_SOURCES + list(conditions)
+    return item_matrix(_read_cleaned(columns), conditions)
+
+
+# Every 0/1 diagnosis flag: the schema's binary columns minus the
+# letter-coded ones (gender, residence and admission type, which are never
+# 0 and would be in every transaction) and the lifestyle flags
+def diagnosis_flags():
+    import data_store
+
+    _, columns = data_store.derive_schema()
+    binary = {name: dtype for name, dtype in columns.items() if dtype == "int8" and name not in LIFESTYLE}
+    resolved = data_store.resolve_schema(binary, _read_cleaned(list(binary)))
+    return [name for name, dtype in resolved.items() if dtype == "int8"]
+
+
+def build_index(items, matrix, conditions=CONDITIONS, min_support=MIN_SUPPORT,
+                min_rule_support=MIN_RULE_SUPPORT, min_confidence=MIN_CONFIDENCE,
+                min_lift=MIN_LIFT, max_antecedents=MAX_ANTECEDENTS):
+    n = len(matrix)
+    counts = frequent_itemsets(to_bitsets(matrix), n, min_support, max_antecedents + 1)
+    rules = mine_rules(counts, items, n, conditions, min_rule_support, min_confidence,
+                       min_lift, max_antecedents)
+    meta = {
+        "transactions": n,
+        "frequent_itemsets": len(counts),
+        "min_support": min_support,
+        "min_rule_support": min_rule_support,
+        "min_confidence": min_confidence,
+        "min_lift": min_lift,
+        "max_antecedents": max_antecedents,
+    }
+    return RulesIndex.from_rules(items, rules, meta)
+
+
+# Command Line
+# python associations.py [--all-conditions]
+def main():
+    from loaders import registry
+
+    parser = argparse.ArgumentParser(description="Mine association rules into a rules index")
+    parser.add_argument("--min-support", type=float, default=MIN_SUPPORT)
+    parser.add_argument("--min-rule-support", type=float, default=MIN_RULE_SUPPORT)
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--min-lift", type=float, default=MIN_LIFT)
+    parser.add_argument("--max-antecedents", type=int, default=MAX_ANTECEDENTS)
+    parser.add_argument("--all-conditions", action="store_true",
+                        help="use every binary diagnosis flag, not just the notebook's five")
+    parser.add_argument("--output", default=str(registry.source_path("association_rules")))
+    args = parser.parse_args()
+
+    conditions = CONDITIONS
+    if args.all_conditions:
+        conditions = diagnosis_flags()
+
+    start = time.perf_counter()
+    items, matrix = load_transactions(conditions)
+    index = build_index(
+        items, matrix, conditions, args.min_support,
+        min_rule_support=args.min_rule_support, min_confidence=args.min_confidence,
+        min_lift=args.min_lift, max_antecedents=args.max_antecedents,
+    )
+    index.save(args.output)
+    print(f"{len(index.rules)} rules from {index.meta['frequent_itemsets']} frequent itemsets "
+          f"over {len(items)} items, {len(matrix)} transactions "
+          f"({time.perf_counter() - start:.2f} s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from features import LOS_FEATURES, RISK_FEATURES, SEGMENT_FEATURES, encode
+
+
+# Batch scoring configuration (environment overrides)
+CHUNK_ROWS = int(os.environ.get("HEALTHAI_SCORE_CHUNK_ROWS", 10_000))
+WORKERS = int(os.environ.get("HEALTHAI_SCORE_WORKERS", os.cpu_count() or 1))
+
+ROW = "row"
+CHECKPOINT = "checkpoint.json"
+
+# task: (model group, input columns, output columns and dtypes)
+TASKS = {
+    "risk": ("risk", RISK_FEATURES, {"risk_class": "Int64"}),
+    "los": ("los", LOS_FEATURES, {"length_of_stay": "float64"}),
+    "segment": ("segment", SEGMENT_FEATURES, {"cluster": "Int64"}),
+    "sentiment": ("sentiment", None, {"sentiment_label": "string", "sentiment_probability": "float64"}),
+}
+
+
+class ScoringError(ValueError):
+    pass
+
+
+# Chunked Readers
+# CSV, Excel, Parquet or a cleaned-data store directory (data_store.py),
+# only the needed columns, `chunk_rows` rows at a time. Chunk boundaries
+# depend only on the input, so chunk numbers identify work across runs.
+def _require(available, columns, path):
+    missing = [c for c in columns if c not in available]
+    if missing:
+        raise ScoringError(f"{Path(path).name} has no columns {missing}")
+
+
+def _read_csv(path, columns, chunk_rows):
+    header = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+    _require(header, columns, path)
+    with pd.read_csv(path, usecols=columns, chunksize=chunk_rows, encoding="utf-8-sig") as reader:
+        yield from reader
+
+
+def _read_parquet(path, columns, chunk_rows):
+    import pyarrow.parquet as pq
+
+    source = pq.ParquetFile(path)
+    _require(source.schema_arrow.names, columns, path)
+    for batch in source.iter_batches(batch_size=chunk_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+def _read_store(path, columns, chunk_rows):
+    import data_store
+
+    dataset = data_store.dataset(path)
+    _require(dataset.schema.names, columns, path)
+    for batch in dataset.to_batches(columns=columns, batch_size=chunk_rows):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def _read_xlsx(path, columns, chunk_rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        _require(header, columns, path)
+        positions = [header.index(c) for c in columns]
+
+        chunk = []
+        for row in rows:
+            chunk.append([row[i] if i < len(row) else None for i in positions])
+            if len(chunk) == chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+
+def input_columns(path):
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if path.is_dir():
+        import data_store
+        return data_store.dataset(path).schema.names
+    if suffix == ".csv":
+        return list(pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns)
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    if suffix in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True)
+        try:
+            return [c for c in next(workbook.active.iter_rows(values_only=True), ()) if c is not None]
+        finally:
+            workbook.close()
+    raise ScoringError(f"unsupported input {path.name} (expected .csv, .xlsx, .parquet or a store directory)")
+
+
+def read_chunks(path, columns, chunk_rows=CHUNK_ROWS):
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if path.is_dir():
+        reader = _read_store
+    elif suffix == ".csv":
+        reader = _read_csv
+    elif suffix == ".parquet":
+        reader = _read_parquet
+    elif suffix in (".xlsx", ".xlsm"):
+        reader = _read_xlsx
+    else:
+        raise ScoringError(f"unsupported input {path.name} (expected .csv, .xlsx, .parquet or a store directory)")
+    return reader(path, columns, chunk_rows)
+
+
+# Worker Processes
+# Spawned (no inherited TensorFlow state), each loading the task models
+# once. TensorFlow's intra-op threads are divided between the workers.
+def _init_worker(groups, tf_threads):
+    os.environ.setdefault("HEALTHAI_TF_INTRA_OP_THREADS", str(tf_threads))
+    from loaders import registry
+    registry.preload(groups, warmup=False)
+
+
+def score_chunk(tasks, offset, features, texts):
+    import inference
+
+    predictors = {
+        "risk": (inference.predict_risk_batch, "risk_class"),
+        "los": (inference.predict_los_batch, "length_of_stay"),
+        "segment": (inference.predict_segment_batch, "cluster"),
+    }
+
+    out = {}
+    for task in tasks:
+        if task == "sentiment":
+            results = inference.predict_sentiment_batch(texts)
+            out["sentiment_label"] = [r["label"] for r in results]
+            out["sentiment_probability"] = [r["probability"] for r in results]
+            continue
+
+        predict, key = predictors[task]
+        results = predict(features[task], offset)
+        out[key] = [r.get(key) for r in results]
+        out[f"{task}_error"] = [r.get("error") for r in results]
+    return out
+
+
+# Checkpoint
+# Finished chunks are written as numbered Parquet parts next to the output
+# (<output>.parts/) and recorded in checkpoint.json, replaced atomically
+# after each part, so a crashed run redoes at most the chunks in flight.
+def _fingerprint(path):
+    path = Path(path).resolve()
+    stat = (path / "manifest.json" if path.is_dir() else path).stat()
+    return {"input": str(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class Checkpoint:
+    def __init__(self, parts_dir, settings):
+        self.parts_dir = Path(parts_dir)
+        self.path = self.parts_dir / CHECKPOINT
+        self.settings = settings
+        self.done = {}
+
+    @classmethod
+    def open(cls, parts_dir, settings, restart=False):
+        checkpoint = cls(parts_dir, settings)
+        if restart and checkpoint.parts_dir.exists():
+            shutil.rmtree(checkpoint.parts_dir)
+        checkpoint.parts_dir.mkdir(parents=True, exist_ok=True)
+
+        if checkpoint.path.exists():
+            saved = json.loads(checkpoint.path.read_text())
+            if saved["settings"] != settings:
+                raise ScoringError(
+                    f"{checkpoint.path} belongs to a run with other input or settings; "
+                    "pass --restart to discard it"
+                )
+            checkpoint.done = {int(k): v for k, v in saved["done"].items()}
+        return checkpoint
+
+    def part(self, index):
+        return self.parts_dir / f"part-{index:06d}.parquet"
+
+    def complete(self, index, frame):
+        path = self.part(index)
+        tmp = path.with_suffix(".tmp")
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+        self.done[index] = len(frame)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"settings": self.settings, "done": self.done}))
+        os.replace(tmp, self.path)
+
+
+def result_frame(tasks, ids, offset, n, scores):
+    frame = pd.DataFrame({ROW: np.arange(offset, offset + n)})
+    if ids is not None:
+        frame[ids.name] = ids.to_numpy()
+    for task in tasks:
+        for column, dtype in TASKS[task][2].items():
+            frame[column] = pd.array(scores[column], dtype=dtype)
+        if task != "sentiment":
+            frame[f"{task}_error"] = pd.array(scores[f"{task}_error"], dtype="string")
+    return frame
+
+
+# Output
+# Parts are concatenated in input order into the CSV or Parquet output
+# (written to a temporary file first), then removed.
+def merge(checkpoint, output):
+    output = Path(output)
+    tmp = output.with_name(output.name + ".tmp")
+    parts = [checkpoint.part(i) for i in sorted(checkpoint.done)]
+
+    if output.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+
+        writer = None
+        for part in parts:
+            table = pq.read_table(part)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema, compression="zstd")
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    else:
+        with open(tmp, "w", newline="") as f:
+            for i, part in enumerate(parts):
+                pd.read_parquet(part).to_csv(f, header=i == 0, index=False)
+
+    os.replace(tmp, output)
+    shutil.rmtree(checkpoint.parts_dir)
+
+
+# Pipeline
+# The parent reads and encodes chunks and keeps at most two per worker in
+# flight; workers=0 scores in this process (no pool).
+def run(source, output, tasks, chunk_rows=CHUNK_ROWS, workers=WORKERS, id_column=None,
+        text_column="feedback", restart=False, log=None):
+    unknown = [t for t in tasks if t not in TASKS]
+    if unknown:
+        raise ScoringError(f"unknown tasks {unknown}; expected any of {list(TASKS)}")
+    if Path(output).suffix.lower() not in (".csv", ".parquet"):
+        raise ScoringError("output must be a .csv or .parquet file")
+
+    available = input_columns(source)
+    if id_column is None and "serial_no" in available:
+        id_column = "serial_no"
+    columns = sorted({c for t in tasks if TASKS[t][1] for c in TASKS[t][1]})
+    if "sentiment" in tasks:
+        columns.append(text_column)
+    if id_column:
+        columns.append(id_column)
+    _require(available, columns, source)
+
+    settings = {
+        **_fingerprint(source),
+        "tasks": list(tasks),
+        "chunk_rows": chunk_rows,
+        "id_column": id_column,
+        "text_column": text_column if "sentiment" in tasks else None,
+    }
+    checkpoint = Checkpoint.open(Path(str(output) + ".parts"), settings, restart)
+    resumed = len(checkpoint.done)
+
+    stats = {"rows": sum(checkpoint.done.values()), "rows_scored": 0, "chunks": resumed,
+             "resumed_chunks": resumed, "errors": {t: 0 for t in tasks if t != "sentiment"}}
+    start = time.perf_counter()
+
+    def finished(index, offset, ids, n, scores):
+        checkpoint.complete(index, result_frame(tasks, ids, offset, n, scores))
+        for task in stats["errors"]:
+            stats["errors"][task] += sum(e is not None for e in scores[f"{task}_error"])
+        stats["rows"] += n
+        stats["rows_scored"] += n
+        stats["chunks"] += 1
+        if log:
+            rate = stats["rows_scored"] / (time.perf_counter() - start)
+            log(f"chunk {index}: {stats['rows']} rows done, {rate:,.0f} rows/s")
+
+    def chunks():
+        offset = 0
+        for index, frame in enumerate(read_chunks(source, columns, chunk_rows)):
+            n = len(frame)
+            if index not in checkpoint.done:
+                features = {t: encode(frame, TASKS[t][1]) for t in tasks if TASKS[t][1]}
+                texts = (
+                    frame[text_column].fillna("").astype(str).tolist() if "sentiment" in tasks else None
+                )
+                ids = frame[id_column] if id_column else None
+                yield index, offset, ids, n, features, texts
+            offset += n
+
+    groups = sorted({TASKS[t][0] for t in tasks})
+    if workers <= 0:
+        _init_worker(groups, os.cpu_count() or 1)
+        for index, offset, ids, n, features, texts in chunks():
+            finished(index, offset, ids, n, score_chunk(tasks, offset, features, texts))
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(groups, max(1, (os.cpu_count() or 1) // workers)),
+        )
+        with pool:
+            pending = {}
+
+            def drain(block_until):
+                while len(pending) > block_until:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished(*pending.pop(future), future.result())
+
+            for index, offset, ids, n, features, texts in chunks():
+                future = pool.submit(score_chunk, tasks, offset, features, texts)
+                pending[future] = (index, offset, ids, n)
+                drain(2 * workers - 1)
+            drain(0)
+
+    merge(checkpoint, output)
+    seconds = time.perf_counter() - start
+    stats["seconds"] = round(seconds, 2)
+    stats["rows_per_second"] = round(stats["rows_scored"] / seconds, 1) if seconds else 0.0
+    stats["output"] = str(output)
+    return stats
+
+
+# Command Line
+# python batch_score.py ../data/cleaned_data.csv scores.parquet --tasks risk,los,segment
+# python batch_score.py ../data/hospital_reviews/hospital_reviews.csv reviews.csv \
+#     --tasks sentiment --text-column Feedback
+def main():
+    parser = argparse.ArgumentParser(description="Score a file of admissions or reviews offline")
+    parser.add_argument("input", help=".csv, .xlsx, .parquet or a cleaned-data store directory")
+    parser.add_argument("output", help=".csv or .parquet")
+    parser.add_argument("--tasks", default="risk,los,segment")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="0 scores in-process")
+    parser.add_argument("--id-column", help="copied to the output (default: serial_no when present)")
+    parser.add_argument("--text-column", default="feedback")
+    parser.add_argument("--restart", action="store_true", help="discard an existing checkpoint")
+    args = parser.parse_args()
+
+    log = lambda message: print(message, file=sys.stderr, flush=True)
+    try:
+        stats = run(args.input, args.output, args.tasks.split(","), args.chunk_rows, args.workers,
+                    args.id_column, args.text_column, args.restart, log)
+    except ScoringError as exc:
+        raise SystemExit(str(exc))
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
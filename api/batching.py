@@ -0,0 +1,165 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, InvalidStateError
+
+from executors import OverloadedError
+from metrics import batch_size, model_stage_seconds
+
+
+# Per-model configuration (environment overrides)
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_MAX_QUEUE = 1024
+
+
+def batch_config(name):
+    prefix = f"HEALTHAI_BATCH_{name.upper()}"
+    return {
+        "max_batch_size": int(
+            os.environ.get(f"{prefix}_MAX_SIZE", DEFAULT_MAX_BATCH_SIZE)
+        ),
+        "max_wait_ms": float(
+            os.environ.get(f"{prefix}_MAX_WAIT_MS", DEFAULT_MAX_WAIT_MS)
+        ),
+        "max_queue": int(
+            os.environ.get(f"{prefix}_MAX_QUEUE", DEFAULT_MAX_QUEUE)
+        ),
+    }
+
+
+# Request Coalescer
+class MicroBatcher:
+    def __init__(self, name, predict_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, max_queue=DEFAULT_MAX_QUEUE):
+        self.name = name
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max_queue
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.rejected = 0
+        self.batch_sizes = Counter()
+
+    def submit(self, item):
+        self._ensure_worker()
+        if self.max_queue and self._queue.qsize() >= self.max_queue:
+            self.rejected += 1
+            raise OverloadedError(self.name)
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def predict(self, item):
+        return self.submit(item).result()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name=f"batcher-{self.name}",
+                    daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        # The thread serves every later request, so nothing a batch raises
+        # may end it: whatever escapes fails that batch's callers instead
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as exc:
+                self.errors += 1
+                for _, future, _ in batch:
+                    try:
+                        future.set_exception(exc)
+                    except InvalidStateError:
+                        pass
+
+    def _process(self, batch):
+        # Callers that went away (client disconnect, timeout) cancel their
+        # future; the rest are marked running so they can no longer be
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        items = [item for item, _, _ in batch]
+
+        start = time.perf_counter()
+        for _, _, queued in batch:
+            model_stage_seconds.observe(start - queued, self.name, "queue")
+        batch_size.observe(len(batch), self.name)
+
+        try:
+            results = self.predict_batch(items)
+        except Exception as exc:
+            # Retried one item at a time, so only the bad item fails
+            self.errors += 1
+            results = self._one_by_one(items) if len(items) > 1 else [exc]
+
+        # An exception in place of a result fails only that item's
+        # caller; items left without a result are failed, not orphaned
+        for i, (_, future, _) in enumerate(batch):
+            result = results[i] if i < len(results) else RuntimeError(
+                f"{self.name} batch returned {len(results)} results for {len(batch)} items"
+            )
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        model_stage_seconds.observe(time.perf_counter() - start, self.name, "batch")
+
+        self.batches += 1
+        self.items += len(batch)
+        self.batch_sizes[len(batch)] += 1
+
+    def _one_by_one(self, items):
+        results = []
+        for item in items:
+            try:
+                results.append(self.predict_batch([item])[0])
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
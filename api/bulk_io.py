@@ -0,0 +1,94 @@
+import csv
+import io
+import os
+
+import orjson
+import pandas as pd
+
+BULK_CHUNK_SIZE = int(os.environ.get("HEALTHAI_BULK_CHUNK_SIZE", 1024))
+
+
+# Chunked Readers
+# Uploaded files are read incrementally so memory stays bounded by the
+# chunk size, not the file size.
+def iter_chunks(values, chunk_size=BULK_CHUNK_SIZE):
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start + chunk_size]
+
+
+def _clean_texts(values):
+    return ["" if v is None or (isinstance(v, float) and v != v) else str(v) for v in values]
+
+
+def _iter_csv(fileobj, column, chunk_size):
+    reader = pd.read_csv(fileobj, usecols=[column], chunksize=chunk_size, dtype=str)
+    return (_clean_texts(chunk[column].tolist()) for chunk in reader)
+
+
+def _iter_xlsx(fileobj, column, chunk_size):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+
+    header = next(rows, ())
+    if column not in header:
+        workbook.close()
+        raise ValueError(f"column '{column}' not found")
+    position = header.index(column)
+
+    def chunks():
+        try:
+            chunk = []
+            for row in rows:
+                chunk.append(row[position] if position < len(row) else None)
+                if len(chunk) == chunk_size:
+                    yield _clean_texts(chunk)
+                    chunk = []
+            if chunk:
+                yield _clean_texts(chunk)
+        finally:
+            workbook.close()
+
+    return chunks()
+
+
+def iter_text_chunks(fileobj, filename, column="text", chunk_size=BULK_CHUNK_SIZE):
+    # Header problems raise ValueError here, before any response is started
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        return _iter_xlsx(fileobj, column, chunk_size)
+    if filename.lower().endswith(".csv"):
+        try:
+            return _iter_csv(fileobj, column, chunk_size)
+        except ValueError:
+            raise ValueError(f"column '{column}' not found")
+    raise ValueError("unsupported file type (expected .csv or .xlsx)")
+
+
+# Streaming Writers
+def iter_scored(chunks, predict_batch):
+    index = 0
+    for texts in chunks:
+        for text, result in zip(texts, predict_batch(texts)):
+            yield index, text, result
+            index += 1
+
+
+def ndjson_lines(scored):
+    for index, _, result in scored:
+        yield orjson.dumps({"index": index, **result}) + b"\n"
+
+
+def csv_lines(scored, column="text"):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow([column, "sentiment", "confidence"])
+    for _, text, result in scored:
+        writer.writerow([text, result["label"], round(result["probability"], 3)])
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
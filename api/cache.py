@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+
+from loaders import registry
+
+
+# Cache configuration (environment overrides)
+CACHE_ENABLED = os.environ.get("HEALTHAI_CACHE_ENABLED", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.environ.get("HEALTHAI_CACHE_MAX_ENTRIES", 10000))
+CACHE_TTL_SECONDS = float(os.environ.get("HEALTHAI_CACHE_TTL_SECONDS", 3600))
+CACHE_DB = os.environ.get("HEALTHAI_CACHE_DB")
+
+MISS = object()
+
+
+# On-disk Tier
+# Optional SQLite file shared by all workers on the host. Rows remember the
+# model version they were computed with so stale ones can be purged.
+class DiskTier:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, grp TEXT, version TEXT, value TEXT, expires REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_grp ON results (grp, version)")
+        self.lock = threading.Lock()
+
+    def get(self, key, now):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < now:
+            return MISS
+        return json.loads(row[0]), row[1]
+
+    def put(self, key, group, version, value, expires):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, group, version, json.dumps(value), expires)
+            )
+
+    def purge(self, group, version, now):
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM results WHERE (grp = ? AND version != ?) OR expires < ?",
+                (group, version, now)
+            )
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM results")
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+# Result Cache
+# Every cached endpoint is deterministic given the loaded model, so results
+# are keyed by model group, model version and the canonicalized input (raw
+# bytes are hashed as-is). Loading a changed artifact changes the version,
+# which purges the group's old entries from both tiers.
+class ResultCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS,
+                 db_path=CACHE_DB, enabled=CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+
+        self.entries = OrderedDict()
+        self.disk = DiskTier(db_path) if db_path and enabled else None
+        self.lock = threading.Lock()
+        self.versions = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def _version(self, group):
+        version = registry.version(group)
+        if self.versions.get(group) != version:
+            with self.lock:
+                for key in [k for k, e in self.entries.items() if e[0] == group and e[1] != version]:
+                    del self.entries[key]
+            if self.disk is not None:
+                self.disk.purge(group, version, time.time())
+            self.versions[group] = version
+        return version
+
+    def key(self, group, payload):
+        version = self._version(group)
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            data = bytes(payload)
+        else:
+            data = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+        digest = hashlib.blake2b(f"{group}:{version}:".encode(), digest_size=16)
+        digest.update(data)
+        return group, version, digest.hexdigest()
+
+    def get(self, key):
+        group, version, digest = key
+        now = time.time()
+
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is not None:
+                if entry[3] >= now:
+                    self.entries.move_to_end(digest)
+                    self.hits += 1
+                    return entry[2]
+                del self.entries[digest]
+                self.expired += 1
+
+        if self.disk is not None:
+            found = self.disk.get(digest, now)
+            if found is not MISS:
+                value, expires = found
+                self._remember(digest, group, version, value, expires)
+                with self.lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return value
+
+        with self.lock:
+            self.misses += 1
+        return MISS
+
+    # Key and lookup in one call, which the async paths run in the
+    # threadpool: registry.version() stats artifact files, and a version
+    # change purges the SQLite tier before the lookup queries it
+    def lookup(self, group, payload):
+        key = self.key(group, payload)
+        return key, self.get(key)
+
+    def _remember(self, digest, group, version, value, expires):
+        with self.lock:
+            self.entries[digest] = (group, version, value, expires)
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, key, value):
+        group, version, digest = key
+        expires = time.time() + self.ttl_seconds
+
+        self._remember(digest, group, version, value, expires)
+        if self.disk is not None:
+            self.disk.put(digest, group, version, value, expires)
+
+    async def aput(self, key, value):
+        if self.disk is None:
+            self.put(key, value)
+        else:
+            await run_in_threadpool(self.put, key, value)
+
+    async def cached(self, group, payload, compute):
+        # compute() returns an awaitable, so misses run off the event loop
+        if not self.enabled:
+            return await compute()
+
+        key, value = await run_in_threadpool(self.lookup, group, payload)
+        if value is MISS:
+            value = await compute()
+            await self.aput(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_entries": self.disk.count() if self.disk is not None else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "versions": dict(self.versions),
+        }
+
+
+result_cache = ResultCache()
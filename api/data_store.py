@@ -0,0 +1,339 @@
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+MASTER_CSV = DATA_DIR / "master_data.csv"
+META_CSV = DATA_DIR / "meta_data.csv"
+
+# Store configuration (environment overrides)
+STORE_DIR = Path(os.environ.get("HEALTHAI_STORE_DIR", DATA_DIR / "cleaned"))
+STORE_FORMAT = os.environ.get("HEALTHAI_STORE_FORMAT", "feather")
+CHUNK_ROWS = int(os.environ.get("HEALTHAI_STORE_CHUNK_ROWS", 200_000))
+
+FORMATS = {"feather": "arrow", "parquet": "parquet"}
+MANIFEST = "manifest.json"
+
+# Cleaning rules from notebooks/data_cleaning.ipynb
+KEY = "serial_no"
+DROPPED = [
+    "date_of_admission", "date_of_discharge", "admission_no",
+    "admission_month_year", "outcome", "bnp_level", "ejection_fraction",
+]
+LAB_COLUMNS = [
+    "hemoglobin", "total_leukocyte_count", "platelet_count",
+    "glucose_level", "urea_level", "creatinine_level",
+]
+MISSING = ["", "EMPTY"]
+
+
+class StoreError(ValueError):
+    pass
+
+
+# Schema (derived from meta_data.csv)
+# Continuous measurements become float32, discrete counts int16 and binary
+# indicators int8 flags; other categoricals (and binary columns coded with
+# letters, e.g. gender M/F, which is only known once data is seen) become
+# pandas categoricals. The serial number is kept as the append key.
+def derive_schema(meta_path=META_CSV):
+    meta = pd.read_csv(meta_path, encoding="utf-8-sig")
+    headings = meta["Table_Heading"].str.strip()
+    names = meta["modified_as_column_name"].str.strip()
+
+    columns = {}
+    for name, kind, category in zip(names, meta["Data Type"], meta["Data Type Category"]):
+        if name == KEY:
+            columns[name] = "int64"
+        elif name in DROPPED or kind == "Temporal":
+            continue
+        elif category == "Continuous":
+            columns[name] = "float32"
+        elif category == "Discrete":
+            columns[name] = "int16"
+        elif category == "Nominal - Binary":
+            columns[name] = "int8"
+        else:
+            columns[name] = "category"
+
+    return dict(zip(headings, names)), columns
+
+
+def _is_text(values):
+    values = values.dropna()
+    return len(values) > 0 and pd.to_numeric(values, errors="coerce").isna().all()
+
+
+def resolve_schema(columns, frame):
+    return {
+        name: "category" if dtype == "int8" and _is_text(frame[name]) else dtype
+        for name, dtype in columns.items()
+    }
+
+
+# Chunk Cleaning
+def clean_chunk(frame, columns, categories):
+    labs = frame[LAB_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    frame = frame[(labs.notna() & (labs != 0)).all(axis=1).to_numpy()]
+
+    out = {}
+    for name, dtype in columns.items():
+        values = frame[name]
+        if dtype == "category":
+            seen = categories.setdefault(name, [])
+            new = set(values.dropna().astype(str)) - set(seen)
+            seen.extend(sorted(new))
+            out[name] = pd.Categorical(values.astype("string"), categories=seen)
+            continue
+
+        values = pd.to_numeric(values, errors="coerce")
+        if dtype != "float32":
+            # Missing flags and counts are 0, as in the notebook
+            values = values.fillna(0)
+            info = np.iinfo(dtype)
+            if values.min() < info.min or values.max() > info.max:
+                raise StoreError(f"column '{name}' has values outside {dtype}")
+        out[name] = values.to_numpy().astype(dtype)
+
+    return pd.DataFrame(out)
+
+
+# Manifest
+# Lists the part files (only listed parts are read, so a part written by
+# an interrupted run is ignored), the resolved schema, category lists, the
+# key high-water mark and, per source file, how many bytes were consumed.
+def load_manifest(store_dir=STORE_DIR):
+    path = Path(store_dir) / MANIFEST
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _save_manifest(store_dir, manifest):
+    path = Path(store_dir) / MANIFEST
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, path)
+
+
+def _tail_digest(path, end, size=1 << 16):
+    with open(path, "rb") as fp:
+        fp.seek(max(0, end - size))
+        tail = fp.read(end - fp.tell())
+    return hashlib.blake2b(tail, digest_size=16).hexdigest()
+
+
+def _resume_offset(path, state):
+    # A source that only grew (same bytes up to the recorded offset, ending
+    # on a line break) is read from that offset instead of from the start
+    if not state or path.stat().st_size < state["size"] or state["size"] == 0:
+        return 0
+    with open(path, "rb") as fp:
+        fp.seek(state["size"] - 1)
+        if fp.read(1) != b"\n":
+            return 0
+    if _tail_digest(path, state["size"]) != state["tail"]:
+        return 0
+    return state["size"]
+
+
+# Part Files
+def _write_part(store_dir, manifest, frame):
+    import pyarrow as pa
+
+    fmt = manifest["format"]
+    name = f"part-{len(manifest['parts']):05d}.{FORMATS[fmt]}"
+    path = Path(store_dir) / name
+    tmp = path.with_suffix(".tmp")
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+
+    if fmt == "feather":
+        import pyarrow.feather as feather
+        # Uncompressed, so readers can memory-map the columns directly
+        feather.write_feather(table, tmp, compression="uncompressed")
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp, compression="zstd")
+    os.replace(tmp, path)
+
+    keys = frame[KEY]
+    manifest["parts"].append({
+        "file": name,
+        "rows": len(frame),
+        "min_key": int(keys.min()),
+        "max_key": int(keys.max()),
+    })
+    manifest["rows"] += len(frame)
+
+
+# Pipeline
+def _header(path):
+    return pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns.tolist()
+
+
+def _read_chunks(path, chunk_rows, usecols, offset=0, header=None):
+    options = dict(
+        chunksize=chunk_rows,
+        usecols=usecols,
+        na_values=MISSING,
+        keep_default_na=False,
+        encoding="utf-8-sig",
+        low_memory=False,
+    )
+    with open(path, "rb") as fp:
+        if offset:
+            fp.seek(offset)
+            options.update(header=None, names=header)
+        with pd.read_csv(fp, **options) as reader:
+            yield from reader
+
+
+def _new_manifest(fmt):
+    if fmt not in FORMATS:
+        raise StoreError(f"format must be one of {sorted(FORMATS)}")
+    return {
+        "format": fmt,
+        "columns": None,
+        "categories": {},
+        "parts": [],
+        "rows": 0,
+        "max_key": None,
+        "sources": {},
+    }
+
+
+# Appends every admission of `source` with a serial number above the
+# store's high-water mark, one part file per chunk. Serial numbers are
+# assigned in admission order, so history is never cleaned twice; a source
+# that was appended before and has only grown is not even re-parsed.
+def append(source=MASTER_CSV, store_dir=STORE_DIR, chunk_rows=CHUNK_ROWS, fmt=STORE_FORMAT):
+    source = Path(source).resolve()
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    rename, declared = derive_schema()
+    manifest = load_manifest(store_dir) or _new_manifest(fmt)
+
+    state = manifest["sources"].get(str(source))
+    offset = _resume_offset(source, state)
+    size = source.stat().st_size
+    high_water = manifest["max_key"]
+
+    stats = {"rows_read": 0, "rows_skipped": 0, "rows_dropped": 0, "rows_written": 0, "offset": offset}
+    if offset == size:
+        return stats
+
+    # Only the columns the store keeps are parsed
+    header = state["header"] if offset else _header(source)
+    usecols = [heading for heading, name in rename.items() if name in declared]
+    missing = set(usecols) - set(header)
+    if missing:
+        raise StoreError(f"{source.name} is missing columns {sorted(missing)}")
+
+    for chunk in _read_chunks(source, chunk_rows, usecols, offset, header):
+        chunk = chunk.rename(columns=rename)
+        stats["rows_read"] += len(chunk)
+
+        keys = pd.to_numeric(chunk[KEY], errors="coerce")
+        if keys.isna().any():
+            raise StoreError(f"rows without {KEY} in {source.name}")
+        if high_water is not None:
+            fresh = (keys > high_water).to_numpy()
+            stats["rows_skipped"] += int(len(chunk) - fresh.sum())
+            chunk, keys = chunk[fresh], keys[fresh]
+        if chunk.empty:
+            continue
+
+        if manifest["columns"] is None:
+            manifest["columns"] = resolve_schema(declared, chunk)
+        frame = clean_chunk(chunk, manifest["columns"], manifest["categories"])
+        stats["rows_dropped"] += len(chunk) - len(frame)
+        if len(frame):
+            _write_part(store_dir, manifest, frame)
+            stats["rows_written"] += len(frame)
+
+        # Dropped rows count towards the mark too: they were seen
+        manifest["max_key"] = max(manifest["max_key"] or 0, int(keys.max()))
+
+    manifest["sources"][str(source)] = {
+        "size": size,
+        "tail": _tail_digest(source, size),
+        "header": header,
+    }
+    _save_manifest(store_dir, manifest)
+    return stats
+
+
+def build(source=MASTER_CSV, store_dir=STORE_DIR, chunk_rows=CHUNK_ROWS, fmt=STORE_FORMAT):
+    store_dir = Path(store_dir)
+    manifest = load_manifest(store_dir)
+    if manifest:
+        for part in manifest["parts"]:
+            (store_dir / part["file"]).unlink(missing_ok=True)
+        (store_dir / MANIFEST).unlink()
+    return append(source, store_dir, chunk_rows, fmt)
+
+
+# Reading
+# Feather parts are memory-mapped; categorical dictionaries (which only
+# ever grow by appending) are unified so the frame has one category set.
+def dataset(store_dir=STORE_DIR):
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    store_dir = Path(store_dir)
+    manifest = load_manifest(store_dir)
+    if manifest is None:
+        raise StoreError(f"no cleaned-data store in {store_dir}; run data_store.py build")
+
+    return ds.dataset(
+        [str(store_dir / part["file"]) for part in manifest["parts"]],
+        format="ipc" if manifest["format"] == "feather" else "parquet",
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def read_table(columns=None, store_dir=STORE_DIR):
+    return dataset(store_dir).to_table(columns=columns).unify_dictionaries()
+
+
+def load_cleaned(columns=None, store_dir=STORE_DIR, with_key=False):
+    if columns is None:
+        manifest = load_manifest(store_dir) or {}
+        columns = [c for c in manifest.get("columns") or {} if with_key or c != KEY] or None
+    return read_table(columns, store_dir).to_pandas()
+
+
+# Command Line
+# python data_store.py build [--format parquet]
+# python data_store.py append --source <new admissions>.csv
+def main():
+    parser = argparse.ArgumentParser(description="Chunked cleaning into a columnar store")
+    parser.add_argument("command", choices=["build", "append", "info"])
+    parser.add_argument("--source", default=str(MASTER_CSV))
+    parser.add_argument("--store", default=str(STORE_DIR))
+    parser.add_argument("--format", default=STORE_FORMAT, choices=sorted(FORMATS))
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    if args.command == "info":
+        manifest = load_manifest(args.store)
+        if manifest is None:
+            raise SystemExit(f"no store in {args.store}")
+        print(json.dumps({k: v for k, v in manifest.items() if k != "parts"}, indent=2))
+        print(f"{len(manifest['parts'])} parts")
+        return
+
+    run = build if args.command == "build" else append
+    print(json.dumps(run(args.source, args.store, args.chunk_rows, args.format)))
+
+
+if __name__ == "__main__":
+    main()
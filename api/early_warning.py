@@ -0,0 +1,151 @@
+import os
+
+import numpy as np
+
+
+# Early-warning gate configuration (environment overrides)
+GATE_ENABLED = os.environ.get("HEALTHAI_EWS_GATE", "0") != "0"
+HALF_LIFE = float(os.environ.get("HEALTHAI_EWS_HALF_LIFE", 6))
+Z_LIMIT = float(os.environ.get("HEALTHAI_EWS_Z_LIMIT", 4.0))
+SLOPE_LIMIT = float(os.environ.get("HEALTHAI_EWS_SLOPE_LIMIT", 0.5))
+SCORE_DELTA = int(os.environ.get("HEALTHAI_EWS_SCORE_DELTA", 2))
+MAX_SKIP = int(os.environ.get("HEALTHAI_EWS_MAX_SKIP", 12))
+PREDICTION_BAND = tuple(
+    float(v) for v in os.environ.get("HEALTHAI_EWS_PREDICTION_BAND", "0.2,0.8").split(",")
+)
+
+# sequence_scaler's columns (notebooks/6-sequence_modeling)
+VITALS = [
+    "heart_rate", "systolic_bp", "diastolic_bp", "respiratory_rate", "spo2",
+    "temperature", "creatinine", "wbc", "lactate",
+]
+
+
+# Warning Score
+# Points per parameter from band edges: NEWS2 for pulse, systolic
+# pressure, respiration, SpO2 (scale 1) and temperature (upper edges
+# inclusive, e.g. pulse <= 40 scores 3); SOFA renal bands for creatinine,
+# sepsis lactate cut-offs and SIRS limits for WBC (lower edges inclusive,
+# e.g. lactate >= 2.0 scores 1). Diastolic pressure is not scored.
+# name: (edges, points for each of the len(edges) + 1 intervals, upper edge inclusive)
+BANDS = {
+    "heart_rate": ([40, 50, 90, 110, 130], [3, 1, 0, 1, 2, 3], True),
+    "systolic_bp": ([90, 100, 110, 219], [3, 2, 1, 0, 3], True),
+    "respiratory_rate": ([8, 11, 20, 24], [3, 1, 0, 2, 3], True),
+    "spo2": ([91, 93, 95], [3, 2, 1, 0], True),
+    "temperature": ([35.0, 36.0, 38.0, 39.0], [3, 1, 0, 1, 2], True),
+    "creatinine": ([1.2, 2.0, 3.5, 5.0], [0, 1, 2, 3, 4], False),
+    "wbc": ([4.0, 12.0], [1, 0, 1], False),
+    "lactate": ([2.0, 4.0], [0, 1, 2], False),
+}
+
+# Aggregate bands as in NEWS2: low, low-medium (a single parameter scoring
+# 3), medium (5-6) and high (7 or more)
+LOW, LOW_MEDIUM, MEDIUM, HIGH = range(4)
+
+
+def warning_scores(X):
+    points = np.zeros(X.shape, dtype=np.int64)
+    for j, name in enumerate(VITALS):
+        if name in BANDS:
+            edges, values, right = BANDS[name]
+            points[:, j] = np.asarray(values)[np.digitize(X[:, j], edges, right=right)]
+
+    score = points.sum(axis=1)
+    band = np.where(
+        score >= 7, HIGH,
+        np.where(score >= 5, MEDIUM, np.where(points.max(axis=1) >= 3, LOW_MEDIUM, LOW))
+    )
+    return score, band
+
+
+# Rolling Statistics
+# Per patient and vital, in scaled units (the scaler standardises to the
+# training population): exponentially weighted mean and variance, and an
+# exponentially weighted slope (mean first difference), each updated in
+# O(1) per tick. A reading's surprise is its distance from the running
+# mean in running standard deviations; the variance is floored so that a
+# short, quiet history does not turn measurement noise into surprises.
+MEAN, VAR, SLOPE, LAST = range(4)
+VAR_FLOOR = 0.25
+
+
+def initial_stats(X_scaled):
+    stats = np.zeros((len(X_scaled), 4, X_scaled.shape[1]))
+    stats[:, MEAN] = X_scaled
+    stats[:, VAR] = VAR_FLOOR
+    stats[:, LAST] = X_scaled
+    return stats
+
+
+def update_stats(stats, X_scaled, alpha):
+    mean, var, slope, last = stats[:, MEAN], stats[:, VAR], stats[:, SLOPE], stats[:, LAST]
+    delta = X_scaled - mean
+    surprise = np.abs(delta) / np.sqrt(np.maximum(var, VAR_FLOOR))
+
+    updated = np.empty_like(stats)
+    updated[:, MEAN] = mean + alpha * delta
+    updated[:, VAR] = (1 - alpha) * (var + alpha * delta ** 2)
+    updated[:, SLOPE] = slope + alpha * ((X_scaled - last) - slope)
+    updated[:, LAST] = X_scaled
+    return updated, surprise.max(axis=1), np.abs(updated[:, SLOPE]).max(axis=1)
+
+
+# Early-Warning Gate
+# Decides per patient and tick whether the sequence model runs. It runs
+# on a patient's first reading and whenever
+#   * the warning score moved by SCORE_DELTA or more, or its band changed,
+#     since the model last ran,
+#   * a vital is surprising (beyond Z_LIMIT) or trending (slope beyond
+#     SLOPE_LIMIT scaled units per tick),
+#   * the last prediction lies inside PREDICTION_BAND (close enough to the
+#     alert threshold that a stable score is no evidence it stays put),
+#   * it was skipped on the last MAX_SKIP ticks.
+# Otherwise the last prediction is reused. Skipped rows still reach the
+# model when it next runs (see sessions.py), so a prediction is always the
+# one scoring every tick would give at that tick. It pays off where a run
+# re-evaluates the whole window (TFLite, or architectures without an
+# incremental stepper); a SimpleRNN step costs about as much as the gate.
+class EarlyWarningGate:
+    def __init__(self, half_life=HALF_LIFE, z_limit=Z_LIMIT, slope_limit=SLOPE_LIMIT,
+                 score_delta=SCORE_DELTA, max_skip=MAX_SKIP, prediction_band=PREDICTION_BAND):
+        self.alpha = 1 - 0.5 ** (1 / half_life)
+        self.z_limit = z_limit
+        self.slope_limit = slope_limit
+        self.score_delta = score_delta
+        self.max_skip = max_skip
+        self.prediction_band = prediction_band
+
+    # sessions: objects with vitals_stats, warning (score and band when
+    # the model last ran), skipped and prediction; X raw and scaled rows
+    def check(self, sessions, X, X_scaled):
+        score, band = warning_scores(X)
+        new = np.array([s.vitals_stats is None for s in sessions])
+
+        stats = np.stack([
+            s.vitals_stats if s.vitals_stats is not None else row
+            for s, row in zip(sessions, initial_stats(X_scaled))
+        ])
+        stats, surprise, trend = update_stats(stats, X_scaled, self.alpha)
+
+        last = np.array([s.warning if s.warning is not None else (-1, -1) for s in sessions])
+        prediction = np.array([s.prediction if s.prediction is not None else 0.0 for s in sessions])
+        skipped = np.array([s.skipped for s in sessions])
+        low, high = self.prediction_band
+
+        run = (
+            new
+            | (surprise > self.z_limit)
+            | (trend > self.slope_limit)
+            | (np.abs(score - last[:, 0]) >= self.score_delta)
+            | (band != last[:, 1])
+            | ((prediction > low) & (prediction < high))
+            | (skipped >= self.max_skip)
+        )
+        for session, s_stats, s_score, s_band, s_run in zip(
+                sessions, stats, score.tolist(), band.tolist(), run.tolist()):
+            session.vitals_stats = s_stats
+            session.warning_score = s_score
+            if s_run:
+                session.warning = (s_score, s_band)
+        return run
@@ -0,0 +1,135 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# Execution configuration (environment overrides)
+NATIVE_THREADS = int(os.environ.get("HEALTHAI_NATIVE_THREADS", 4))
+CPU_EXECUTOR = os.environ.get("HEALTHAI_CPU_EXECUTOR", "thread")
+CPU_WORKERS = int(os.environ.get("HEALTHAI_CPU_WORKERS", os.cpu_count() or 1))
+MAX_PENDING = int(os.environ.get("HEALTHAI_MAX_PENDING", 256))
+RETRY_AFTER_SECONDS = int(os.environ.get("HEALTHAI_RETRY_AFTER_SECONDS", 1))
+
+TABULAR_GROUPS = ["risk", "los", "segment"]
+
+
+class OverloadedError(RuntimeError):
+    def __init__(self, name, retry_after=RETRY_AFTER_SECONDS):
+        super().__init__(f"'{name}' queue is full, retry later")
+        self.retry_after = retry_after
+
+
+# Process Workers
+# Spawned (not forked) so no TensorFlow state is inherited; each worker
+# loads the tabular models once when it starts and follows model version
+# changes like the API process.
+def _init_process(groups):
+    from loaders import registry
+    from model_versions import versions
+    registry.preload([g for g in groups if registry.is_enabled(g)], warmup=False)
+    versions.watch()
+
+
+# Bounded Executor
+# Wraps a thread or process pool with an admission limit: once max_pending
+# calls are queued or running, new submissions fail fast with
+# OverloadedError instead of growing the queue without bound.
+class BoundedExecutor:
+    def __init__(self, name, kind="thread", workers=4, max_pending=MAX_PENDING,
+                 preload_groups=()):
+        self.name = name
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.preload_groups = list(preload_groups)
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    def _ensure_pool(self):
+        if self._pool is not None:
+            return self._pool
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_process,
+                        initargs=(self.preload_groups,)
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix=f"executor-{self.name}"
+                    )
+        return self._pool
+
+    def submit(self, fn, *args, force=False):
+        pool = self._ensure_pool()
+        with self._lock:
+            if not force and self.max_pending and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise OverloadedError(self.name)
+            self.pending += 1
+
+        start = time.perf_counter()
+        future = pool.submit(fn, *args)
+        future.add_done_callback(lambda f: self._done(f, start))
+        return future
+
+    def _done(self, future, start):
+        with self._lock:
+            self.pending -= 1
+            self.busy_seconds += time.perf_counter() - start
+            if future.exception() is not None:
+                self.errors += 1
+            else:
+                self.completed += 1
+
+    async def run(self, fn, *args, force=False):
+        return await asyncio.wrap_future(self.submit(fn, *args, force=force))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "started": self._pool is not None,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "mean_latency_ms": (
+                self.busy_seconds / self.completed * 1000.0 if self.completed else 0.0
+            ),
+        }
+
+
+# GIL-releasing native work (OpenCV decode/resize). TensorFlow forward
+# passes already run on the per-model batcher threads.
+native_executor = BoundedExecutor("native", "thread", NATIVE_THREADS)
+
+# sklearn/numpy scoring for the tabular models
+cpu_executor = BoundedExecutor(
+    "cpu", CPU_EXECUTOR, CPU_WORKERS, preload_groups=TABULAR_GROUPS
+)
+
+EXECUTORS = {
+    "native": native_executor,
+    "cpu": cpu_executor,
+}
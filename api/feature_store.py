@@ -0,0 +1,441 @@
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from features import CODES, LOS_FEATURES, RISK_FEATURES, SEGMENT_FEATURES, encode
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Feature store configuration (environment overrides)
+STORE_DIR = Path(os.environ.get("HEALTHAI_FEATURE_STORE_DIR", ROOT / "data" / "features"))
+REFRESH_SECONDS = float(os.environ.get("HEALTHAI_FEATURE_STORE_REFRESH_SECONDS", 5))
+MAX_IDS = int(os.environ.get("HEALTHAI_FEATURE_STORE_MAX_IDS", 10_000))
+
+# One matrix per tabular model, columns in the order the model was trained
+# with; the segment rows are also kept scaled (the input k-means sees)
+MODELS = {"risk": RISK_FEATURES, "los": LOS_FEATURES, "segment": SEGMENT_FEATURES}
+SCALED = "segment_scaled"
+COLUMNS = list(dict.fromkeys(name for columns in MODELS.values() for name in columns))
+META = "meta.json"
+
+
+class FeatureStoreError(ValueError):
+    pass
+
+
+class NoFeatureStoreError(FeatureStoreError):
+    pass
+
+
+def scaler_digest(scaler):
+    # Fitted state (mean_, scale_, ...), so a re-exported or copied scaler
+    # with the same parameters still matches
+    digest = hashlib.blake2b(digest_size=8)
+    for name, value in sorted(vars(scaler).items()):
+        if name.endswith("_") and isinstance(value, np.ndarray):
+            digest.update(name.encode())
+            if value.dtype == object:
+                digest.update(repr(value.tolist()).encode())
+            else:
+                digest.update(np.ascontiguousarray(value).tobytes())
+    return digest.hexdigest()
+
+
+# Feature Store
+# Admissions sorted by ID in ids.npy and, per model, a float64 matrix of
+# encoded features (gender, admission and residence codes mapped as in
+# the notebooks) in model order. Files are memory-mapped, so opening the
+# store is free and a lookup is a binary search plus one contiguous row
+# read per model; forked workers share the pages.
+#
+# update() writes changed values into the mapped files in place (every
+# process mapping them sees the change at once) and recomputes only the
+# matrices that use a changed column. build() and sync() replace whole
+# files and write meta.json last; readers pick them up on refresh().
+#
+# The IDs, matrices and meta a lookup reads are loaded into one StoreState
+# and swapped in with a single assignment; lookups read self.state once.
+class TornReadError(Exception):
+    pass
+
+
+# Store Lock
+# build() and sync() hold store.lock exclusively while they replace the
+# files; update() holds it shared, so a write lands either before a
+# rewrite starts (sync() then copies it into the new files) or after it
+# ends, into the new files, never into a replaced inode.
+LOCK = "store.lock"
+
+
+@contextmanager
+def store_lock(path, shared=False):
+    fd = os.open(Path(path) / LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+class StoreState:
+    def __init__(self, path):
+        try:
+            self.meta = json.loads((path / META).read_text())
+            self.mtime = (path / META).stat().st_mtime_ns
+        except FileNotFoundError:
+            raise NoFeatureStoreError(f"no feature store in {path}; run feature_store.py build")
+        self.offsets = {}
+        self.ids = self._array(path, "ids")
+        self.matrices = {name: self._array(path, name) for name in self.meta["matrices"]}
+        self.scaler = (None, False)
+
+        # build()/sync() replace the files one at a time (meta.json last); a
+        # load that overlapped them has sizes that disagree with meta
+        sizes = {len(self.ids)} | {len(matrix) for matrix in self.matrices.values()}
+        if sizes != {self.meta["rows"]} or (path / META).stat().st_mtime_ns != self.mtime:
+            raise TornReadError(f"{path} changed while loading")
+
+    def _array(self, path, name):
+        array = np.load(path / f"{name}.npy", mmap_mode="r")
+        self.offsets[name] = array.offset
+        # Plain ndarray views of the mapping index faster than np.memmap
+        return array.view(np.ndarray)
+
+
+class FeatureStore:
+    def __init__(self, path=STORE_DIR):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.updates = 0
+        self.files = {}
+        self._load()
+
+    def _load(self, attempts=20):
+        for attempt in range(attempts):
+            try:
+                state = StoreState(self.path)
+                break
+            except (TornReadError, FileNotFoundError):
+                # Mid-build: try again shortly; a refresh keeps serving the
+                # current state
+                if attempt == attempts - 1:
+                    if hasattr(self, "state"):
+                        self.checked = time.monotonic()
+                        return
+                    raise
+                time.sleep(0.01)
+        self.checked = time.monotonic()
+        # Descriptors for update() belong to the files being replaced
+        self._close()
+        self.state = state
+
+    def _close(self):
+        for fd in self.files.values():
+            os.close(fd)
+        self.files = {}
+
+    def refresh(self):
+        # Picks up build()/sync() runs from other processes, checking the
+        # meta file at most every REFRESH_SECONDS
+        now = time.monotonic()
+        if now - self.checked < REFRESH_SECONDS:
+            return
+        self.checked = now
+        try:
+            mtime = (self.path / META).stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.state.mtime:
+            with self.lock:
+                if mtime != self.state.mtime:
+                    self._load()
+
+    @property
+    def meta(self):
+        return self.state.meta
+
+    @property
+    def ids(self):
+        return self.state.ids
+
+    @property
+    def matrices(self):
+        return self.state.matrices
+
+    def __len__(self):
+        return len(self.state.ids)
+
+    # Lookup
+    def positions(self, ids, state=None):
+        known = (state or self.state).ids
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(known):
+            return np.zeros(len(ids), dtype=np.intp), np.zeros(len(ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(known, ids), len(known) - 1)
+        return positions, known[positions] == ids
+
+    # Rows of `matrix` for the known ids, in request order, and which ids
+    # were known
+    def rows(self, matrix, ids, state=None):
+        state = state or self.state
+        positions, found = self.positions(ids, state)
+        return state.matrices[matrix][positions[found]], found
+
+    # Scaled segment rows; rows an update could not rescale (NaN, see
+    # update()) are scaled from the raw segment row here
+    def scaled_rows(self, ids, scaler):
+        state = self.state
+        positions, found = self.positions(ids, state)
+        positions = positions[found]
+        X = state.matrices[SCALED][positions]
+        stale = ~np.isfinite(X).all(axis=1)
+        if stale.any():
+            raw = state.matrices["segment"][positions[stale]]
+            finite = np.isfinite(raw).all(axis=1)
+            if finite.any():
+                rows = np.flatnonzero(stale)[finite]
+                X[rows] = scaler.transform(raw[finite])
+        return X, found
+
+    def features(self, admission_id):
+        state = self.state
+        positions, found = self.positions([admission_id], state)
+        if not found[0]:
+            return None
+        return {
+            model: dict(zip(columns, state.matrices[model][positions[0]].tolist()))
+            for model, columns in MODELS.items()
+        }
+
+    # Whether the stored scaled segment rows came from this scaler
+    def scaled_with(self, scaler):
+        state = self.state
+        if SCALED not in state.matrices:
+            return False
+        if state.scaler[0] is not scaler:
+            state.scaler = (scaler, scaler_digest(scaler) == state.meta.get("scaler"))
+        return state.scaler[1]
+
+    # Partial Updates
+    # values: {column: number, or a code such as "M" for coded columns}.
+    # Rows are written with pwrite into the page cache the mappings share,
+    # so no process has to remap; they reach the disk with normal
+    # writeback (a process crash loses nothing, a host crash may).
+    #
+    # A changed segment row is rescaled with `scaler` when it is the one
+    # the store was built with; otherwise (no scaler on this worker, e.g.
+    # segment disabled) its scaled row is set to NaN, and scaled_rows()
+    # scales it from the raw row on every worker that reads it.
+    def update(self, admission_id, values, scaler=None):
+        encoded = {name: _encode_value(name, value) for name, value in values.items()}
+
+        changed = [model for model, columns in MODELS.items() if any(c in encoded for c in columns)]
+        with self.lock, store_lock(self.path, shared=True):
+            # Replaced since the last refresh: write to the new files
+            if (self.path / META).stat().st_mtime_ns != self.state.mtime:
+                self._load()
+            state = self.state
+            positions, found = self.positions([admission_id], state)
+            if not found[0]:
+                return None
+            position = positions[0]
+
+            rows = {}
+            for model in changed:
+                row = state.matrices[model][position].copy()
+                for j, name in enumerate(MODELS[model]):
+                    if name in encoded:
+                        row[j] = encoded[name]
+                rows[model] = row
+
+            if "segment" in rows and SCALED in state.matrices:
+                if scaler is not None and self.scaled_with(scaler) and np.isfinite(rows["segment"]).all():
+                    rows[SCALED] = scaler.transform(rows["segment"][None, :])[0]
+                else:
+                    rows[SCALED] = np.full_like(rows["segment"], np.nan)
+
+            for name, row in rows.items():
+                if name not in self.files:
+                    self.files[name] = os.open(self.path / f"{name}.npy", os.O_WRONLY)
+                os.pwrite(self.files[name], np.ascontiguousarray(row, dtype=np.float64).tobytes(),
+                          state.offsets[name] + position * row.nbytes)
+            self.updates += 1
+        return list(rows)
+
+    def stats(self):
+        state = self.state
+        return {
+            "path": str(self.path),
+            "admissions": len(state.ids),
+            "source": state.meta["source"],
+            "max_id": state.meta["max_id"],
+            "matrices": {name: list(matrix.shape) for name, matrix in state.matrices.items()},
+            "built": state.meta["built"],
+            "updates": self.updates,
+        }
+
+
+def _encode_value(name, value):
+    if name not in COLUMNS:
+        raise FeatureStoreError(f"unknown feature '{name}'")
+    if name in CODES and isinstance(value, str):
+        if value not in CODES[name]:
+            raise FeatureStoreError(f"'{name}' must be one of {sorted(CODES[name])}")
+        return float(CODES[name][value])
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise FeatureStoreError(f"'{name}' must be a number")
+    if not np.isfinite(value):
+        raise FeatureStoreError(f"'{name}' must be a finite number")
+    return value
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def feature_store(path=STORE_DIR):
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeatureStore(path)
+    _store.refresh()
+    return _store
+
+
+# Building
+def _save(directory, name, array):
+    tmp = Path(directory) / f"{name}.tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, Path(directory) / f"{name}.npy")
+
+
+def _save_meta(directory, meta):
+    tmp = Path(directory) / f"{META}.tmp"
+    tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, Path(directory) / META)
+
+
+# Admissions (the cleaned-data store, keyed by serial number; rows of
+# cleaned_data.csv, keyed by position, without one)
+def load_admissions(min_id=None):
+    import data_store
+
+    try:
+        frame = data_store.load_cleaned(COLUMNS + [data_store.KEY], with_key=True)
+        frame = frame.rename(columns={data_store.KEY: "admission_id"})
+        source = "store"
+    except data_store.StoreError:
+        import pandas as pd
+        frame = pd.read_csv(data_store.DATA_DIR / "cleaned_data.csv", usecols=COLUMNS)
+        frame["admission_id"] = np.arange(len(frame))
+        source = "cleaned_data.csv"
+
+    if min_id is not None:
+        frame = frame[frame["admission_id"] > min_id]
+    return frame, source
+
+
+def _encode_frame(frame, scaler):
+    order = np.argsort(frame["admission_id"].to_numpy(np.int64), kind="stable")
+    frame = frame.iloc[order]
+    ids = frame["admission_id"].to_numpy(np.int64)
+    if len(ids) > 1 and (np.diff(ids) == 0).any():
+        raise FeatureStoreError("admission ids must be unique")
+
+    matrices = {model: encode(frame, columns) for model, columns in MODELS.items()}
+    # Rows with missing values stay NaN (scored as a per-row error)
+    scaled = np.full_like(matrices["segment"], np.nan)
+    finite = np.isfinite(matrices["segment"]).all(axis=1)
+    if finite.any():
+        scaled[finite] = scaler.transform(matrices["segment"][finite])
+    matrices[SCALED] = scaled
+    return ids, matrices
+
+
+def build(frame, path, scaler, source="frame"):
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    ids, matrices = _encode_frame(frame, scaler)
+
+    with store_lock(path):
+        _save(path, "ids", ids)
+        for name, matrix in matrices.items():
+            _save(path, name, matrix)
+        _save_meta(path, {
+            "source": source,
+            "rows": len(ids),
+            "max_id": int(ids.max()) if len(ids) else -1,
+            "matrices": list(matrices),
+            "columns": MODELS,
+            "scaler": scaler_digest(scaler),
+            "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+    return FeatureStore(path)
+
+
+# Appends admissions with IDs above the store's highest (new rows of the
+# cleaned-data store); files are rewritten, values updated so far are kept
+# (the current rows are read under the lock, after any update in flight)
+def sync(frame, path, scaler):
+    with store_lock(path):
+        state = FeatureStore(path).state
+        frame = frame[frame["admission_id"] > state.meta["max_id"]]
+        if not len(frame):
+            return FeatureStore(path)
+
+        if scaler_digest(scaler) != state.meta["scaler"]:
+            raise FeatureStoreError("the scaler changed since the store was built; rebuild it")
+        ids, matrices = _encode_frame(frame, scaler)
+
+        _save(path, "ids", np.concatenate([state.ids, ids]))
+        for name, matrix in matrices.items():
+            _save(path, name, np.concatenate([state.matrices[name], matrix]))
+        _save_meta(path, {
+            **state.meta,
+            "rows": len(state.ids) + len(ids),
+            "max_id": int(ids.max()),
+            "built": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+    return FeatureStore(path)
+
+
+# Command Line
+# python feature_store.py build
+# python feature_store.py sync   (adds store rows above the highest ID)
+def main():
+    from loaders import registry
+
+    parser = argparse.ArgumentParser(description="Build or extend the patient feature store")
+    parser.add_argument("command", choices=["build", "sync", "info"])
+    parser.add_argument("--output", default=str(STORE_DIR))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "info":
+        store = FeatureStore(args.output)
+    elif args.command == "build":
+        frame, source = load_admissions()
+        store = build(frame, args.output, registry.get("scaler"), source)
+    else:
+        store = FeatureStore(args.output)
+        frame, _ = load_admissions(min_id=store.meta["max_id"])
+        store = sync(frame, args.output, registry.get("scaler"))
+
+    print(f"{len(store)} admissions from {store.meta['source']} "
+          f"({time.perf_counter() - start:.2f} s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
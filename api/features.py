@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+
+# Model Features
+# Column orders the tabular models were trained with (notebooks 1-3) and
+# the category codes the notebooks mapped to numbers before training.
+RISK_FEATURES = [
+    "age", "gender", "smoking_status", "alcohol_use", "hemoglobin",
+    "total_leukocyte_count", "platelet_count", "glucose_level",
+    "urea_level", "creatinine_level",
+]
+LOS_FEATURES = [
+    "urea_level", "total_leukocyte_count", "platelet_count", "hemoglobin",
+    "glucose_level", "age", "creatinine_level", "admission_type",
+    "stable_angina", "complete_heart_block", "heart_failure",
+    "coronary_artery_disease", "hypertension", "ventricular_tachycardia",
+    "urinary_tract_infection", "diabetes_mellitus", "prior_cardiomyopathy",
+    "raised_cardiac_enzymes", "acute_coronary_syndrome", "gender",
+    "residence_type", "atypical_chest_pain",
+]
+SEGMENT_FEATURES = [
+    "age", "hemoglobin", "total_leukocyte_count", "platelet_count",
+    "glucose_level", "creatinine_level", "urea_level",
+]
+
+CODES = {
+    "gender": {"M": 1, "F": 0},
+    "admission_type": {"E": 1, "O": 0},
+    "residence_type": {"R": 1, "U": 0},
+}
+
+
+# Cleaned rows (cleaned_data.csv or the data store) -> float64 matrix in
+# model order. Missing values and unknown codes become NaN, which the
+# batch predictors report as a per-row error.
+def encode(frame, columns):
+    out = np.empty((len(frame), len(columns)), dtype=np.float64)
+    for j, name in enumerate(columns):
+        values = frame[name]
+        if name in CODES and not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(object).map(CODES[name])
+        out[:, j] = pd.to_numeric(values, errors="coerce")
+    return out
@@ -0,0 +1,125 @@
+import os
+import struct
+import threading
+
+import cv2
+import numpy as np
+
+from metrics import model_stage
+
+
+# Image configuration (environment overrides)
+IMAGE_SIZE = 224
+MAX_BYTES = int(os.environ.get("HEALTHAI_IMAGE_MAX_BYTES", 25 * 2**20))
+MAX_PIXELS = int(os.environ.get("HEALTHAI_IMAGE_MAX_PIXELS", 50_000_000))
+MAX_BATCH = int(os.environ.get("HEALTHAI_IMAGE_MAX_BATCH", 32))
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+
+# JPEG start-of-frame markers (all except DHT, JPG and DAC)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+REDUCED_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+class ImageError(ValueError):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Header Sniffing
+# Format and dimensions come from the JPEG or PNG header, so oversized
+# uploads are rejected before any pixel is decoded. Other formats OpenCV
+# reads (BMP, TIFF, WebP, ...) are sniffed as None and checked once
+# decoded.
+def _jpeg_size(contents):
+    i = 2
+    while i + 9 < len(contents):
+        if contents[i] != 0xFF:
+            raise ImageError("corrupt JPEG header")
+        marker = contents[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in SOF_MARKERS:
+            height, width = struct.unpack(">HH", contents[i + 5:i + 9])
+            return width, height
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            i += 2
+        else:
+            i += 2 + struct.unpack(">H", contents[i + 2:i + 4])[0]
+    raise ImageError("corrupt JPEG header")
+
+
+def sniff_image(contents):
+    if contents.startswith(PNG_SIGNATURE) and len(contents) >= 24 and contents[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", contents[16:24])
+        return "png", width, height
+    if contents.startswith(JPEG_SIGNATURE):
+        return ("jpeg", *_jpeg_size(contents))
+    return None, None, None
+
+
+# Decoding
+# Large JPEGs are decoded at 1/2, 1/4 or 1/8 scale by libjpeg itself, as
+# long as the reduced image still covers the 224x224 model input.
+def decode_flag(fmt, width, height):
+    if fmt == "jpeg":
+        for factor, flag in REDUCED_FLAGS:
+            if min(width, height) // factor >= IMAGE_SIZE:
+                return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_image(contents):
+    if not contents:
+        raise ImageError("empty upload")
+    if len(contents) > MAX_BYTES:
+        raise ImageError(f"upload exceeds {MAX_BYTES} bytes", status_code=413)
+
+    fmt, width, height = sniff_image(contents)
+    if fmt is not None:
+        if width == 0 or height == 0:
+            raise ImageError("image has no pixels")
+        if width * height > MAX_PIXELS:
+            raise ImageError(f"image exceeds {MAX_PIXELS} pixels", status_code=413)
+
+    with model_stage("image", "decode"):
+        img = cv2.imdecode(np.frombuffer(contents, np.uint8), decode_flag(fmt, width, height))
+    if img is None:
+        if fmt is None:
+            raise ImageError("unsupported or corrupt image", status_code=415)
+        raise ImageError(f"could not decode {fmt.upper()} image")
+    if fmt is None and img.shape[0] * img.shape[1] > MAX_PIXELS:
+        raise ImageError(f"image exceeds {MAX_PIXELS} pixels", status_code=413)
+
+    # Model input is 224x224 BGR uint8 here; see to_model_input
+    with model_stage("image", "resize"):
+        return cv2.resize(img, (IMAGE_SIZE, IMAGE_SIZE))
+
+
+# Model Input
+# Channel swap (BGR -> RGB), float32 conversion and /255 scaling happen in
+# one numpy pass, written into a per-thread buffer reused across batches.
+_buffers = threading.local()
+
+
+def input_buffer(n):
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None or len(buffer) < n:
+        buffer = np.empty((max(n, MAX_BATCH), IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+        _buffers.buffer = buffer
+    return buffer[:n]
+
+
+def to_model_input(images):
+    out = input_buffer(len(images))
+    for i, img in enumerate(images):
+        np.divide(img[..., ::-1], np.float32(255.0), out=out[i], casting="unsafe")
+    return out
@@ -1,36 +1,149 @@
+import functools
+import time
+
 import numpy as np
-from loaders import *
-from tensorflow.keras.preprocessing.sequence import pad_sequences
+from loaders import registry
+from batching import MicroBatcher, batch_config
+from text_vectorizer import CompiledVocabulary
+from image_pipeline import decode_image, to_model_input
+from metrics import batch_size, model_stage
+from sentiment_cascade import cascade as sentiment_cascade
+from feature_store import feature_store
+from model_versions import versions
+from similarity import IndexUnavailableError
+
+
+# Shadow Scoring
+# While a candidate version of the group is shadowed (model_versions.py),
+# a sample of these calls is repeated on it in the background
+def shadowed(group):
+    def wrap(fn):
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            shadow = versions.shadows.get(group)
+            if shadow is None or registry.is_pinned():
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            shadow.observe(functools.partial(fn, *args, **kwargs), result, time.perf_counter() - start)
+            return result
+        return call
+    return wrap
 
 
 # 1. Risk Stratification
+@shadowed("risk")
 def predict_risk(features):
-    return int(
-        risk_model.predict([features])[0]
-    )
+    risk_model = registry.get("risk_model")
+    with model_stage("risk", "predict"):
+        return int(
+            risk_model.predict([features])[0]
+        )
 
 # 2. Length of Stay Prediction
+@shadowed("los")
 def predict_los(features):
-    return float(
-        los_model.predict([features])[0]
-    )
+    los_model = registry.get("los_model")
+    with model_stage("los", "predict"):
+        return float(
+            los_model.predict([features])[0]
+        )
 
 # 3. Patient Segmentation
+@shadowed("segment")
 def predict_segment(features):
-    features_scaled = scaler.transform([features])
-    return int(
-        kmeans_model.predict(features_scaled)[0]
+    scaler, kmeans_model = registry.get_many("scaler", "kmeans_model")
+    with model_stage("segment", "scale"):
+        features_scaled = scaler.transform([features])
+    with model_stage("segment", "predict"):
+        return int(
+            kmeans_model.predict(features_scaled)[0]
+        )
+
+# Batch Scoring (tabular models)
+BATCH_CHUNK_SIZE = 1024
+
+
+# rows: list of lists (JSON) or a 2-D float array (binary payloads)
+def _predict_rows(rows, n_features, predict_fn, key, cast, offset=0, model=None):
+    results = [None] * len(rows)
+    batch_size.observe(len(rows), model)
+
+    if isinstance(rows, np.ndarray):
+        valid = list(range(len(rows))) if rows.shape[1] == n_features else []
+        lengths = [rows.shape[1]] * len(rows)
+    else:
+        valid = [i for i, row in enumerate(rows) if len(row) == n_features]
+        lengths = [len(row) for row in rows]
+
+    if len(valid) < len(rows):
+        for i, length in enumerate(lengths):
+            if length != n_features:
+                results[i] = {
+                    "index": offset + i,
+                    "error": f"expected {n_features} features, got {length}"
+                }
+
+    if valid:
+        if isinstance(rows, np.ndarray):
+            X = rows
+        else:
+            X = np.array([rows[i] for i in valid], dtype=np.float64)
+        finite = np.isfinite(X).all(axis=1)
+
+        with model_stage(model, "predict_batch"):
+            if finite.all():
+                preds = predict_fn(X)
+            else:
+                preds = predict_fn(X[finite]) if finite.any() else []
+        preds = iter(preds)
+
+        for i, ok in zip(valid, finite):
+            if ok:
+                results[i] = {"index": offset + i, key: cast(next(preds))}
+            else:
+                results[i] = {
+                    "index": offset + i,
+                    "error": "features must be finite numbers"
+                }
+
+    return results
+
+
+@shadowed("risk")
+def predict_risk_batch(rows, offset=0):
+    risk_model = registry.get("risk_model")
+    return _predict_rows(
+        rows, risk_model.n_features_in_, risk_model.predict,
+        "risk_class", int, offset, "risk"
     )
 
-# 4. Imaging Diagnosis
-def predict_image(img_array):
-    img = img_array / 255.0
-    img = np.expand_dims(img, axis=0)
 
-    prob = float(
-        image_model.predict(img)[0][0]
+@shadowed("los")
+def predict_los_batch(rows, offset=0):
+    los_model = registry.get("los_model")
+    return _predict_rows(
+        rows, los_model.n_features_in_, los_model.predict,
+        "length_of_stay", float, offset, "los"
     )
 
+
+@shadowed("segment")
+def predict_segment_batch(rows, offset=0):
+    scaler, kmeans_model = registry.get_many("scaler", "kmeans_model")
+    return _predict_rows(
+        rows, scaler.n_features_in_,
+        lambda X: kmeans_model.predict(scaler.transform(X)),
+        "cluster", int, offset, "segment"
+    )
+
+
+def iter_batch_predictions(predict_batch, rows, chunk_size=BATCH_CHUNK_SIZE):
+    for start in range(0, len(rows), chunk_size):
+        yield from predict_batch(rows[start:start + chunk_size], offset=start)
+
+# 4. Imaging Diagnosis
+def _image_result(prob):
     if prob >= 0.5:
         return {
             "Result": "Cancer",
@@ -41,32 +154,294 @@ def predict_image(img_array):
             "Result": "Normal"
         }
 
+
+# images: 224x224 BGR uint8 arrays from decode_image
+@shadowed("image")
+def predict_image_batch(images):
+    image_model = registry.get("image_model")
+    with model_stage("image", "scale"):
+        batch = to_model_input(images)
+
+    with model_stage("image", "predict"):
+        probs = image_model.predict(batch, verbose=0)[:, 0]
+
+    return [_image_result(float(prob)) for prob in probs]
+
+
+image_batcher = MicroBatcher(
+    "image", predict_image_batch, **batch_config("image")
+)
+
+
+def predict_image(img_array):
+    return image_batcher.predict(img_array)
+
 # 5. Sequence Modeling
-def predict_sequence(sequence):
-    seq = np.array(sequence, dtype=np.float32)
-    t, f = seq.shape
+def check_sequence(sequence, n_features):
+    try:
+        # Values beyond float32 become inf, which the finiteness check rejects
+        with np.errstate(over="ignore"):
+            seq = np.asarray(sequence, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError("sequence must be a list of equal-length timesteps")
+    if seq.ndim != 2 or not len(seq):
+        raise ValueError("sequence must be a non-empty list of timesteps")
+    if seq.shape[1] != n_features:
+        raise ValueError(f"expected {n_features} features per timestep, got {seq.shape[1]}")
+    if not np.isfinite(seq).all():
+        raise ValueError("sequence values must be finite numbers")
+    return seq
 
-    seq_scaled = (
-        sequence_scaler
-        .transform(seq.reshape(-1, f))
-        .reshape(1, t, f)
-    )
 
-    prediction = sequence_model.predict(
-        seq_scaled,
-        verbose=0
-    )
+# Each sequence is checked on its own; an invalid one gets its ValueError
+# in place of a probability (the micro-batcher raises it to that caller
+# only) and the rest of the batch is scored
+@shadowed("sequence")
+def predict_sequence_batch(sequences):
+    sequence_model, sequence_scaler = registry.get_many("sequence_model", "sequence_scaler")
+    results = [None] * len(sequences)
 
-    return float(prediction[0][0])
+    # Sequences of equal shape share one forward pass
+    seqs, groups = {}, {}
+    for i, sequence in enumerate(sequences):
+        try:
+            seqs[i] = check_sequence(sequence, sequence_scaler.n_features_in_)
+        except ValueError as exc:
+            results[i] = exc
+            continue
+        groups.setdefault(seqs[i].shape, []).append(i)
 
-# 6. Sentiment Analysis
-def predict_sentiment(text):
-    seq = sentiment_tokenizer.texts_to_sequences([text])
-    padded = pad_sequences(seq, maxlen=100)
+    for (t, f), idx in groups.items():
+        batch = np.stack([seqs[i] for i in idx])
 
-    prob = sentiment_model.predict(padded)[0][0]
+        with model_stage("sequence", "scale"):
+            batch_scaled = (
+                sequence_scaler
+                .transform(batch.reshape(-1, f))
+                .reshape(len(idx), t, f)
+            )
 
+        with model_stage("sequence", "predict"):
+            prediction = sequence_model.predict(
+                batch_scaled,
+                verbose=0
+            )
+
+        for i, prob in zip(idx, prediction[:, 0]):
+            results[i] = float(prob)
+
+    return results
+
+
+sequence_batcher = MicroBatcher(
+    "sequence", predict_sequence_batch, **batch_config("sequence")
+)
+
+
+def predict_sequence(sequence):
+    return sequence_batcher.predict(sequence)
+
+# 6. Sentiment Analysis
+def _sentiment_result(prob):
     return {
         "probability": float(prob),
         "label": "Positive" if prob > 0.5 else "Negative"
     }
+
+
+# Two entries: the served tokenizer and a shadow or warming candidate
+_vocabularies = {}
+
+
+def get_vocabulary(tokenizer):
+    key = id(tokenizer)
+    if key not in _vocabularies:
+        while len(_vocabularies) >= 2:
+            del _vocabularies[next(iter(_vocabularies))]
+        try:
+            _vocabularies[key] = CompiledVocabulary.from_tokenizer(tokenizer, maxlen=100)
+        except ValueError:
+            _vocabularies[key] = None
+    return _vocabularies[key]
+
+
+def vectorize_texts(texts):
+    sentiment_tokenizer = registry.get("sentiment_tokenizer")
+
+    vocabulary = get_vocabulary(sentiment_tokenizer)
+    if vocabulary is not None:
+        return vocabulary.transform(texts)
+
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+    seq = sentiment_tokenizer.texts_to_sequences(texts)
+    return pad_sequences(seq, maxlen=100)
+
+
+# predict_on_batch runs the compiled forward pass directly; predict() sets
+# up a data pipeline per call (over 100 ms on CPU), which would dominate
+# the small, uneven batches the cascade sends to the CNN
+@shadowed("sentiment")
+def predict_sentiment_cnn(texts):
+    sentiment_model = registry.get("sentiment_model")
+    with model_stage("sentiment", "tokenize"):
+        padded = vectorize_texts(texts)
+
+    probs = np.zeros(len(padded), dtype=np.float32)
+    with model_stage("sentiment", "predict"):
+        for i in range(0, len(padded), BATCH_CHUNK_SIZE):
+            chunk = sentiment_model.predict_on_batch(padded[i:i + BATCH_CHUNK_SIZE])
+            probs[i:i + BATCH_CHUNK_SIZE] = np.asarray(chunk)[:, 0]
+    return probs
+
+
+# With HEALTHAI_SENTIMENT_CASCADE=1 the linear model answers the clear-cut
+# texts and only the uncertain ones reach the CNN ("model" in the result)
+def predict_sentiment_batch(texts):
+    if not sentiment_cascade.enabled:
+        return [_sentiment_result(prob) for prob in predict_sentiment_cnn(texts)]
+
+    linear = registry.get("sentiment_linear")
+    with model_stage("sentiment", "cascade"):
+        probs, models = sentiment_cascade.score(texts, linear, predict_sentiment_cnn)
+    return [
+        {**_sentiment_result(prob), "model": str(model)} for prob, model in zip(probs, models)
+    ]
+
+
+sentiment_batcher = MicroBatcher(
+    "sentiment", predict_sentiment_batch, **batch_config("sentiment")
+)
+
+
+def predict_sentiment(text):
+    return sentiment_batcher.predict(text)
+
+
+# 7. Medical Associations
+# conditions: item names (e.g. "hypertension"); measurements: raw values
+# the lab/demographic indicators are derived from (glucose_level, age, ...)
+@shadowed("associations")
+def match_associations(conditions, measurements=None, include_known=False, limit=None):
+    index = registry.get("association_rules")
+    with model_stage("associations", "match"):
+        items = index.items_for(conditions, measurements)
+        return {
+            "items": items,
+            "rules": index.match(items, include_known=include_known, limit=limit),
+        }
+
+
+# 8. Similar Patients
+@shadowed("similar")
+def find_similar(features, k=10):
+    index = registry.get("similarity_index")
+    # Checked against the segmentation models wherever they are served
+    if registry.is_enabled("segment") and not index.built_with(*registry.get_many("scaler", "kmeans_model")):
+        raise IndexUnavailableError(
+            "similarity index was built with other segmentation models; run similarity.py build"
+        )
+    n_features = len(index.meta["features"])
+    if len(features) != n_features:
+        raise ValueError(f"expected {n_features} features, got {len(features)}")
+
+    index.refresh()
+    with model_stage("similar", "search"):
+        return index.neighbours(features, k)
+
+
+# 9. Scoring by Admission ID
+# Rows come from the feature store (feature_store.py), already encoded and
+# in model order; results are in request order, unknown IDs as errors.
+UNKNOWN_ADMISSION = "unknown admission"
+
+
+# lookup(store) returns the rows of the known ids and which ids were known
+def _predict_ids(ids, lookup, n_features, predict_fn, key, cast, model):
+    with model_stage(model, "lookup"):
+        X, found = lookup(feature_store())
+    scored = iter(_predict_rows(X, n_features, predict_fn, key, cast, model=model) if len(X) else [])
+
+    results = []
+    for i, (admission_id, known) in enumerate(zip(ids, found.tolist())):
+        result = next(scored) if known else {"error": UNKNOWN_ADMISSION}
+        result.pop("index", None)
+        results.append({"index": i, "admission_id": admission_id, **result})
+    return results
+
+
+@shadowed("risk")
+def predict_risk_ids(ids):
+    risk_model = registry.get("risk_model")
+    return _predict_ids(
+        ids, lambda store: store.rows("risk", ids), risk_model.n_features_in_, risk_model.predict,
+        "risk_class", int, "risk"
+    )
+
+
+@shadowed("los")
+def predict_los_ids(ids):
+    los_model = registry.get("los_model")
+    return _predict_ids(
+        ids, lambda store: store.rows("los", ids), los_model.n_features_in_, los_model.predict,
+        "length_of_stay", float, "los"
+    )
+
+
+# The scaled rows are used while they match the loaded scaler
+@shadowed("segment")
+def predict_segment_ids(ids):
+    scaler, kmeans_model = registry.get_many("scaler", "kmeans_model")
+    if feature_store().scaled_with(scaler):
+        lookup, predict_fn = lambda store: store.scaled_rows(ids, scaler), kmeans_model.predict
+    else:
+        lookup = lambda store: store.rows("segment", ids)
+        predict_fn = lambda X: kmeans_model.predict(scaler.transform(X))
+    return _predict_ids(
+        ids, lookup, scaler.n_features_in_, predict_fn, "cluster", int, "segment"
+    )
+
+
+def update_admission(admission_id, values):
+    scaler = registry.get("scaler") if registry.is_enabled("segment") else None
+    return feature_store().update(admission_id, values, scaler)
+
+
+BATCHERS = {
+    "image": image_batcher,
+    "sequence": sequence_batcher,
+    "sentiment": sentiment_batcher,
+}
+
+
+# Warmup (one representative inference per model group)
+def _warmup_image():
+    predict_image_batch([np.zeros((224, 224, 3), dtype=np.uint8)])
+
+
+def _warmup_sequence():
+    n_features = registry.get("sequence_scaler").n_features_in_
+    predict_sequence_batch([[[0.0] * n_features]])
+
+
+# The CNN is traced even if the cascade's linear model settles the text
+def _warmup_sentiment():
+    predict_sentiment_cnn(["warmup"])
+    predict_sentiment_batch(["warmup"])
+
+
+registry.register_warmup(
+    "risk", lambda: predict_risk_batch([[0.0] * registry.get("risk_model").n_features_in_])
+)
+registry.register_warmup(
+    "los", lambda: predict_los_batch([[0.0] * registry.get("los_model").n_features_in_])
+)
+registry.register_warmup(
+    "segment", lambda: predict_segment_batch([[0.0] * registry.get("scaler").n_features_in_])
+)
+registry.register_warmup("image", _warmup_image)
+registry.register_warmup("sequence", _warmup_sequence)
+registry.register_warmup("sentiment", _warmup_sentiment)
+registry.register_warmup("associations", lambda: match_associations([]))
+registry.register_warmup(
+    "similar", lambda: find_similar([0.0] * len(registry.get("similarity_index").meta["features"]))
+)
@@ -0,0 +1,232 @@
+import asyncio
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+import pandas as pd
+from inference import check_sequence
+from loaders import registry
+from sessions import SessionLimitError, SessionManager
+
+
+# Ingestion configuration (environment overrides)
+TICK_SECONDS = float(os.environ.get("HEALTHAI_INGEST_TICK_SECONDS", 1.0))
+MAX_PATIENTS = int(os.environ.get("HEALTHAI_INGEST_MAX_PATIENTS", 10000))
+IDLE_SECONDS = float(os.environ.get("HEALTHAI_INGEST_IDLE_SECONDS", 3600))
+ALERT_THRESHOLD = float(os.environ.get("HEALTHAI_INGEST_ALERT_THRESHOLD", 0.5))
+WATCH_DIR = os.environ.get("HEALTHAI_INGEST_DIR")
+WATCH_SECONDS = float(os.environ.get("HEALTHAI_INGEST_WATCH_SECONDS", 2.0))
+
+
+# Multi-patient Vitals Ingestor
+# Readings are queued per patient. Every tick the next pending row of every
+# patient is scored together in one batched RNN step, until all queues drain.
+class VitalsIngestor:
+    def __init__(self, max_patients=MAX_PATIENTS, idle_seconds=IDLE_SECONDS,
+                 threshold=ALERT_THRESHOLD):
+        self.sessions = SessionManager(max_sessions=max_patients, idle_seconds=idle_seconds)
+        self.threshold = threshold
+
+        self.pending = {}
+        self.abnormal = set()
+        self.subscribers = set()
+
+        # Patients in the round being scored, and those removed meanwhile
+        self._in_flight = set()
+        self._removals = set()
+
+        self.ticks = 0
+        self.patient_ticks = 0
+        self.alerts = 0
+        self.last_tick_rate = 0.0
+
+    def push(self, readings):
+        n_features = registry.get("sequence_scaler").n_features_in_
+        accepted, rejected = 0, []
+
+        # Checked here, not in the tick: one NaN or inf reading would fail
+        # the whole round and poison the patient's session
+        for patient_id, values in readings:
+            try:
+                check_sequence([values], n_features)
+            except ValueError as exc:
+                rejected.append({"patient_id": patient_id, "error": str(exc)})
+                continue
+            try:
+                self._live_session(patient_id)
+            except SessionLimitError as exc:
+                rejected.append({"patient_id": patient_id, "error": str(exc)})
+                continue
+
+            self._removals.discard(patient_id)
+            self.pending.setdefault(patient_id, deque()).append(values)
+            accepted += 1
+
+        return {"accepted": accepted, "rejected": rejected}
+
+    # A patient back after their session expired starts a fresh history
+    def _live_session(self, patient_id):
+        try:
+            return self.sessions.get(patient_id)
+        except KeyError:
+            self.sessions.close(patient_id)
+            return self.sessions.open(patient_id)
+
+    # Runs on the event loop, like push() and the tick. A patient in the
+    # round being scored keeps its session until the round ends.
+    def remove(self, patient_id):
+        self.pending.pop(patient_id, None)
+        self.abnormal.discard(patient_id)
+        if patient_id in self._in_flight:
+            self._removals.add(patient_id)
+            return True
+        return self.sessions.close(patient_id)
+
+    # Patients whose session closed since their rows were queued (expired
+    # or evicted) are dropped, not allowed to fail the whole round
+    def _next_round(self):
+        ids, rows = [], []
+        for patient_id in list(self.pending):
+            queue = self.pending[patient_id]
+            try:
+                self.sessions.get(patient_id)
+            except KeyError:
+                del self.pending[patient_id]
+                continue
+            ids.append(patient_id)
+            rows.append(queue.popleft())
+            if not queue:
+                del self.pending[patient_id]
+        return ids, rows
+
+    async def process_pending(self):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        scored = 0
+
+        while self.pending:
+            ids, rows = self._next_round()
+            if not ids:
+                break
+            self._in_flight = set(ids)
+            try:
+                results = await loop.run_in_executor(None, self.sessions.push_many, ids, rows)
+            finally:
+                self._in_flight = set()
+                removed, self._removals = self._removals, set()
+                for patient_id in removed:
+                    self.sessions.close(patient_id)
+            scored += len(results)
+
+            for result in results:
+                if result["session_id"] not in removed:
+                    self._check_alert(result)
+
+        if scored:
+            self.ticks += 1
+            self.patient_ticks += scored
+            self.last_tick_rate = scored / (time.perf_counter() - start)
+        return scored
+
+    async def run(self, tick_seconds=TICK_SECONDS):
+        while True:
+            try:
+                await self.process_pending()
+            except Exception as exc:
+                self._publish({"event": "error", "detail": str(exc)})
+            await asyncio.sleep(tick_seconds)
+
+    # Deterioration Alerts
+    def _check_alert(self, result):
+        patient_id = result["session_id"]
+        is_abnormal = result["prediction"] >= self.threshold
+
+        if is_abnormal and patient_id not in self.abnormal:
+            self.abnormal.add(patient_id)
+            self.alerts += 1
+            self._publish({"event": "deterioration", **result})
+        elif not is_abnormal and patient_id in self.abnormal:
+            self.abnormal.discard(patient_id)
+            self._publish({"event": "recovered", **result})
+
+    def _publish(self, event):
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def subscribe(self):
+        queue = asyncio.Queue(maxsize=1000)
+        self.subscribers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers.discard(queue)
+
+    def stats(self):
+        return {
+            **self.sessions.stats(),
+            "pending_rows": sum(len(q) for q in self.pending.values()),
+            "abnormal_patients": len(self.abnormal),
+            "ticks": self.ticks,
+            "patient_ticks": self.patient_ticks,
+            "alerts": self.alerts,
+            "last_tick_patient_ticks_per_second": self.last_tick_rate,
+            "subscribers": len(self.subscribers),
+        }
+
+
+# Directory Tailer
+# Each CSV/XLSX file in the watched directory is one patient (file stem is
+# the patient id). Rows appended to a file are ingested on the next poll.
+def read_vitals_file(path, skip_rows):
+    if path.suffix == ".csv":
+        df = pd.read_csv(path, skiprows=range(1, skip_rows + 1))
+    else:
+        df = pd.read_excel(path).iloc[skip_rows:]
+    return df.values.tolist()
+
+
+class DirectoryTailer:
+    def __init__(self, ingestor, directory, poll_seconds=WATCH_SECONDS):
+        self.ingestor = ingestor
+        self.directory = Path(directory)
+        self.poll_seconds = poll_seconds
+        self.offsets = {}
+        self.mtimes = {}
+
+    async def poll(self):
+        loop = asyncio.get_running_loop()
+        ingested = 0
+
+        for path in sorted(self.directory.iterdir()):
+            if path.suffix not in (".csv", ".xlsx"):
+                continue
+
+            mtime = path.stat().st_mtime_ns
+            if self.mtimes.get(path) == mtime:
+                continue
+
+            offset = self.offsets.get(path, 0)
+            rows = await loop.run_in_executor(None, read_vitals_file, path, offset)
+
+            result = self.ingestor.push([(path.stem, row) for row in rows])
+            ingested += result["accepted"]
+
+            self.offsets[path] = offset + len(rows)
+            self.mtimes[path] = mtime
+
+        return ingested
+
+    async def run(self):
+        while True:
+            try:
+                await self.poll()
+            except Exception as exc:
+                self.ingestor._publish({"event": "error", "detail": str(exc)})
+            await asyncio.sleep(self.poll_seconds)
+
+
+ingestor = VitalsIngestor()
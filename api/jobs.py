@@ -0,0 +1,634 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from collections import Counter
+from pathlib import Path
+
+import orjson
+
+from batch_score import TASKS, input_columns, read_chunks
+from features import encode
+from loaders import ModelDisabledError, registry
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "data"
+
+# Job queue configuration (environment overrides)
+JOBS_DIR = Path(os.environ.get("HEALTHAI_JOBS_DIR", DATA_DIR / "jobs"))
+JOB_WORKERS = int(os.environ.get("HEALTHAI_JOB_WORKERS", 1))
+MAX_RUNNING = int(os.environ.get("HEALTHAI_JOBS_MAX_RUNNING", JOB_WORKERS))
+MAX_QUEUED = int(os.environ.get("HEALTHAI_JOBS_MAX_QUEUED", 100))
+CHUNK_ROWS = int(os.environ.get("HEALTHAI_JOB_CHUNK_ROWS", 2048))
+MAX_UPLOAD_BYTES = int(os.environ.get("HEALTHAI_JOB_MAX_UPLOAD_BYTES", 2**30))
+POLL_SECONDS = float(os.environ.get("HEALTHAI_JOB_POLL_SECONDS", 1.0))
+STALE_SECONDS = float(os.environ.get("HEALTHAI_JOB_STALE_SECONDS", 600))
+KEEP_SECONDS = float(os.environ.get("HEALTHAI_JOB_KEEP_SECONDS", 7 * 86400))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Job kinds are model groups; tabular and sentiment jobs read the same
+# inputs as batch_score.py, image jobs a .zip or a directory of images
+KINDS = ["risk", "los", "segment", "sentiment", "image"]
+TABULAR_SUFFIXES = (".csv", ".xlsx", ".xlsm", ".parquet")
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+RESULTS = "results.ndjson"
+
+
+class JobError(ValueError):
+    def __init__(self, message, status_code=422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class JobQueueFullError(JobError):
+    def __init__(self, message):
+        super().__init__(message, status_code=429)
+
+
+def log(message):
+    print(f"[jobs {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def _timestamp(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(seconds)) if seconds else None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Datasets
+# Named references to data already on the server (with the text column a
+# sentiment job reads by default), or any path under data/
+def _admissions():
+    import data_store
+    if (data_store.STORE_DIR / data_store.MANIFEST).exists():
+        return data_store.STORE_DIR
+    return DATA_DIR / "cleaned_data.csv"
+
+
+DATASETS = {
+    "admissions": (_admissions, None),
+    "hospital_reviews": (lambda: DATA_DIR / "hospital_reviews" / "hospital_reviews.csv", "Feedback"),
+}
+
+
+def resolve_dataset(name):
+    if name in DATASETS:
+        path, column = DATASETS[name]
+        return path(), column
+    path = (DATA_DIR / name).resolve()
+    if not path.is_relative_to(DATA_DIR.resolve()) or not path.exists():
+        raise JobError(f"unknown dataset '{name}' (expected one of {sorted(DATASETS)} or a path under data/)")
+    return path, None
+
+
+# Inputs
+# Chunks are cut from the input alone, so a resumed job skips exactly the
+# chunks it already wrote. Frames (or image names) are only encoded (read)
+# when a chunk is scored.
+def image_names(path):
+    path = Path(path)
+    if path.is_dir():
+        return sorted(
+            str(p.relative_to(path)) for p in path.rglob("*")
+            if p.is_file() and p.suffix.lower() in IMAGE_SUFFIXES
+        )
+    with zipfile.ZipFile(path) as archive:
+        return [info.filename for info in archive.infolist() if not info.is_dir()]
+
+
+def input_settings(kind, path, column=None, id_column=None):
+    if kind == "image":
+        try:
+            names = image_names(path)
+        except zipfile.BadZipFile:
+            raise JobError("image jobs take image files, a .zip of images or an image directory")
+        if not names:
+            raise JobError(f"{Path(path).name} contains no images")
+        return {}
+
+    try:
+        available = input_columns(path)
+    except (ValueError, OSError) as exc:
+        raise JobError(str(exc))
+    columns = [column or "text"] if kind == "sentiment" else list(TASKS[kind][1])
+    if id_column is None and kind != "sentiment" and "serial_no" in available:
+        id_column = "serial_no"
+    if id_column:
+        columns.append(id_column)
+    missing = [c for c in columns if c not in available]
+    if missing:
+        raise JobError(f"{Path(path).name} has no columns {missing}")
+    return {"columns": columns, "id_column": id_column}
+
+
+def count_rows(kind, path):
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if kind == "image":
+        return len(image_names(path))
+    if path.is_dir():
+        import data_store
+        return data_store.dataset(path).count_rows()
+    if suffix == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    if suffix == ".csv":
+        # One parse of the first column (quoted newlines count correctly)
+        import pandas as pd
+        with pd.read_csv(path, usecols=[0], chunksize=1_000_000, encoding="utf-8-sig") as reader:
+            return sum(len(chunk) for chunk in reader)
+    return None
+
+
+def iter_chunks(kind, path, settings, chunk_rows=CHUNK_ROWS):
+    if kind == "image":
+        from image_pipeline import MAX_BATCH
+        names = image_names(path)
+        for start in range(0, len(names), MAX_BATCH):
+            yield names[start:start + MAX_BATCH]
+        return
+    yield from read_chunks(path, settings["columns"], chunk_rows)
+
+
+# Scoring
+# One batched model call per chunk; bad rows or images only fail their
+# own result line.
+def score_chunk(kind, path, settings, chunk, offset):
+    import inference
+
+    if kind == "image":
+        from image_pipeline import ImageError, decode_image
+
+        results, images, positions = [], [], []
+        archive = None if Path(path).is_dir() else zipfile.ZipFile(path)
+        try:
+            for i, name in enumerate(chunk):
+                try:
+                    contents = (Path(path) / name).read_bytes() if archive is None else archive.read(name)
+                    images.append(decode_image(contents))
+                    positions.append(i)
+                    results.append({"index": offset + i, "filename": name})
+                except (ImageError, KeyError, OSError) as exc:
+                    results.append({"index": offset + i, "filename": name, "error": str(exc)})
+        finally:
+            if archive is not None:
+                archive.close()
+        if images:
+            for i, result in zip(positions, inference.predict_image_batch(images)):
+                results[i].update(result)
+        return results
+
+    if kind == "sentiment":
+        texts = chunk[settings["columns"][0]].fillna("").astype(str).tolist()
+        return [
+            {"index": offset + i, **result}
+            for i, result in enumerate(inference.predict_sentiment_batch(texts))
+        ]
+
+    predict = {
+        "risk": inference.predict_risk_batch,
+        "los": inference.predict_los_batch,
+        "segment": inference.predict_segment_batch,
+    }[kind]
+    results = predict(encode(chunk, TASKS[kind][1]), offset)
+    id_column = settings["id_column"]
+    if id_column:
+        for result, value in zip(results, chunk[id_column].tolist()):
+            result[id_column] = value
+    return results
+
+
+# Job Queue
+# Jobs live in a SQLite table (WAL, like the result cache's disk tier) next
+# to one directory per job holding the upload and results.ndjson. Worker
+# threads claim queued jobs in submission order, at most MAX_RUNNING at a
+# time across every process sharing the database, and commit each scored
+# chunk (appended results, then progress) before starting the next, so
+# cancellation takes effect between chunks and a job interrupted by a
+# restart or crash resumes after its last committed chunk. Results are
+# not fsynced per chunk: a process crash loses nothing (the lines are in
+# the page cache), a host crash may, and the job is then redone.
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, kind TEXT, status TEXT, source TEXT, path TEXT, settings TEXT, "
+    "submitted REAL, started REAL, finished REAL, heartbeat REAL, owner INTEGER, "
+    "attempts INTEGER DEFAULT 0, cancel INTEGER DEFAULT 0, error TEXT, "
+    "rows_total INTEGER, rows_done INTEGER DEFAULT 0, chunks_done INTEGER DEFAULT 0, "
+    "errors INTEGER DEFAULT 0, seconds REAL DEFAULT 0, result_bytes INTEGER DEFAULT 0)"
+)
+
+
+class JobQueue:
+    def __init__(self, path=JOBS_DIR, workers=JOB_WORKERS, max_running=MAX_RUNNING,
+                 max_queued=MAX_QUEUED, chunk_rows=CHUNK_ROWS):
+        self.path = Path(path)
+        self.workers = workers
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.chunk_rows = chunk_rows
+
+        # Rows and scoring time of this process's workers, by kind
+        self.scored = Counter()
+        self.seconds = Counter()
+
+        self.conn = None
+        self.lock = threading.Lock()
+        self.active = set()
+        self._threads = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def _db(self):
+        if self.conn is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path / "jobs.db", check_same_thread=False,
+                                   isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted)")
+            self.conn = conn
+        return self.conn
+
+    def _execute(self, sql, args=()):
+        with self.lock:
+            return self._db().execute(sql, args).fetchall()
+
+    def _update(self, job_id, **values):
+        columns = ", ".join(f"{name} = ?" for name in values)
+        self._execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*values.values(), job_id))
+
+    def directory(self, job_id):
+        return self.path / job_id
+
+    # Submission
+    # uploads: (filename, file object) pairs, copied into the job
+    # directory; several image files are packed into one .zip
+    def _save_uploads(self, kind, directory, uploads):
+        names = [Path(filename or "upload").name for filename, _ in uploads]
+        if kind == "image" and not (len(uploads) == 1 and names[0].lower().endswith(".zip")):
+            target = directory / "input.zip"
+            with zipfile.ZipFile(target, "w", zipfile.ZIP_STORED) as archive:
+                for i, (name, (_, fileobj)) in enumerate(zip(names, uploads)):
+                    with archive.open(f"{i:06d}_{name}", "w") as out:
+                        self._copy(fileobj, out)
+            return target, ", ".join(names)
+
+        if len(uploads) != 1:
+            raise JobError(f"{kind} jobs take a single file")
+        suffix = Path(names[0]).suffix.lower()
+        if kind != "image" and suffix not in TABULAR_SUFFIXES:
+            raise JobError(f"unsupported file type {suffix or names[0]} (expected .csv, .xlsx or .parquet)")
+        target = directory / f"input{suffix}"
+        with open(target, "wb") as out:
+            self._copy(uploads[0][1], out)
+        return target, names[0]
+
+    def _copy(self, fileobj, out):
+        total = out.tell() if out.seekable() else 0
+        while block := fileobj.read(1 << 20):
+            total += len(block)
+            if total > MAX_UPLOAD_BYTES:
+                raise JobError(f"upload exceeds {MAX_UPLOAD_BYTES} bytes", status_code=413)
+            out.write(block)
+
+    def submit(self, kind, dataset=None, uploads=None, column=None, id_column=None):
+        if kind not in KINDS:
+            raise JobError(f"unknown job kind '{kind}'; expected one of {KINDS}")
+        if not registry.is_enabled(kind):
+            raise ModelDisabledError(f"model '{kind}' is not enabled on this worker")
+        if (dataset is None) == (not uploads):
+            raise JobError("send exactly one of a dataset or a file upload")
+
+        queued = self._execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,))[0][0]
+        if queued >= self.max_queued:
+            raise JobQueueFullError(f"{queued} jobs are already queued; retry later")
+
+        job_id = uuid.uuid4().hex
+        directory = self.directory(job_id)
+        directory.mkdir(parents=True)
+        try:
+            if uploads:
+                path, source = self._save_uploads(kind, directory, uploads)
+            else:
+                path, default_column = resolve_dataset(dataset)
+                column, source = column or default_column, dataset
+            settings = input_settings(kind, path, column, id_column)
+        except Exception:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+
+        self._execute(
+            "INSERT INTO jobs (id, kind, status, source, path, settings, submitted) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, source, str(path), json.dumps(settings), time.time()),
+        )
+        self._wake.set()
+        return self.get(job_id)
+
+    # Progress
+    def _info(self, row):
+        now = time.time()
+        end = row["finished"] or now
+        started, done, total = row["started"], row["rows_done"], row["rows_total"]
+        rate = done / row["seconds"] if row["seconds"] else None
+        return {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "source": row["source"],
+            "submitted": _timestamp(row["submitted"]),
+            "started": _timestamp(started),
+            "finished": _timestamp(row["finished"]),
+            "rows_total": total,
+            "rows_done": done,
+            "progress": 1.0 if row["status"] == DONE else (done / total if total else None),
+            "errors": row["errors"],
+            "attempts": row["attempts"],
+            "cancel_requested": bool(row["cancel"]) and row["status"] not in FINISHED,
+            "error": row["error"],
+            "throughput": {
+                "rows_per_second": rate,
+                "scoring_seconds": row["seconds"],
+                "queued_seconds": (started or end) - row["submitted"],
+                "elapsed_seconds": end - started if started else None,
+                "eta_seconds": (total - done) / rate
+                if rate and total and row["status"] == RUNNING else None,
+            },
+        }
+
+    def get(self, job_id):
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._info(rows[0]) if rows else None
+
+    def list(self, status=None, limit=50):
+        if status is None:
+            rows = self._execute("SELECT * FROM jobs ORDER BY submitted DESC LIMIT ?", (limit,))
+        else:
+            rows = self._execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY submitted DESC LIMIT ?", (status, limit)
+            )
+        return [self._info(row) for row in rows]
+
+    def counts(self):
+        rows = self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return {status: 0 for status in (QUEUED, RUNNING, *FINISHED)} | dict(map(tuple, rows))
+
+    # Queued jobs are cancelled at once, running ones by their worker
+    # before the next chunk; finished jobs are left as they are
+    def cancel(self, job_id):
+        with self.lock:
+            conn = self._db()
+            conn.execute(
+                "UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+            conn.execute("UPDATE jobs SET cancel = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        return self.get(job_id)
+
+    # Committed result lines; with follow=True, new lines are streamed as
+    # chunks commit until the job finishes
+    def results(self, job_id, follow=False):
+        path = self.directory(job_id) / RESULTS
+        position = 0
+        while True:
+            row = self._execute("SELECT status, result_bytes FROM jobs WHERE id = ?", (job_id,))[0]
+            if row["result_bytes"] > position:
+                with open(path, "rb") as f:
+                    f.seek(position)
+                    while position < row["result_bytes"]:
+                        block = f.read(min(1 << 20, row["result_bytes"] - position))
+                        if not block:
+                            break
+                        position += len(block)
+                        yield block
+            if not follow or row["status"] in FINISHED:
+                return
+            time.sleep(POLL_SECONDS / 4)
+
+    # Workers
+    def _recover(self):
+        # Running jobs whose process is gone (or that stopped reporting
+        # progress) go back to the queue and resume from their last chunk
+        now = time.time()
+        stale = [
+            row["id"] for row in self._execute("SELECT id, owner, heartbeat FROM jobs WHERE status = ?", (RUNNING,))
+            if row["id"] not in self.active
+            and (not _alive(row["owner"]) or row["heartbeat"] < now - STALE_SECONDS)
+        ]
+        for job_id in stale:
+            self._execute("UPDATE jobs SET status = ? WHERE id = ? AND status = ?", (QUEUED, job_id, RUNNING))
+            log(f"requeued interrupted job {job_id}")
+
+        # Finished jobs (and their files) are kept for KEEP_SECONDS
+        expired = self._execute(
+            "SELECT id FROM jobs WHERE status IN (?, ?, ?) AND finished < ?", (*FINISHED, now - KEEP_SECONDS)
+        )
+        for row in expired:
+            shutil.rmtree(self.directory(row["id"]), ignore_errors=True)
+            self._execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+
+    def _claim(self):
+        with self.lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (RUNNING,)).fetchone()[0]
+                row = None
+                if running < self.max_running:
+                    row = conn.execute(
+                        "SELECT * FROM jobs WHERE status = ? ORDER BY submitted LIMIT 1", (QUEUED,)
+                    ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, owner = ?, started = COALESCE(started, ?), "
+                        "heartbeat = ?, attempts = attempts + 1 WHERE id = ?",
+                        (RUNNING, os.getpid(), now, now, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def _finish(self, job_id, status, error=None):
+        self._update(job_id, status=status, finished=time.time(), error=error)
+        log(f"job {job_id} {status}" + (f": {error}" if error else ""))
+
+    def _run(self, job):
+        job_id, kind, path = job["id"], job["kind"], job["path"]
+        settings = json.loads(job["settings"])
+        try:
+            if job["rows_total"] is None:
+                self._update(job_id, rows_total=count_rows(kind, path))
+
+            results = self.directory(job_id) / RESULTS
+            committed = job["result_bytes"]
+            if committed and (not results.exists() or results.stat().st_size < committed):
+                # Committed lines lost with the page cache (a host crash):
+                # the job starts over
+                log(f"job {job_id} lost committed results; restarting it")
+                self._update(job_id, rows_done=0, chunks_done=0, errors=0, seconds=0, result_bytes=0)
+                job = {**job, "chunks_done": 0}
+                committed = 0
+
+            with open(results, "r+b" if results.exists() else "wb") as out:
+                # Lines past the last committed chunk are from an interrupted run
+                out.truncate(committed)
+                out.seek(committed)
+
+                offset = 0
+                for index, chunk in enumerate(iter_chunks(kind, path, settings, self.chunk_rows)):
+                    n = len(chunk)
+                    if index < job["chunks_done"]:
+                        offset += n
+                        continue
+
+                    if self._execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,))[0][0]:
+                        return self._finish(job_id, CANCELLED)
+                    if self._stop.is_set():
+                        self._update(job_id, status=QUEUED)
+                        return
+
+                    start = time.perf_counter()
+                    scored = score_chunk(kind, path, settings, chunk, offset)
+                    seconds = time.perf_counter() - start
+
+                    out.write(b"".join(orjson.dumps(result) + b"\n" for result in scored))
+                    out.flush()
+                    errors = sum("error" in result for result in scored)
+                    self._execute(
+                        "UPDATE jobs SET rows_done = rows_done + ?, chunks_done = ?, errors = errors + ?, "
+                        "seconds = seconds + ?, result_bytes = ?, heartbeat = ? WHERE id = ?",
+                        (n, index + 1, errors, seconds, out.tell(), time.time(), job_id),
+                    )
+                    self.scored[kind] += n
+                    self.seconds[kind] += seconds
+                    offset += n
+            self._finish(job_id, DONE)
+        except (ValueError, LookupError, OSError, zipfile.BadZipFile) as exc:
+            self._finish(job_id, FAILED, str(exc))
+        except Exception as exc:
+            self._finish(job_id, FAILED, repr(exc))
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except sqlite3.Error as exc:
+                log(f"could not claim a job: {exc}")
+                job = None
+            if job is None:
+                self._wake.wait(POLL_SECONDS)
+                self._wake.clear()
+                try:
+                    self._recover()
+                except sqlite3.Error:
+                    pass
+                continue
+            self.active.add(job["id"])
+            try:
+                self._run(job)
+            finally:
+                self.active.discard(job["id"])
+
+    def start(self):
+        if self.workers <= 0 or self._threads:
+            return
+        self._stop.clear()
+        self._recover()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # Running jobs stop after their current chunk and are queued again;
+    # a worker still scoring after `timeout` is left to the next start
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self._threads = []
+
+    def stats(self):
+        return {
+            "workers": len(self._threads),
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "chunk_rows": self.chunk_rows,
+            "jobs": self.counts(),
+            "scored": {
+                kind: {"rows": rows, "rows_per_second": rows / self.seconds[kind] if self.seconds[kind] else None}
+                for kind, rows in self.scored.items()
+            },
+        }
+
+
+jobs = JobQueue()
+
+
+# Command Line
+# python jobs.py list
+# python jobs.py submit segment admissions       (a running API picks it up)
+# python jobs.py submit sentiment reviews.xlsx --column text
+# python jobs.py show <job id>
+# python jobs.py cancel <job id>
+def main():
+    parser = argparse.ArgumentParser(description="Submit, inspect and cancel background scoring jobs")
+    parser.add_argument("command", choices=["list", "submit", "show", "cancel"])
+    parser.add_argument("args", nargs="*", help="kind and dataset or file (submit), job id (show, cancel)")
+    parser.add_argument("--column", help="text column of a sentiment input")
+    parser.add_argument("--id-column", help="ID column copied into tabular results")
+    parser.add_argument("--status", choices=[QUEUED, RUNNING, *FINISHED])
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for job in jobs.list(args.status):
+            progress = f"{job['rows_done']}/{job['rows_total'] if job['rows_total'] is not None else '?'}"
+            print(f"{job['job_id']}  {job['kind']:<9} {job['status']:<9} {progress:>17}  "
+                  f"{job['submitted']}  {job['source']}")
+        return
+
+    if args.command == "submit":
+        if len(args.args) != 2:
+            parser.error("submit needs a kind and a dataset or file")
+        kind, source = args.args
+        if Path(source).is_file():
+            with open(source, "rb") as f:
+                job = jobs.submit(kind, uploads=[(source, f)], column=args.column, id_column=args.id_column)
+        else:
+            job = jobs.submit(kind, dataset=source, column=args.column, id_column=args.id_column)
+    else:
+        if len(args.args) != 1:
+            parser.error(f"{args.command} needs a job id")
+        job = (jobs.get if args.command == "show" else jobs.cancel)(args.args[0])
+        if job is None:
+            raise SystemExit(f"unknown job {args.args[0]}")
+    print(json.dumps(job, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,401 @@
+import hashlib
+import json
+import os
 import pickle
+import resource
+import threading
+import time
 import joblib
-import tensorflow as tf
+from contextlib import contextmanager
 from pathlib import Path
 
-BASE_PATH = Path(__file__).parent / "models"
+from associations import load_rules_index
+from sentiment_cascade import load_linear_sentiment
+from shared_models import MMAP_MODELS, is_current, load_shared, shared_path
+from similarity import load_similarity_index
+from tflite_backend import load_tflite, tflite_path
+from tree_ensemble import compile_tree_ensemble
 
-# 1. Risk Stratification
-with open(f"{BASE_PATH}/risk_stratification/risk_stratification_model.pkl", "rb") as f:    risk_model = pickle.load(f)
+BASE_PATH = Path(os.environ.get("HEALTHAI_MODEL_DIR", Path(__file__).parent / "models"))
 
-# 2. Length of Stay Prediction
-with open(f"{BASE_PATH}/length_of_stay/length_of_stay_prediction_model.pkl", "rb") as f:    los_model = pickle.load(f)
 
-# 3. Patient Segmentation
-with open(f"{BASE_PATH}/patient_segmentation/segmentation-kmeans_model.pkl", "rb") as f:    kmeans_model = pickle.load(f)
-with open(f"{BASE_PATH}/patient_segmentation/segment_scaler.pkl", "rb") as f:    scaler = pickle.load(f)
+# Artifact Loaders
+# TensorFlow is only imported when a Keras model is first requested, so
+# tabular-only workers never pay for it.
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
 
-# 4. Imaging Diagnosis
-image_model = tf.keras.models.load_model(f"{BASE_PATH}/image_diagnosis/lung_cancer_cnn.keras")
 
-# 5. Sequence Modeling
-sequence_model = tf.keras.models.load_model(f"{BASE_PATH}/sequence_model/sequence_model.h5")
-sequence_scaler = joblib.load(f"{BASE_PATH}/sequence_model/sequence_scaler.pkl")
+# Tree ensembles are flattened into array form unless HEALTHAI_TREE_BACKEND=sklearn
+def load_tree_ensemble(path):
+    return compile_tree_ensemble(load_pickle(path))
 
-# 6. Sentiment Analysis
-sentiment_model = tf.keras.models.load_model(    f"{BASE_PATH}/sentiment_analysis/cnn_sentiment_model.keras")
-with open(f"{BASE_PATH}/sentiment_analysis/cnn_tokenizer.pkl", "rb") as f:    sentiment_tokenizer = pickle.load(f)
+
+def load_keras(path):
+    import tensorflow as tf
+
+    # Only takes effect before TensorFlow initializes its runtime
+    intra = os.environ.get("HEALTHAI_TF_INTRA_OP_THREADS")
+    inter = os.environ.get("HEALTHAI_TF_INTER_OP_THREADS")
+    try:
+        if intra:
+            tf.config.threading.set_intra_op_parallelism_threads(int(intra))
+        if inter:
+            tf.config.threading.set_inter_op_parallelism_threads(int(inter))
+    except RuntimeError:
+        pass
+
+    return tf.keras.models.load_model(path)
+
+
+# name: (group, relative path, loader)
+ARTIFACTS = {
+    # 1. Risk Stratification
+    "risk_model": ("risk", "risk_stratification/risk_stratification_model.pkl", load_tree_ensemble),
+
+    # 2. Length of Stay Prediction
+    "los_model": ("los", "length_of_stay/length_of_stay_prediction_model.pkl", load_tree_ensemble),
+
+    # 3. Patient Segmentation
+    "kmeans_model": ("segment", "patient_segmentation/segmentation-kmeans_model.pkl", load_pickle),
+    "scaler": ("segment", "patient_segmentation/segment_scaler.pkl", load_pickle),
+
+    # 4. Imaging Diagnosis
+    "image_model": ("image", "image_diagnosis/lung_cancer_cnn.keras", load_keras),
+
+    # 5. Sequence Modeling
+    "sequence_model": ("sequence", "sequence_model/sequence_model.h5", load_keras),
+    "sequence_scaler": ("sequence", "sequence_model/sequence_scaler.pkl", joblib.load),
+
+    # 6. Sentiment Analysis
+    "sentiment_model": ("sentiment", "sentiment_analysis/cnn_sentiment_model.keras", load_keras),
+    "sentiment_tokenizer": ("sentiment", "sentiment_analysis/cnn_tokenizer.pkl", load_pickle),
+    # first stage of the cascade (built with sentiment_cascade.py; see
+    # GENERATED_ARTIFACTS)
+    "sentiment_linear": ("sentiment", "sentiment_analysis/tfidf_logreg.pkl", load_linear_sentiment),
+
+    # 7. Medical Associations (built with associations.py)
+    "association_rules": ("associations", "medical_associations/association_rules.npz", load_rules_index),
+
+    # 8. Similar Patients (built with similarity.py)
+    "similarity_index": ("similar", "patient_similarity/similarity_index", load_similarity_index),
+}
+
+# Built at deploy time instead of shipped with the models (they depend on
+# the data and on other artifacts): until one is built, its group is
+# loaded, versioned and released without it, and using it answers 503
+GENERATED_ARTIFACTS = {
+    "sentiment_linear": "sentiment_cascade.py build",
+    "similarity_index": "similarity.py build",
+}
+
+# scikit-learn artifacts that shared_models.py can export for mmap loading
+SHAREABLE_LOADERS = (load_pickle, load_tree_ensemble, joblib.load)
+
+MODEL_GROUPS = {}
+for _name, (_group, _, _) in ARTIFACTS.items():
+    MODEL_GROUPS.setdefault(_group, []).append(_name)
+
+
+# Versioned Artifacts
+# A group's artifacts can be released as versions next to the unversioned
+# files, models/<group dir>/versions/<version>/<file>; versions/state.json
+# names the version served (and an optional shadow candidate, see
+# model_versions.py). Without it the unversioned files ("base") are served.
+VERSIONS = "versions"
+VERSION_STATE = "state.json"
+BASE_VERSION = "base"
+
+GROUP_DIRS = {group: Path(ARTIFACTS[names[0]][1]).parts[0] for group, names in MODEL_GROUPS.items()}
+
+
+def versions_dir(group, base_path=BASE_PATH):
+    return Path(base_path) / GROUP_DIRS[group] / VERSIONS
+
+
+def read_version_state(group, base_path=BASE_PATH):
+    try:
+        return json.loads((versions_dir(group, base_path) / VERSION_STATE).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+# Keras models can be served through TFLite instead, per group:
+# HEALTHAI_BACKEND_<GROUP>=tflite and HEALTHAI_TFLITE_<GROUP>_MODE=float32|
+# float16|dynamic|int8 (converted with tflite_backend.py beforehand).
+KERAS_MODELS = {
+    group: name for name, (group, _, loader) in ARTIFACTS.items() if loader is load_keras
+}
+
+
+def model_backend(group):
+    backend = os.environ.get(f"HEALTHAI_BACKEND_{group.upper()}", "keras")
+    if backend not in ("keras", "tflite") or (backend == "tflite" and group not in KERAS_MODELS):
+        raise ValueError(f"unsupported backend '{backend}' for model '{group}'")
+    return backend
+
+
+def tflite_mode(group):
+    return os.environ.get(f"HEALTHAI_TFLITE_{group.upper()}_MODE", "dynamic")
+
+
+def enabled_groups():
+    value = os.environ.get("HEALTHAI_ENABLED_MODELS", "").strip()
+    if not value:
+        return None
+    return [group.strip() for group in value.split(",") if group.strip()]
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ModelDisabledError(LookupError):
+    pass
+
+
+# Model Registry
+class ModelRegistry:
+    def __init__(self, artifacts, base_path=BASE_PATH, enabled=None):
+        self.artifacts = artifacts
+        self.base_path = Path(base_path)
+        self.enabled = set(enabled) if enabled is not None else None
+
+        self._models = {}
+        self._locks = {name: threading.Lock() for name in artifacts}
+        self._warmups = {}
+        self._local = threading.local()
+
+        self.signatures = {}
+        self.load_stats = {}
+        self.warmup_stats = {}
+        self.active = {
+            group: read_version_state(group, self.base_path).get("active", BASE_VERSION)
+            for group in MODEL_GROUPS
+        }
+
+    def is_enabled(self, group):
+        return self.enabled is None or group in self.enabled
+
+    # version: a released version of the artifact's group (default: the
+    # one served)
+    def source_path(self, name, version=None):
+        group, relative, _ = self.artifacts[name]
+        version = version or self.active[group]
+        if version == BASE_VERSION:
+            return self.base_path / relative
+        return versions_dir(group, self.base_path) / version / Path(relative).relative_to(GROUP_DIRS[group])
+
+    # The artifacts a version of a group has (generated ones may be missing)
+    def group_artifacts(self, group, version=None):
+        return [
+            name for name in MODEL_GROUPS[group]
+            if name not in GENERATED_ARTIFACTS or self.source_path(name, version).exists()
+        ]
+
+    def _uses_tflite(self, name):
+        group, _, loader = self.artifacts[name]
+        return loader is load_keras and model_backend(group) == "tflite"
+
+    # With HEALTHAI_MMAP_MODELS=1, exported copies are memory-mapped
+    # (unless the source changed after the export)
+    def _uses_shared(self, name, version=None):
+        return (
+            MMAP_MODELS
+            and self.artifacts[name][2] in SHAREABLE_LOADERS
+            and is_current(self.source_path(name, version))
+        )
+
+    def path(self, name, version=None):
+        if self._uses_tflite(name):
+            group = self.artifacts[name][0]
+            return tflite_path(self.source_path(name, version), tflite_mode(group))
+        if self._uses_shared(name, version):
+            return shared_path(self.source_path(name, version))
+        return self.source_path(name, version)
+
+    def signature(self, name, version=None):
+        stat = self.path(name, version).stat()
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _load(self, name, version=None):
+        group, _, loader = self.artifacts[name]
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+
+        if name in GENERATED_ARTIFACTS and not self.source_path(name, version).exists():
+            raise ModelDisabledError(f"'{name}' has not been built; run {GENERATED_ARTIFACTS[name]}")
+        signature = self.signature(name, version)
+        if self._uses_tflite(name):
+            loader = load_tflite
+        elif self._uses_shared(name, version):
+            source = self.source_path(name, version)
+            loader = lambda path: load_shared(path, source)
+        model = loader(self.path(name, version))
+
+        return model, signature, {
+            "group": group,
+            "load_seconds": time.perf_counter() - start,
+            "rss_delta_mb": current_rss_mb() - rss_before,
+        }
+
+    def get(self, name):
+        # Inside pinned() this thread sees a candidate version instead
+        pinned = getattr(self._local, "models", None)
+        if pinned is not None and name in pinned:
+            return pinned[name]
+
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        group = self.artifacts[name][0]
+        if not self.is_enabled(group):
+            raise ModelDisabledError(f"model '{group}' is not enabled on this worker")
+
+        with self._locks[name]:
+            if name not in self._models:
+                model, self.signatures[name], self.load_stats[name] = self._load(name)
+                self._models = {**self._models, name: model}
+
+        return self._models[name]
+
+    # Artifacts of one group from a single version, even across a swap
+    def get_many(self, *names):
+        models = self._models
+        if not self.is_pinned() and all(name in models for name in names):
+            return tuple(models[name] for name in names)
+        return tuple(self.get(name) for name in names)
+
+    def version(self, group):
+        # Identifies the artifacts loaded here (size and mtime at load time);
+        # groups not loaded in this process (e.g. scored by process workers)
+        # use the files currently on disk.
+        if not self.is_enabled(group):
+            raise ModelDisabledError(f"model '{group}' is not enabled on this worker")
+
+        digest = hashlib.blake2b(f"{self.active[group]};".encode(), digest_size=8)
+        for name in self.group_artifacts(group):
+            signature = self.signatures.get(name) or self.signature(name)
+            digest.update(f"{name}:{signature};".encode())
+        return digest.hexdigest()
+
+    # Hot Swap
+    # load_version() loads every artifact of a group from a version without
+    # touching what is served; promote() then swaps the whole group in with
+    # one assignment. Requests already holding the old models finish on
+    # them, and the old version is freed once they are done.
+    def load_version(self, group, version):
+        if not self.is_enabled(group):
+            raise ModelDisabledError(f"model '{group}' is not enabled on this worker")
+        models, signatures, load_stats = {}, {}, {}
+        for name in self.group_artifacts(group, version):
+            models[name], signatures[name], load_stats[name] = self._load(name, version)
+        return {"group": group, "version": version, "models": models,
+                "signatures": signatures, "load_stats": load_stats}
+
+    def is_pinned(self):
+        return getattr(self._local, "models", None) is not None
+
+    @contextmanager
+    def pinned(self, models):
+        previous = getattr(self._local, "models", None)
+        self._local.models = models
+        try:
+            yield
+        finally:
+            self._local.models = previous
+
+    # Switches a group none of whose artifacts are loaded yet
+    def switch_unloaded(self, group, version):
+        names = MODEL_GROUPS[group]
+        for name in names:
+            self._locks[name].acquire()
+        try:
+            if any(name in self._models for name in names):
+                return False
+            self.active[group] = version
+            return True
+        finally:
+            for name in reversed(names):
+                self._locks[name].release()
+
+    def promote(self, candidate):
+        names = MODEL_GROUPS[candidate["group"]]
+        for name in names:
+            self._locks[name].acquire()
+        try:
+            self._models = {**self._models, **candidate["models"]}
+            self.signatures.update(candidate["signatures"])
+            self.load_stats.update(candidate["load_stats"])
+            self.active[candidate["group"]] = candidate["version"]
+        finally:
+            for name in reversed(names):
+                self._locks[name].release()
+
+    def register_warmup(self, group, fn):
+        self._warmups[group] = fn
+
+    def warmup(self, group, models=None):
+        fn = self._warmups.get(group)
+        if fn is None:
+            return None
+
+        start = time.perf_counter()
+        if models is None:
+            fn()
+        else:
+            with self.pinned(models):
+                fn()
+        seconds = time.perf_counter() - start
+        if models is None:
+            self.warmup_stats[group] = {"warmup_seconds": seconds}
+        return seconds
+
+    def preload(self, groups, warmup=True):
+        for group in groups:
+            for name in self.group_artifacts(group):
+                self.get(name)
+            if warmup:
+                self.warmup(group)
+
+    def report(self):
+        return {
+            group: {
+                "enabled": self.is_enabled(group),
+                "version": self.active[group],
+                "backend": (
+                    f"tflite-{tflite_mode(group)}" if model_backend(group) == "tflite"
+                    else "keras" if group in KERAS_MODELS
+                    else "rules-index" if group == "associations"
+                    else "ivf-index" if group == "similar"
+                    else "sklearn-mmap" if any(self._uses_shared(name) for name in names)
+                    else "sklearn"
+                ),
+                "loaded": all(name in self._models for name in names),
+                "artifacts": {
+                    name: self.load_stats.get(name) for name in names
+                },
+                "signatures": {
+                    name: self.signatures.get(name) for name in names
+                },
+                **self.warmup_stats.get(group, {}),
+            }
+            for group, names in MODEL_GROUPS.items()
+        }
+
+
+registry = ModelRegistry(ARTIFACTS, enabled=enabled_groups())
+
+
+# Lazy module attributes (loaders.risk_model, ...)
+def __getattr__(name):
+    if name in ARTIFACTS:
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
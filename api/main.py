@@ -1,51 +1,787 @@
-from fastapi import FastAPI, UploadFile, File
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 from schemas import *
 from inference import *
-import cv2
+import os
+import json
+import orjson
 import numpy as np
+import asyncio
+from anyio import to_thread
+from loaders import MODEL_GROUPS, ModelDisabledError, enabled_groups
+from model_versions import SHADOW_RATE, versions
+from sessions import SessionLimitError, sessions
+from ingestion import WATCH_DIR, DirectoryTailer, ingestor
+from bulk_io import csv_lines, iter_chunks, iter_scored, iter_text_chunks, ndjson_lines
+from cache import MISS, result_cache
+from executors import EXECUTORS, OverloadedError, cpu_executor, native_executor
+from image_pipeline import MAX_BATCH, MAX_BYTES, ImageError
+from payloads import BINARY_TYPES, PayloadError, decode_array, media_type
+from similarity import MAX_K as MAX_SIMILAR, IndexUnavailableError
+from jobs import JobError, jobs
+from feature_store import MAX_IDS as MAX_ADMISSION_IDS, FeatureStoreError, NoFeatureStoreError, feature_store
+from metrics import METRICS_ENABLED, MetricsMiddleware, metrics, profiler, stage
 
 
 # Application Initialization
-app = FastAPI(title="HealthAI Inference API")
+class TimedORJSONResponse(ORJSONResponse):
+    def render(self, content):
+        with stage("serialize"):
+            return super().render(content)
+
+
+app = FastAPI(title="HealthAI Inference API", default_response_class=TimedORJSONResponse)
+
+# Request and per-stage latency histograms, exported on /metrics
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+
+# Model Loading
+# Models load on first use. With HEALTHAI_ENABLED_MODELS set, only the
+# listed groups are served and they are loaded (and warmed up) at startup.
+@app.on_event("startup")
+def preload_models():
+    groups = enabled_groups()
+    if groups:
+        warmup = os.environ.get("HEALTHAI_WARMUP", "1") != "0"
+        registry.preload(groups, warmup=warmup)
+
+
+# Model Versions
+# Each process follows models/<group>/versions/state.json: new versions are
+# loaded and warmed on a background thread and swapped in without a
+# restart; a shadowed candidate scores a sample of calls for comparison.
+@app.on_event("startup")
+def watch_model_versions():
+    versions.watch()
+
+
+@app.on_event("shutdown")
+def stop_model_versions():
+    versions.stop()
+
+
+@app.exception_handler(ModelDisabledError)
+def model_disabled(request: Request, exc: ModelDisabledError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+# Execution Layer
+# Handlers never run model code on the event loop: tabular scoring goes to
+# the CPU executor (threads, or preloaded processes), image decoding to the
+# native thread pool, and TensorFlow models to their micro-batchers.
+# Full queues answer 503 with Retry-After.
+@app.on_event("startup")
+def configure_threadpool():
+    size = os.environ.get("HEALTHAI_THREADPOOL_SIZE")
+    if size:
+        to_thread.current_default_thread_limiter().total_tokens = int(size)
+
+
+@app.on_event("shutdown")
+def stop_executors():
+    for executor in EXECUTORS.values():
+        executor.shutdown()
+
+
+@app.exception_handler(OverloadedError)
+def overloaded(request: Request, exc: OverloadedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+async def cached_call(group, payload, executor, fn, *args):
+    # Models raise ValueError for malformed rows (e.g. wrong feature count)
+    try:
+        with stage("score"):
+            return await result_cache.cached(group, payload, lambda: executor.run(fn, *args))
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+def batched(batcher, item):
+    return asyncio.wrap_future(batcher.submit(item))
+
+
+@app.get("/models")
+def models():
+    report = registry.report()
+    report["sentiment"]["cascade"] = sentiment_cascade.stats()
+    return report
+
+
+@app.get("/models/versions")
+def model_versions():
+    return versions.stats()
+
+
+def version_call(fn, *args):
+    try:
+        return fn(*args)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=exc.args[0])
+
+
+# Loads in the background here and in every other worker (202, "changed"
+# false if nothing was to do); progress and failures are reported by
+# GET /models/versions
+@app.post("/models/{group}/versions/{version}/activate", status_code=202)
+def activate_model_version(group: str, version: str):
+    changed = version_call(versions.activate, group, version)
+    return {"group": group, "version": version, "changed": changed}
+
+
+@app.post("/models/{group}/versions/{version}/shadow", status_code=202)
+def shadow_model_version(group: str, version: str, rate: float = SHADOW_RATE):
+    if not 0 < rate <= 1:
+        raise HTTPException(status_code=422, detail="rate must be in (0, 1]")
+    changed = version_call(versions.shadow, group, version, rate)
+    return {"group": group, "version": version, "rate": rate, "changed": changed}
+
+
+@app.delete("/models/{group}/shadow")
+def stop_shadow(group: str):
+    if group not in MODEL_GROUPS:
+        raise HTTPException(status_code=404, detail=f"unknown model group '{group}'")
+    return {"group": group, "stopped": versions.stop_shadow(group)}
+
+
+# Request Bodies
+# Array endpoints take JSON (validated by pydantic straight from the raw
+# bytes) or a binary .npy / Arrow / msgpack body (see payloads.py).
+def array_body(schema):
+    return {"requestBody": {"required": True, "content": {
+        "application/json": {"schema": schema.model_json_schema()},
+        **{t: {"schema": {"type": "string", "format": "binary"}} for t in BINARY_TYPES},
+    }}}
+
+
+# With field None the parsed JSON body itself is returned
+async def read_array(request, schema, field, ndim=2):
+    content_type = media_type(request.headers.get("content-type"))
+    with stage("read"):
+        body = await request.body()
+
+    with stage("parse"):
+        if content_type in BINARY_TYPES:
+            try:
+                return decode_array(body, content_type, field, ndim)
+            except PayloadError as exc:
+                raise HTTPException(status_code=exc.status_code, detail=str(exc))
+        if content_type != "application/json":
+            raise HTTPException(status_code=415, detail=f"unsupported content type '{content_type}'")
+
+        try:
+            parsed = schema.model_validate_json(body)
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors(include_url=False))
+        return parsed if field is None else getattr(parsed, field)
+
+
+async def read_vector(request, schema, field):
+    # Single rows are small; lists keep cache keys identical across formats
+    values = await read_array(request, schema, field, ndim=1)
+    return values.tolist() if isinstance(values, np.ndarray) else values
+
+
+# Tabular Scoring
+# /risk, /los and /segment take a feature vector (JSON or binary) or, as
+# JSON, admission IDs looked up in the feature store (feature_store.py).
+# Vectors go through the result cache; IDs always read the stored row, so
+# partial updates apply to the next request.
+async def read_tabular(request):
+    if media_type(request.headers.get("content-type")) in BINARY_TYPES:
+        return ScoreInput(features=await read_vector(request, TabularInput, "features"))
+    return await read_array(request, ScoreInput, None)
+
+
+async def score_tabular(request, group, predict, predict_ids, key):
+    data = await read_tabular(request)
+    if data.features is not None:
+        return {key: await cached_call(group, data.features, cpu_executor, predict, data.features)}
+
+    ids = data.admission_ids if data.admission_ids is not None else [data.admission_id]
+    if len(ids) > MAX_ADMISSION_IDS:
+        raise HTTPException(status_code=422, detail=f"at most {MAX_ADMISSION_IDS} admission ids")
+    try:
+        with stage("score"):
+            results = await cpu_executor.run(predict_ids, ids)
+    except NoFeatureStoreError:
+        raise
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    if data.admission_ids is not None:
+        return {"results": results}
+    result = results[0]
+    if "error" in result:
+        status = 404 if result["error"] == UNKNOWN_ADMISSION else 422
+        raise HTTPException(status_code=status, detail=result["error"])
+    del result["index"]
+    return result
 
 
 # 1. Risk Stratification
-@app.post("/risk")
-def risk(data: TabularInput):
-    return {"risk_class": predict_risk(data.features)}
+@app.post("/risk", openapi_extra=array_body(ScoreInput))
+async def risk(request: Request):
+    return await score_tabular(request, "risk", predict_risk, predict_risk_ids, "risk_class")
 
 
 # 2. Length of Stay Prediction
-@app.post("/los")
-def los(data: TabularInput):
-    return {"length_of_stay": predict_los(data.features)}
+@app.post("/los", openapi_extra=array_body(ScoreInput))
+async def los(request: Request):
+    return await score_tabular(request, "los", predict_los, predict_los_ids, "length_of_stay")
 
 
 # 3. Patient Segmentation
-@app.post("/segment")
-def segment(data: TabularInput):
-    return {"cluster": predict_segment(data.features)}
+@app.post("/segment", openapi_extra=array_body(ScoreInput))
+async def segment(request: Request):
+    return await score_tabular(request, "segment", predict_segment, predict_segment_ids, "cluster")
+
+
+# Feature Store
+# Stored features per model for an admission, and partial updates (e.g. a
+# new lab value), which recompute only the models using the changed columns
+@app.exception_handler(NoFeatureStoreError)
+def no_feature_store(request: Request, exc: NoFeatureStoreError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.get("/admissions")
+def admissions():
+    return feature_store().stats()
+
+
+@app.get("/admissions/{admission_id}")
+def admission_features(admission_id: int):
+    features = feature_store().features(admission_id)
+    if features is None:
+        raise HTTPException(status_code=404, detail=UNKNOWN_ADMISSION)
+    return {"admission_id": admission_id, "features": features}
+
+
+@app.patch("/admissions/{admission_id}")
+def update_admission_features(admission_id: int, data: AdmissionUpdate):
+    if not data.values:
+        raise HTTPException(status_code=422, detail="no values to update")
+    try:
+        recomputed = update_admission(admission_id, data.values)
+    except NoFeatureStoreError:
+        raise
+    except FeatureStoreError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if recomputed is None:
+        raise HTTPException(status_code=404, detail=UNKNOWN_ADMISSION)
+    return {"admission_id": admission_id, "recomputed": recomputed}
+
+
+# Batch Scoring (tabular models)
+async def batch_response(predict_batch, rows, stream):
+    if not stream:
+        with stage("score"):
+            return {"results": await cpu_executor.run(predict_batch, rows)}
+
+    # The first chunk is admitted (or rejected with 503) before streaming
+    # starts; later chunks of an accepted request are never rejected.
+    first = cpu_executor.submit(predict_batch, rows[:BATCH_CHUNK_SIZE])
+
+    async def lines():
+        results = await asyncio.wrap_future(first)
+        for start in range(0, len(rows), BATCH_CHUNK_SIZE):
+            if start:
+                chunk = rows[start:start + BATCH_CHUNK_SIZE]
+                results = await cpu_executor.run(predict_batch, chunk, start, force=True)
+            yield b"".join(orjson.dumps(result) + b"\n" for result in results)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/risk/batch", openapi_extra=array_body(BatchTabularInput))
+async def risk_batch(request: Request, stream: bool = False):
+    rows = await read_array(request, BatchTabularInput, "rows")
+    return await batch_response(predict_risk_batch, rows, stream)
+
+
+@app.post("/los/batch", openapi_extra=array_body(BatchTabularInput))
+async def los_batch(request: Request, stream: bool = False):
+    rows = await read_array(request, BatchTabularInput, "rows")
+    return await batch_response(predict_los_batch, rows, stream)
+
+
+@app.post("/segment/batch", openapi_extra=array_body(BatchTabularInput))
+async def segment_batch(request: Request, stream: bool = False):
+    rows = await read_array(request, BatchTabularInput, "rows")
+    return await batch_response(predict_segment_batch, rows, stream)
 
 
 # 4. Imaging Diagnosis
+async def read_image(file):
+    if file.size is not None and file.size > MAX_BYTES:
+        raise ImageError(f"upload exceeds {MAX_BYTES} bytes", status_code=413)
+    with stage("read"):
+        return await file.read()
+
+
+async def score_image(contents):
+    # Keyed by a content hash of the raw upload
+    key = None
+    if result_cache.enabled:
+        with stage("cache"):
+            key, cached = await run_in_threadpool(result_cache.lookup, "image", contents)
+        if cached is not MISS:
+            return cached
+
+    with stage("decode"):
+        img = await native_executor.run(decode_image, contents)
+    with stage("score"):
+        result = await batched(image_batcher, img)
+    if key is not None:
+        await result_cache.aput(key, result)
+    return result
+
+
 @app.post("/image")
 async def image(file: UploadFile = File(...)):
-    contents = await file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    img = cv2.resize(img, (224, 224))
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    try:
+        return await score_image(await read_image(file))
+    except ImageError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
+
+
+# Images are decoded in parallel and share forward passes through the
+# image batcher; a bad image only fails its own entry.
+@app.post("/image/batch")
+async def image_batch(files: List[UploadFile] = File(...)):
+    if len(files) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_BATCH} images per request")
 
-    return predict_image(img)
+    async def score(index, file):
+        try:
+            result = await score_image(await read_image(file))
+        except ImageError as exc:
+            return {"index": index, "filename": file.filename, "error": str(exc)}
+        return {"index": index, "filename": file.filename, **result}
+
+    results = await asyncio.gather(*(score(i, file) for i, file in enumerate(files)))
+    return {"results": list(results)}
 
 
 # 5. Sequence Modeling
-@app.post("/sequence")
-def sequence(data: SequenceInput):
-    return {"prediction": predict_sequence(data.sequence)}
+@app.post("/sequence", openapi_extra=array_body(SequenceInput))
+async def sequence(request: Request):
+    seq = await read_array(request, SequenceInput, "sequence")
+    if isinstance(seq, np.ndarray):
+        seq = seq.tolist()
+
+    # Malformed sequences are rejected before they can join a batch
+    try:
+        check_sequence(seq, registry.get("sequence_scaler").n_features_in_)
+        with stage("score"):
+            prediction = await result_cache.cached(
+                "sequence", seq, lambda: batched(sequence_batcher, seq)
+            )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return {"prediction": prediction}
+
+
+# 5b. Sequence Monitoring Sessions
+# Push one vitals row per tick; the server keeps the recurrent state.
+@app.post("/sequence/sessions")
+def open_session():
+    try:
+        return sessions.open().info()
+    except SessionLimitError as exc:
+        raise HTTPException(status_code=429, detail=str(exc))
+
+
+@app.get("/sequence/sessions")
+def session_stats():
+    return sessions.stats()
+
+
+@app.post("/sequence/sessions/{session_id}")
+def push_vitals(session_id: str, data: VitalsInput):
+    try:
+        return sessions.push(session_id, data.values)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="unknown or expired session")
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@app.delete("/sequence/sessions/{session_id}")
+def close_session(session_id: str):
+    if not sessions.close(session_id):
+        raise HTTPException(status_code=404, detail="unknown or expired session")
+    return {"closed": session_id}
+
+
+@app.websocket("/sequence/stream")
+async def sequence_stream(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        session = sessions.open()
+    except SessionLimitError as exc:
+        await websocket.close(code=1013, reason=str(exc))
+        return
+
+    await websocket.send_json(session.info())
+    try:
+        while True:
+            # A malformed message (not JSON, not a VitalsInput, wrong number
+            # of values) is answered with an error; the socket stays open
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            try:
+                data = VitalsInput.model_validate_json(message.get("text") or message.get("bytes") or b"")
+                result = await run_in_threadpool(sessions.push, session.id, data.values)
+            except ValidationError as exc:
+                result = {"error": exc.errors(include_url=False, include_context=False)}
+            except ValueError as exc:
+                result = {"error": str(exc)}
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sessions.close(session.id)
+
+
+# 5c. Multi-patient Vitals Ingestion
+@app.on_event("startup")
+async def start_ingestion():
+    app.state.ingest_tasks = [asyncio.create_task(ingestor.run())]
+    if WATCH_DIR:
+        tailer = DirectoryTailer(ingestor, WATCH_DIR)
+        app.state.ingest_tasks.append(asyncio.create_task(tailer.run()))
+
+
+@app.on_event("shutdown")
+async def stop_ingestion():
+    for task in app.state.ingest_tasks:
+        task.cancel()
+
+
+# Runs on the event loop so pushes never race the ingestion tick
+@app.post("/ingest/vitals")
+async def ingest_vitals(data: IngestInput):
+    return ingestor.push([(r.patient_id, r.values) for r in data.readings])
+
+
+@app.get("/ingest/stats")
+def ingest_stats():
+    return ingestor.stats()
+
+
+# On the event loop too: a patient in the round being scored is closed
+# when that round ends
+@app.delete("/ingest/patients/{patient_id}")
+async def remove_patient(patient_id: str):
+    if not ingestor.remove(patient_id):
+        raise HTTPException(status_code=404, detail="unknown patient")
+    return {"removed": patient_id}
+
+
+@app.get("/ingest/alerts")
+async def ingest_alerts():
+    async def events():
+        async for event in ingestor.subscribe():
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 # 6. Sentiment Analysis
 @app.post("/sentiment")
-def sentiment(data: TextInput):
-    return predict_sentiment(data.text)
+async def sentiment(data: TextInput):
+    with stage("score"):
+        return await result_cache.cached(
+            "sentiment", data.text, lambda: batched(sentiment_batcher, data.text)
+        )
+
+
+
+# Accepts a CSV/XLSX upload (multipart field "file") or a JSON {"texts": [...]}
+# body. Texts are scored in chunks and streamed back as NDJSON or CSV.
+@app.post("/sentiment/bulk")
+async def sentiment_bulk(request: Request, output: str = "ndjson", column: str = "text"):
+    if output not in ("ndjson", "csv"):
+        raise HTTPException(status_code=422, detail="output must be 'ndjson' or 'csv'")
+
+    if request.headers.get("content-type", "").startswith("application/json"):
+        data = BulkTextInput(**await request.json())
+        chunks = iter_chunks(data.texts)
+    else:
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=422, detail="expected a file upload named 'file'")
+        try:
+            chunks = await run_in_threadpool(
+                iter_text_chunks, upload.file, upload.filename, column
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+
+    scored = iter_scored(chunks, predict_sentiment_batch)
+
+    if output == "csv":
+        return StreamingResponse(
+            csv_lines(scored, column),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="sentiment_results.csv"'}
+        )
+    return StreamingResponse(ndjson_lines(scored), media_type="application/x-ndjson")
+
+
+# Medical Associations
+# Rules whose antecedent is a subset of the patient's items. A lookup is a
+# few microseconds of numpy work, so it runs directly on the event loop.
+@app.post("/associations")
+async def associations(data: AssociationInput, include_known: bool = False, limit: Optional[int] = None):
+    try:
+        return match_associations(data.conditions, data.measurements, include_known, limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@app.get("/associations/rules")
+def association_rules():
+    index = registry.get("association_rules")
+    return {"items": index.items, "meta": index.meta, "rules": index.rules}
+
+
+# Similar Patients
+# k nearest historical patients in the segmentation feature space, with
+# their length of stay and risk outcome (exact IVF search, see similarity.py)
+@app.exception_handler(IndexUnavailableError)
+def index_unavailable(request: Request, exc: IndexUnavailableError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.post("/similar", openapi_extra=array_body(TabularInput))
+async def similar(request: Request, k: int = 10):
+    if not 1 <= k <= MAX_SIMILAR:
+        raise HTTPException(status_code=422, detail=f"k must be between 1 and {MAX_SIMILAR}")
+
+    features = await read_vector(request, TabularInput, "features")
+    try:
+        with stage("score"):
+            return await native_executor.run(find_similar, features, k)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+# Background Jobs
+# Bulk scoring too long for one request (a large sentiment file, the whole
+# admission population, a folder of scans): POST /jobs queues it and
+# answers 202 with a job ID at once. Worker threads score it in chunks
+# through the batch predictors; GET /jobs/{id} reports progress and
+# throughput, /results streams the lines scored so far and DELETE cancels.
+# Jobs are kept in SQLite under data/jobs and resume after a restart.
+@app.on_event("startup")
+def start_jobs():
+    jobs.start()
+
+
+@app.on_event("shutdown")
+def stop_jobs():
+    jobs.stop()
+
+
+@app.exception_handler(JobError)
+def job_error(request: Request, exc: JobError):
+    headers = {"Retry-After": "30"} if exc.status_code == 429 else None
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers=headers)
+
+
+# JSON {"kind": ..., "dataset": ...} for data on the server, or a multipart
+# upload: field "kind" and one file ("file"; image jobs also take several
+# images or a .zip, as "file" or "files")
+@app.post("/jobs", status_code=202)
+async def submit_job(request: Request):
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            data = JobInput.model_validate_json(await request.body())
+        except ValidationError as exc:
+            raise RequestValidationError(exc.errors(include_url=False))
+        return await run_in_threadpool(
+            jobs.submit, data.kind, dataset=data.dataset, column=data.column, id_column=data.id_column
+        )
+
+    form = await request.form()
+    uploads = [u for u in form.getlist("file") + form.getlist("files") if not isinstance(u, str)]
+    if not uploads:
+        raise HTTPException(status_code=422, detail="expected a file upload named 'file'")
+    return await run_in_threadpool(
+        jobs.submit, form.get("kind"), uploads=[(u.filename, u.file) for u in uploads],
+        column=form.get("column"), id_column=form.get("id_column"),
+    )
+
+
+@app.get("/jobs")
+def list_jobs(status: Optional[str] = None, limit: int = 50):
+    return {"jobs": jobs.list(status, max(1, min(limit, 1000))), "stats": jobs.stats()}
+
+
+def find_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return find_job(job_id)
+
+
+# NDJSON result lines committed so far, in input order; with follow=true
+# the response stays open and streams chunks as they finish
+@app.get("/jobs/{job_id}/results")
+def job_results(job_id: str, follow: bool = False):
+    find_job(job_id)
+    return StreamingResponse(jobs.results(job_id, follow), media_type="application/x-ndjson")
+
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    find_job(job_id)
+    return jobs.cancel(job_id)
+
+
+# Micro-batching Metrics
+@app.get("/batching")
+def batching():
+    return {name: batcher.stats() for name, batcher in BATCHERS.items()}
+
+
+@app.get("/executors")
+def executors():
+    return {name: executor.stats() for name, executor in EXECUTORS.items()}
+
+
+# Result Cache
+@app.get("/cache")
+def cache_stats():
+    return result_cache.stats()
+
+
+@app.delete("/cache")
+def clear_cache():
+    result_cache.clear()
+    return {"cleared": True}
+
+
+# Prometheus Metrics
+# Histograms are recorded on the request path; queue depths, load times
+# and cache counters are read from the existing stats when scraped.
+metrics.collected(
+    "healthai_model_load_seconds", "Artifact load time", "gauge", ["artifact", "group"],
+    lambda: [((name, s["group"]), s["load_seconds"]) for name, s in registry.load_stats.items()],
+)
+metrics.collected(
+    "healthai_model_load_rss_bytes", "Resident memory added by loading the artifact", "gauge",
+    ["artifact", "group"],
+    lambda: [((name, s["group"]), s["rss_delta_mb"] * 2**20) for name, s in registry.load_stats.items()],
+)
+metrics.collected(
+    "healthai_model_warmup_seconds", "Warmup inference time", "gauge", ["group"],
+    lambda: [((group,), s["warmup_seconds"]) for group, s in registry.warmup_stats.items()],
+)
+metrics.collected(
+    "healthai_batcher_queue_depth", "Items waiting for a micro-batch", "gauge", ["model"],
+    lambda: [((name,), batcher.stats()["queue_depth"]) for name, batcher in BATCHERS.items()],
+)
+metrics.collected(
+    "healthai_batcher_rejected_total", "Items rejected by a full batcher queue", "counter", ["model"],
+    lambda: [((name,), batcher.rejected) for name, batcher in BATCHERS.items()],
+)
+metrics.collected(
+    "healthai_executor_pending", "Calls queued or running per executor", "gauge", ["executor"],
+    lambda: [((name,), executor.pending) for name, executor in EXECUTORS.items()],
+)
+metrics.collected(
+    "healthai_executor_rejected_total", "Calls rejected by a full executor", "counter", ["executor"],
+    lambda: [((name,), executor.rejected) for name, executor in EXECUTORS.items()],
+)
+metrics.collected(
+    "healthai_cache_lookups_total", "Result cache lookups", "counter", ["result"],
+    lambda: [(("hit",), result_cache.hits), (("miss",), result_cache.misses)],
+)
+metrics.collected(
+    "healthai_sentiment_cascade_total", "Texts answered per sentiment cascade stage", "counter",
+    ["model"],
+    lambda: [((m,), n) for m, n in sentiment_cascade.scored.items()] if sentiment_cascade.enabled else [],
+)
+metrics.collected(
+    "healthai_sentiment_cascade_audit_total",
+    "Linear answers also scored by the CNN, by agreement", "counter", ["result"],
+    lambda: [((r,), n) for r, n in sentiment_cascade.audited.items()] if sentiment_cascade.audit_rate else [],
+)
+metrics.collected(
+    "healthai_sequence_gate_ticks_total",
+    "Monitored patient ticks by whether the early-warning gate ran the sequence model", "counter",
+    ["source", "result"],
+    lambda: [
+        ((source, result), count)
+        for source, manager in (("sessions", sessions), ("ingest", ingestor.sessions))
+        if manager.gate is not None
+        for result, count in (("evaluated", manager.evaluated), ("skipped", manager.skipped))
+    ],
+)
+metrics.collected(
+    "healthai_model_swaps_total", "Model versions loaded, by group and role", "counter",
+    ["group", "role"],
+    lambda: list(versions.loaded.items()),
+)
+metrics.collected(
+    "healthai_shadow_items_total", "Items scored on a shadow candidate, by agreement", "counter",
+    ["group", "version", "result"],
+    lambda: [
+        ((group, shadow.version, result), count)
+        for group, shadow in list(versions.shadows.items())
+        for result, count in (("agree", shadow.agreed), ("disagree", shadow.items - shadow.agreed))
+    ],
+)
+metrics.collected(
+    "healthai_shadow_seconds_total", "Time spent on shadowed calls, served and candidate version",
+    "counter", ["group", "version", "model"],
+    lambda: [
+        ((group, shadow.version, model), seconds)
+        for group, shadow in list(versions.shadows.items())
+        for model, seconds in (("served", shadow.primary_seconds), ("candidate", shadow.candidate_seconds))
+    ],
+)
+metrics.collected(
+    "healthai_jobs", "Background jobs by status (all processes sharing the job database)", "gauge",
+    ["status"],
+    lambda: [((status,), count) for status, count in jobs.counts().items()],
+)
+metrics.collected(
+    "healthai_job_rows_total", "Rows scored by this process's job workers", "counter", ["kind"],
+    lambda: [((kind,), rows) for kind, rows in jobs.scored.items()],
+)
+metrics.collected(
+    "healthai_job_scoring_seconds_total", "Time this process's job workers spent scoring", "counter",
+    ["kind"],
+    lambda: [((kind,), seconds) for kind, seconds in jobs.seconds.items()],
+)
+metrics.collected(
+    "healthai_profiled_requests_total", "Requests sampled by the profiler", "counter", [],
+    lambda: [((), profiler.profiled)] if profiler.enabled else [],
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,390 @@
+import bisect
+import collections
+import heapq
+import os
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+
+# Metrics configuration (environment overrides)
+METRICS_ENABLED = os.environ.get("HEALTHAI_METRICS_ENABLED", "1") != "0"
+PROFILE_RATE = float(os.environ.get("HEALTHAI_PROFILE_RATE", 0))
+PROFILE_INTERVAL_MS = float(os.environ.get("HEALTHAI_PROFILE_INTERVAL_MS", 5))
+PROFILE_KEEP = int(os.environ.get("HEALTHAI_PROFILE_KEEP", 20))
+PROFILE_DIR = Path(os.environ.get("HEALTHAI_PROFILE_DIR", "profiles"))
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Metric Families
+# Plain dicts of label tuples -> values behind one lock per family: an
+# observation is a bisect and two additions, a few hundred nanoseconds.
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+
+        for labels, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+# Values read from existing stats() methods when /metrics is scraped
+class Collected:
+    def __init__(self, name, help, type, labels, collect):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect():
+            if value is not None:
+                yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families = []
+
+    def add(self, family):
+        self.families.append(family)
+        return family
+
+    def counter(self, name, help, labels=()):
+        return self.add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.add(Histogram(name, help, labels, buckets))
+
+    def collected(self, name, help, type, labels, collect):
+        return self.add(Collected(name, help, type, labels, collect))
+
+    def render(self):
+        lines = []
+        for family in self.families:
+            samples = list(family.samples())
+            if not samples:
+                continue
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+request_seconds = metrics.histogram(
+    "healthai_request_seconds", "HTTP request latency, including the response body",
+    ["method", "endpoint"],
+)
+requests_total = metrics.counter(
+    "healthai_requests_total", "HTTP requests by status code", ["method", "endpoint", "status"]
+)
+stage_seconds = metrics.histogram(
+    "healthai_request_stage_seconds", "Time spent per request stage", ["endpoint", "stage"]
+)
+model_stage_seconds = metrics.histogram(
+    "healthai_model_stage_seconds", "Time spent per model stage (per call or per batch)",
+    ["model", "stage"],
+)
+batch_size = metrics.histogram(
+    "healthai_batch_size", "Rows or items per model call", ["model"], SIZE_BUCKETS
+)
+
+
+# Request Timing
+# The middleware attaches a RequestTimer to the request's context; stage()
+# blocks on the request path append to it and everything is recorded under
+# the matched route template once the response has been sent. Context is
+# copied into run_in_threadpool calls, but not into executor or batcher
+# threads: work there is timed per model with model_stage(). (Process
+# workers, HEALTHAI_CPU_EXECUTOR=process, record theirs in the worker.)
+current_request = ContextVar("healthai_request", default=None)
+_in_flight = set()
+
+
+class RequestTimer:
+    __slots__ = ("scope", "start", "stages", "samples", "__weakref__")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.start = time.perf_counter()
+        self.stages = []
+        self.samples = None
+
+    @property
+    def endpoint(self):
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+
+class stage:
+    __slots__ = ("name", "timer", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timer = current_request.get()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer is not None:
+            self.timer.stages.append((self.name, time.perf_counter() - self.start))
+
+
+class model_stage:
+    __slots__ = ("model", "name", "start")
+
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        model_stage_seconds.observe(time.perf_counter() - self.start, self.model, self.name)
+
+
+def in_flight():
+    counts = collections.Counter(timer.endpoint for timer in list(_in_flight))
+    return [((endpoint,), count) for endpoint, count in sorted(counts.items())]
+
+
+metrics.collected(
+    "healthai_requests_in_flight", "Requests currently being handled", "gauge",
+    ["endpoint"], in_flight,
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timer = RequestTimer(scope)
+        token = current_request.set(timer)
+        _in_flight.add(timer)
+        if profiler.enabled and random.random() < profiler.rate:
+            profiler.begin(timer)
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            _in_flight.discard(timer)
+            current_request.reset(token)
+            finish(timer, scope["method"], status)
+
+
+def finish(timer, method, status):
+    seconds = time.perf_counter() - timer.start
+    endpoint = timer.endpoint
+
+    request_seconds.observe(seconds, method, endpoint)
+    requests_total.inc(method, endpoint, str(status))
+    for name, elapsed in timer.stages:
+        stage_seconds.observe(elapsed, endpoint, name)
+    if timer.samples is not None:
+        profiler.end(timer, f"{method} {endpoint}", seconds)
+
+
+# Sampled Profiler (HEALTHAI_PROFILE_RATE > 0)
+# While sampled requests are in flight a background thread snapshots every
+# thread's Python stack each PROFILE_INTERVAL_MS. A request is charged all
+# stacks taken during its lifetime, including the event loop and batcher
+# threads it waited on (and whatever else ran concurrently). The slowest
+# PROFILE_KEEP requests are written as folded stacks ("a;b;c count"), the
+# input format of flamegraph.pl, speedscope and inferno. Threads parked in
+# a wait (idle batchers, pool workers, the event loop's select) are skipped.
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+}
+
+
+class SampledProfiler:
+    def __init__(self, rate=PROFILE_RATE, interval_ms=PROFILE_INTERVAL_MS,
+                 keep=PROFILE_KEEP, directory=PROFILE_DIR):
+        self.rate = rate
+        self.enabled = METRICS_ENABLED and rate > 0
+        self.interval = interval_ms / 1000.0
+        self.keep = keep
+        self.directory = Path(directory)
+
+        self._sampled = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._slowest = []
+
+        self.profiled = 0
+        self.written = 0
+
+    def begin(self, timer):
+        timer.samples = collections.Counter()
+        with self._lock:
+            self._sampled.add(timer)
+            self.profiled += 1
+        self._ensure_thread()
+        self._wake.set()
+
+    def end(self, timer, name, seconds):
+        with self._lock:
+            self._sampled.discard(timer)
+            if not self._sampled:
+                self._wake.clear()
+            if len(self._slowest) >= self.keep and seconds <= self._slowest[0][0]:
+                return
+            label = name.replace(" ", "").replace("/", "_").strip("_")
+            path = self.directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{seconds * 1e3:.0f}ms-{id(timer):x}.folded"
+            heapq.heappush(self._slowest, (seconds, str(path)))
+            evicted = heapq.heappop(self._slowest)[1] if len(self._slowest) > self.keep else None
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in timer.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.written += 1
+        if evicted:
+            Path(evicted).unlink(missing_ok=True)
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = [
+                fold(frame, names.get(ident, str(ident)))
+                for ident, frame in sys._current_frames().items()
+                if ident != me and not is_idle(frame)
+            ]
+            with self._lock:
+                for timer in self._sampled:
+                    timer.samples.update(stacks)
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "interval_ms": self.interval * 1000.0,
+            "profiled": self.profiled,
+            "written": self.written,
+            "slowest_ms": [round(s * 1e3, 1) for s, _ in sorted(self._slowest, reverse=True)],
+        }
+
+
+def is_idle(frame):
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+def fold(frame, thread_name):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+
+profiler = SampledProfiler()
@@ -0,0 +1,411 @@
+import argparse
+import copy
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from loaders import (
+    BASE_VERSION, MODEL_GROUPS, VERSION_STATE, ModelDisabledError, read_version_state, registry,
+    versions_dir,
+)
+
+
+# Model versions configuration (environment overrides)
+WATCH_SECONDS = float(os.environ.get("HEALTHAI_MODEL_WATCH_SECONDS", 10))
+SHADOW_RATE = float(os.environ.get("HEALTHAI_SHADOW_RATE", 0.05))
+SHADOW_TOLERANCE = float(os.environ.get("HEALTHAI_SHADOW_TOLERANCE", 0.01))
+SHADOW_QUEUE = int(os.environ.get("HEALTHAI_SHADOW_QUEUE", 64))
+
+
+def log(message):
+    print(f"[model_versions {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+# Released Versions
+def available(group):
+    directory = versions_dir(group, registry.base_path)
+    versions = sorted(p.name for p in directory.iterdir() if p.is_dir()) if directory.is_dir() else []
+    return [BASE_VERSION] + versions
+
+
+def write_state(group, **changes):
+    directory = versions_dir(group, registry.base_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    state = {**read_version_state(group, registry.base_path), **changes}
+    state = {key: value for key, value in state.items() if value is not None}
+    tmp = directory / f"{VERSION_STATE}.tmp"
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, directory / VERSION_STATE)
+    return state
+
+
+# Copies the files a version needs (by default the ones served now) into
+# versions/<version>/, so they can be replaced and activated later
+def release(group, version, source=None):
+    if version == BASE_VERSION or "/" in version or version.startswith("."):
+        raise ValueError(f"invalid version name '{version}'")
+    target = versions_dir(group, registry.base_path) / version
+    if target.exists():
+        raise ValueError(f"version '{version}' of '{group}' already exists")
+
+    for name in registry.group_artifacts(group, source):
+        path, destination = registry.source_path(name, source), registry.source_path(name, version)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if path.is_dir():
+            shutil.copytree(path, destination)
+        else:
+            shutil.copy2(path, destination)
+    return target
+
+
+# Shadow Scoring
+# A sampled fraction of a group's model calls is scored again on the
+# candidate, on a background thread after the response is computed, with
+# the candidate pinned for that thread only. Items (rows of a batch, or
+# the single result) agree when labels match and numbers are within
+# SHADOW_TOLERANCE; latencies compare the same calls on both versions.
+def _items(result):
+    if isinstance(result, np.ndarray):
+        return result.tolist()
+    return result if isinstance(result, list) else [result]
+
+
+def _leaves(value, prefix=""):
+    if isinstance(value, dict):
+        return [leaf for key in sorted(value) for leaf in _leaves(value[key], f"{prefix}{key}.")]
+    if isinstance(value, (list, tuple)):
+        return [leaf for i, v in enumerate(value) for leaf in _leaves(v, f"{prefix}{i}.")]
+    return [(prefix, value)]
+
+
+def compare(a, b, tolerance=SHADOW_TOLERANCE):
+    leaves_a, leaves_b = _leaves(a), _leaves(b)
+    if [k for k, _ in leaves_a] != [k for k, _ in leaves_b]:
+        return False, None
+
+    agree, delta = True, 0.0
+    for (_, x), (_, y) in zip(leaves_a, leaves_b):
+        if isinstance(x, float) or isinstance(y, float):
+            try:
+                diff = abs(float(x) - float(y))
+            except (TypeError, ValueError):
+                return False, None
+            delta = max(delta, diff) if not math.isnan(diff) else math.inf
+            agree &= diff <= tolerance
+        elif isinstance(x, BaseException) or isinstance(y, BaseException):
+            # Per-item errors (e.g. an invalid sequence) agree when both fail alike
+            agree &= type(x) is type(y) and str(x) == str(y)
+        else:
+            agree &= x == y
+    return agree, delta
+
+
+class Shadow:
+    # candidate: registry.load_version() result, kept so that activating
+    # the shadowed version promotes it without loading it again
+    def __init__(self, candidate, rate=SHADOW_RATE, max_queue=SHADOW_QUEUE):
+        self.candidate = candidate
+        self.group = candidate["group"]
+        self.version = candidate["version"]
+        self.models = candidate["models"]
+        self.rate = rate
+        self.max_queue = max_queue
+
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"shadow-{self.group}")
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self.pending = 0
+
+        self.calls = 0
+        self.dropped = 0
+        self.errors = 0
+        self.items = 0
+        self.agreed = 0
+        self.max_delta = 0.0
+        self.primary_seconds = 0.0
+        self.candidate_seconds = 0.0
+
+    # call() gave `result` on the served version in `seconds`
+    def observe(self, call, result, seconds):
+        if self._rng.random() >= self.rate:
+            return
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.dropped += 1
+                return
+            self.pending += 1
+        # Callers may still change the result (e.g. drop the index)
+        self._pool.submit(self._score, call, copy.deepcopy(result), seconds)
+
+    def _score(self, call, result, seconds):
+        try:
+            start = time.perf_counter()
+            with registry.pinned(self.models):
+                candidate = call()
+            elapsed = time.perf_counter() - start
+
+            served, shadowed = _items(result), _items(candidate)
+            pairs = [compare(a, b) for a, b in zip(served, shadowed)]
+            with self._lock:
+                self.calls += 1
+                self.primary_seconds += seconds
+                self.candidate_seconds += elapsed
+                self.items += len(served)
+                self.agreed += sum(agree for agree, _ in pairs) if len(served) == len(shadowed) else 0
+                deltas = [delta for _, delta in pairs if delta is not None]
+                if deltas:
+                    self.max_delta = max(self.max_delta, *deltas)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "rate": self.rate,
+            "calls": self.calls,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "items": self.items,
+            "agreement": self.agreed / self.items if self.items else None,
+            "max_delta": self.max_delta,
+            "mean_ms": {
+                "served": self.primary_seconds / self.calls * 1000 if self.calls else None,
+                "candidate": self.candidate_seconds / self.calls * 1000 if self.calls else None,
+            },
+        }
+
+
+# Version Manager
+# Loads and warms versions on one background thread, off the request path,
+# then promotes them (or starts shadowing them). Every process follows
+# versions/state.json: activate() and shadow() write it, and watch()
+# re-reads it every WATCH_SECONDS, so all workers (forked, spawned or on
+# other hosts sharing the model directory) switch without a restart.
+class VersionManager:
+    def __init__(self, registry):
+        self.registry = registry
+        self.shadows = {}
+        self.loading = {}
+        self.failed = {}
+        self.history = deque(maxlen=50)
+        self.loaded = Counter()
+
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _check(self, group, version):
+        if group not in MODEL_GROUPS:
+            raise KeyError(f"unknown model group '{group}'")
+        if not self.registry.is_enabled(group):
+            raise ModelDisabledError(f"model '{group}' is not enabled on this worker")
+        if version not in available(group):
+            raise KeyError(f"model '{group}' has no version '{version}'")
+
+    def _submit(self, group, version, role, rate=None):
+        with self._lock:
+            if self.loading.get((group, role)) == version:
+                return False
+            self.loading[(group, role)] = version
+        self._loader.submit(self._load, group, version, role, rate)
+        return True
+
+    def _record(self, group, version, role, previous, load_seconds=0.0, warmup_seconds=0.0):
+        self.loaded[(group, role)] += 1
+        self.history.append({
+            "group": group, "version": version, "role": role, "previous": previous,
+            "load_seconds": load_seconds, "warmup_seconds": warmup_seconds,
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+
+    def _load(self, group, version, role, rate):
+        start = time.perf_counter()
+        try:
+            candidate = self.registry.load_version(group, version)
+            load_seconds = time.perf_counter() - start
+            warmup_seconds = self.registry.warmup(group, candidate["models"]) or 0.0
+
+            if role == "active":
+                previous = self.registry.active[group]
+                self.registry.promote(candidate)
+            else:
+                previous = None
+                self._set_shadow(group, Shadow(candidate, rate or SHADOW_RATE))
+
+            self.failed.pop((group, role), None)
+            self._record(group, version, role, previous, load_seconds, warmup_seconds)
+            log(f"{group} {version} {'serving' if role == 'active' else 'shadowing'} "
+                f"(load {load_seconds:.2f} s, warmup {warmup_seconds:.2f} s)")
+        except Exception as exc:
+            self.failed[(group, role)] = {"version": version, "error": repr(exc)}
+            log(f"{group} {version} failed to load: {exc!r}")
+        finally:
+            with self._lock:
+                self.loading.pop((group, role), None)
+
+    def _set_shadow(self, group, shadow):
+        previous = self.shadows.pop(group, None)
+        if shadow is not None:
+            self.shadows[group] = shadow
+        if previous is not None:
+            previous.close()
+
+    # Serve `version` of `group` once it is loaded and warmed
+    def activate(self, group, version, persist=True):
+        self._check(group, version)
+        shadow = self.shadows.get(group)
+        if persist:
+            state = read_version_state(group, self.registry.base_path)
+            write_state(group, active=version, **(
+                {"shadow": None, "shadow_rate": None} if state.get("shadow") == version else {}
+            ))
+        if version == self.registry.active[group]:
+            return False
+
+        # A shadowed candidate is already loaded and warm; groups this
+        # process has not loaded yet just load the new version on first use
+        previous = self.registry.active[group]
+        if shadow is not None and shadow.version == version:
+            self.registry.promote(shadow.candidate)
+            self._set_shadow(group, None)
+        elif not self.registry.switch_unloaded(group, version):
+            return self._submit(group, version, "active")
+        self._record(group, version, "active", previous)
+        return True
+
+    def shadow(self, group, version, rate=SHADOW_RATE, persist=True):
+        self._check(group, version)
+        if persist:
+            write_state(group, shadow=version, shadow_rate=rate)
+        current = self.shadows.get(group)
+        if current is not None and current.version == version:
+            current.rate = rate
+            return False
+        return self._submit(group, version, "shadow", rate)
+
+    def stop_shadow(self, group, persist=True):
+        if persist:
+            write_state(group, shadow=None, shadow_rate=None)
+        stopped = group in self.shadows
+        self._set_shadow(group, None)
+        return stopped
+
+    # Applies versions/state.json of every enabled group
+    def sync(self):
+        for group in MODEL_GROUPS:
+            if not self.registry.is_enabled(group):
+                continue
+            state = read_version_state(group, self.registry.base_path)
+            # A version that failed to load is not retried until it changes
+            failed = {role: f["version"] for (g, role), f in self.failed.items() if g == group}
+            try:
+                active = state.get("active", BASE_VERSION)
+                if active != self.registry.active[group] and failed.get("active") != active:
+                    self.activate(group, active, persist=False)
+
+                shadow = state.get("shadow")
+                if shadow is None or shadow == active:
+                    if group in self.shadows:
+                        self.stop_shadow(group, persist=False)
+                elif failed.get("shadow") != shadow:
+                    self.shadow(group, shadow, state.get("shadow_rate", SHADOW_RATE), persist=False)
+            except (KeyError, ModelDisabledError) as exc:
+                log(f"{group}: {exc}")
+
+    def watch(self, interval=WATCH_SECONDS):
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self.sync()
+
+        self.sync()
+        self._watcher = threading.Thread(target=run, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        self._watcher = None
+        for group in list(self.shadows):
+            self._set_shadow(group, None)
+
+    def stats(self):
+        return {
+            "watching": self._watcher is not None,
+            "groups": {
+                group: {
+                    "active": self.registry.active[group],
+                    "available": available(group),
+                    "loading": {role: v for (g, role), v in self.loading.items() if g == group},
+                    "failed": {role: f for (g, role), f in self.failed.items() if g == group},
+                    "shadow": self.shadows[group].stats() if group in self.shadows else None,
+                }
+                for group in MODEL_GROUPS if self.registry.is_enabled(group)
+            },
+            "history": list(self.history),
+        }
+
+
+versions = VersionManager(registry)
+
+
+# Command Line
+# python model_versions.py list
+# python model_versions.py release risk 2026-10-18       (copies the served files)
+# python model_versions.py activate risk 2026-10-18      (running workers follow)
+# python model_versions.py shadow risk 2026-10-18 --rate 0.1
+# python model_versions.py unshadow risk
+def main():
+    parser = argparse.ArgumentParser(description="Release, activate and shadow model versions")
+    parser.add_argument("command", choices=["list", "release", "activate", "shadow", "unshadow"])
+    parser.add_argument("group", nargs="?", choices=sorted(MODEL_GROUPS))
+    parser.add_argument("version", nargs="?")
+    parser.add_argument("--rate", type=float, default=SHADOW_RATE)
+    parser.add_argument("--source", help="version to copy on release (default: the served one)")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for group in args.group and [args.group] or sorted(MODEL_GROUPS):
+            state = read_version_state(group, registry.base_path)
+            print(f"{group:<13} active {state.get('active', BASE_VERSION):<16} "
+                  f"shadow {state.get('shadow', '-'):<16} versions {', '.join(available(group))}")
+        return
+    if args.group is None or (args.command != "unshadow" and args.version is None):
+        parser.error(f"{args.command} needs a group" + (" and a version" if args.command != "unshadow" else ""))
+
+    if args.command == "release":
+        print(release(args.group, args.version, args.source))
+        return
+    if args.command != "unshadow" and args.version not in available(args.group):
+        raise SystemExit(f"model '{args.group}' has no version '{args.version}'")
+
+    if args.command == "activate":
+        state = write_state(args.group, active=args.version)
+    elif args.command == "shadow":
+        state = write_state(args.group, shadow=args.version, shadow_rate=args.rate)
+    else:
+        state = write_state(args.group, shadow=None, shadow_rate=None)
+    print(json.dumps(state))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import io
+
+import numpy as np
+
+
+# Binary Request Bodies
+# Matrix endpoints also accept NumPy .npy, Arrow IPC and msgpack bodies,
+# which decode straight into a float64 array without building a Python
+# float per element. pyarrow and msgpack are optional; without them those
+# content types answer 415.
+NPY_TYPES = ("application/x-npy", "application/npy")
+ARROW_TYPES = ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file")
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+BINARY_TYPES = NPY_TYPES + ARROW_TYPES + MSGPACK_TYPES
+
+
+class PayloadError(ValueError):
+    def __init__(self, message, status_code=422):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def media_type(content_type):
+    return (content_type or "application/json").split(";")[0].strip().lower()
+
+
+def _numeric(array):
+    if array.dtype.kind not in "fiub":
+        raise PayloadError(f"expected a numeric array, got dtype {array.dtype}")
+    return array.astype(np.float64, copy=False)
+
+
+# .npy: the header is parsed and the data is viewed in place (no copy for
+# float64 input)
+def decode_npy(body):
+    fp = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(fp)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+        else:
+            return _numeric(np.load(io.BytesIO(body), allow_pickle=False))
+    except ValueError as exc:
+        raise PayloadError(f"invalid .npy body: {exc}")
+
+    if dtype.hasobject:
+        raise PayloadError("object arrays are not accepted")
+
+    count = int(np.prod(shape))
+    if len(body) - fp.tell() < count * dtype.itemsize:
+        raise PayloadError("truncated .npy body")
+
+    array = np.frombuffer(body, dtype=dtype, count=count, offset=fp.tell())
+    return _numeric(array.reshape(shape, order="F" if fortran_order else "C"))
+
+
+# Arrow IPC: one numeric column per feature, or a single fixed-size-list
+# column holding whole rows
+def decode_arrow(body, content_type):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise PayloadError("Arrow bodies need pyarrow installed", status_code=415)
+
+    try:
+        buffer = pa.py_buffer(body)
+        if content_type.endswith(".file"):
+            table = pa.ipc.open_file(buffer).read_all()
+        else:
+            table = pa.ipc.open_stream(buffer).read_all()
+    except pa.ArrowInvalid as exc:
+        raise PayloadError(f"invalid Arrow body: {exc}")
+
+    if table.num_columns == 1 and pa.types.is_fixed_size_list(table.schema.field(0).type):
+        column = table.column(0).combine_chunks()
+        width = column.type.list_size
+        return _numeric(column.flatten().to_numpy(zero_copy_only=False).reshape(-1, width))
+
+    columns = []
+    for column in table.columns:
+        if not (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)
+                or pa.types.is_boolean(column.type)):
+            raise PayloadError(f"column of type {column.type} is not numeric")
+        columns.append(column.to_numpy().astype(np.float64, copy=False))
+
+    if not columns:
+        return np.empty((0, 0))
+    return np.column_stack(columns)
+
+
+# msgpack: either nested arrays, or a map {"dtype", "shape", "data"} whose
+# data is the raw little-endian buffer (msgpack-numpy style); the payload
+# may also be wrapped in the JSON field name, e.g. {"rows": ...}
+def decode_msgpack(body, field):
+    try:
+        import msgpack
+    except ImportError:
+        raise PayloadError("msgpack bodies need msgpack installed", status_code=415)
+
+    try:
+        obj = msgpack.unpackb(body, raw=False)
+    except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+        raise PayloadError(f"invalid msgpack body: {exc}")
+
+    if isinstance(obj, dict) and field in obj:
+        obj = obj[field]
+
+    if isinstance(obj, dict):
+        try:
+            dtype = np.dtype(obj["dtype"])
+            array = np.frombuffer(obj["data"], dtype=dtype).reshape(obj["shape"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise PayloadError(f"invalid msgpack array: {exc}")
+        if dtype.hasobject:
+            raise PayloadError("object arrays are not accepted")
+        return _numeric(array)
+
+    try:
+        return _numeric(np.asarray(obj, dtype=np.float64))
+    except (TypeError, ValueError) as exc:
+        raise PayloadError(f"invalid msgpack array: {exc}")
+
+
+def decode_array(body, content_type, field, ndim=2):
+    content_type = media_type(content_type)
+    if content_type in NPY_TYPES:
+        array = decode_npy(body)
+    elif content_type in ARROW_TYPES:
+        array = decode_arrow(body, content_type)
+    elif content_type in MSGPACK_TYPES:
+        array = decode_msgpack(body, field)
+    else:
+        raise PayloadError(f"unsupported content type '{content_type}'", status_code=415)
+
+    # A single row may be sent as shape (n,) or (1, n)
+    if ndim == 1 and array.ndim == 2 and len(array) == 1:
+        array = array[0]
+    if array.ndim != ndim:
+        raise PayloadError(f"expected a {ndim}-D array, got shape {array.shape}")
+    return array
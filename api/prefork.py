@@ -0,0 +1,201 @@
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import sys
+import time
+
+
+# Prefork configuration (environment overrides)
+WORKERS = int(os.environ.get("HEALTHAI_WORKERS", os.cpu_count() or 1))
+SHUTDOWN_SECONDS = float(os.environ.get("HEALTHAI_SHUTDOWN_SECONDS", 30))
+
+
+def log(message):
+    print(f"[prefork {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+# Memory Accounting
+# USS (private pages) is what each additional worker really costs; PSS
+# splits shared pages evenly between the processes mapping them.
+def memory_mb(pid):
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return None
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "uss": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+# Preload
+# The scikit-learn, rules and similarity artifacts are loaded once in the
+# supervisor and inherited copy-on-write (memory-mapped ones are shared
+# regardless). TensorFlow is not fork-safe (its thread pools do not
+# survive fork), so Keras/TFLite groups load in each worker at startup.
+# gc.freeze() moves the preloaded objects out of the collector's reach,
+# so collections in the workers do not write to (and copy) their pages.
+def preload(groups):
+    from loaders import KERAS_MODELS, MODEL_GROUPS, registry
+
+    groups = [g for g in (groups or MODEL_GROUPS) if g not in KERAS_MODELS]
+    start = time.perf_counter()
+    registry.preload([g for g in groups if registry.is_enabled(g)], warmup=False)
+    gc.collect()
+    gc.freeze()
+    return groups, time.perf_counter() - start
+
+
+def listen(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+# Workers
+def run_worker(app, sock, ready_fd, index, log_level):
+    import uvicorn
+
+    class Server(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets)
+            os.write(ready_fd, f"{index} {os.getpid()}\n".encode())
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    Server(uvicorn.Config(app, log_level=log_level)).run(sockets=[sock])
+
+
+class Supervisor:
+    def __init__(self, app, sock, workers, log_level="warning"):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+
+        self.ready_r, self.ready_w = os.pipe()
+        self.children = {}    # pid -> (index, fork time)
+        self.ready = {}       # index -> spawn seconds
+        self.stopping = False
+
+    def spawn(self, index):
+        started = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(self.ready_r)
+            try:
+                run_worker(self.app, self.sock, self.ready_w, index, self.log_level)
+            finally:
+                os._exit(0)
+        self.children[pid] = (index, started)
+
+    def _on_ready(self, data):
+        for line in data.decode().splitlines():
+            index, pid = map(int, line.split())
+            _, started = self.children.get(pid, (index, time.perf_counter()))
+            self.ready[index] = time.perf_counter() - started
+            mem = memory_mb(pid) or {}
+            log(f"worker {index} (pid {pid}) ready in {self.ready[index]:.2f} s, "
+                f"uss {mem.get('uss', 0):.1f} MB, pss {mem.get('pss', 0):.1f} MB")
+            if len(self.ready) == self.workers:
+                self.report()
+
+    def report(self):
+        parent = memory_mb(os.getpid())
+        workers = [memory_mb(pid) for pid in self.children]
+        workers = [m for m in workers if m]
+        if not parent or not workers:
+            return
+        total_pss = parent["pss"] + sum(m["pss"] for m in workers)
+        per_worker = sum(m["uss"] for m in workers) / len(workers)
+        log(f"{len(workers)} workers: supervisor rss {parent['rss']:.1f} MB, "
+            f"total pss {total_pss:.1f} MB, {per_worker:.1f} MB private per worker, "
+            f"mean spawn {sum(self.ready.values()) / len(self.ready):.2f} s")
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while not self.stopping:
+            try:
+                readable, _, _ = select.select([self.ready_r], [], [], 0.5)
+            except InterruptedError:
+                continue
+            if readable:
+                self._on_ready(os.read(self.ready_r, 4096))
+            self._reap(respawn=True)
+
+        self.shutdown()
+
+    def _reap(self, respawn):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index, _ = self.children.pop(pid)
+            self.ready.pop(index, None)
+            if respawn:
+                log(f"worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+                self.spawn(index)
+
+    def shutdown(self):
+        log("shutting down")
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + SHUTDOWN_SECONDS
+        while self.children and time.monotonic() < deadline:
+            self._reap(respawn=False)
+            time.sleep(0.1)
+        for pid in self.children:
+            os.kill(pid, signal.SIGKILL)
+        self._reap(respawn=False)
+
+
+# Command Line
+# python prefork.py --workers 4 --port 8000
+# (HEALTHAI_MMAP_MODELS=1 after shared_models.py export shares the
+# scikit-learn arrays through the page cache as well)
+def main():
+    parser = argparse.ArgumentParser(description="Serve main:app from forked workers sharing preloaded models")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--preload", help="model groups to load before forking (default: all enabled non-TensorFlow groups)")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    from loaders import enabled_groups
+    from main import app
+
+    groups, seconds = preload(args.preload.split(",") if args.preload else enabled_groups())
+    mem = memory_mb(os.getpid())
+    log(f"preloaded {', '.join(groups)} in {seconds:.2f} s (rss {mem['rss']:.1f} MB)")
+
+    sock = listen(args.host, args.port)
+    log(f"listening on http://{args.host}:{args.port} with {args.workers} workers")
+    Supervisor(app, sock, args.workers, args.log_level).run()
+
+
+if __name__ == "__main__":
+    main()
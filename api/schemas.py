@@ -1,11 +1,52 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, model_validator
+from typing import Dict, List, Optional, Union
 
 class TabularInput(BaseModel):
     features: List[float]
 
+class ScoreInput(BaseModel):
+    features: Optional[List[float]] = None
+    admission_id: Optional[int] = None
+    admission_ids: Optional[List[int]] = None
+
+    @model_validator(mode="after")
+    def one_source(self):
+        given = [self.features, self.admission_id, self.admission_ids]
+        if sum(value is not None for value in given) != 1:
+            raise ValueError("send exactly one of features, admission_id or admission_ids")
+        return self
+
+class AdmissionUpdate(BaseModel):
+    values: Dict[str, Union[float, str]]
+
+class BatchTabularInput(BaseModel):
+    rows: List[List[float]]
+
 class TextInput(BaseModel):
     text: str
 
+class BulkTextInput(BaseModel):
+    texts: List[str]
+
 class SequenceInput(BaseModel):
     sequence: List[List[float]]
+
+class VitalsInput(BaseModel):
+    values: List[float]
+
+class VitalsReading(BaseModel):
+    patient_id: str
+    values: List[float]
+
+class IngestInput(BaseModel):
+    readings: List[VitalsReading]
+
+class AssociationInput(BaseModel):
+    conditions: List[str] = []
+    measurements: Dict[str, Union[float, str]] = {}
+
+class JobInput(BaseModel):
+    kind: str
+    dataset: str
+    column: Optional[str] = None
+    id_column: Optional[str] = None
@@ -0,0 +1,319 @@
+import argparse
+import os
+import pickle
+import re
+import threading
+import time
+from itertools import repeat
+from pathlib import Path
+
+import numpy as np
+
+
+# Sentiment cascade configuration (environment overrides)
+CASCADE_ENABLED = os.environ.get("HEALTHAI_SENTIMENT_CASCADE", "0") != "0"
+BAND = tuple(float(v) for v in os.environ.get("HEALTHAI_SENTIMENT_CASCADE_BAND", "0.2,0.8").split(","))
+AUDIT_RATE = float(os.environ.get("HEALTHAI_SENTIMENT_CASCADE_AUDIT", 0))
+
+REVIEWS_CSV = Path(__file__).resolve().parents[1] / "data" / "hospital_reviews" / "hospital_reviews.csv"
+SEED = 42
+
+
+# Text cleaning from notebooks/7-sentiment_analysis (what the TF-IDF
+# vocabulary was fitted on)
+def clean_text(text):
+    text = text.lower()
+    text = re.sub(r"http\S+|www\S+", "", text)
+    text = re.sub(r"<.*?>", "", text)
+    text = re.sub(r"[^a-z\s]", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# The same cleaning for a batch, in one pass over the texts joined with a
+# boundary character the patterns never cross, split into words
+BOUNDARY_CHAR = "\x00"
+_URL = re.compile(r"http[^\s\x00]+|www[^\s\x00]+")
+_HTML = re.compile(r"<[^\n\x00]*?>")
+_NON_LETTERS = re.compile(r"[^a-z\s\x00]+")
+
+
+def clean_words(texts):
+    joined = BOUNDARY_CHAR.join(texts)
+    if joined.count(BOUNDARY_CHAR) != len(texts) - 1:
+        return [clean_text(text).split() for text in texts]
+    joined = _NON_LETTERS.sub("", _HTML.sub("", _URL.sub("", joined.lower())))
+    return [text.split() for text in joined.split(BOUNDARY_CHAR)]
+
+
+# Linear Model
+# The notebook's baseline (TF-IDF over unigrams and bigrams, class-balanced
+# logistic regression) compiled to plain arrays, so scoring needs neither
+# scikit-learn nor a sparse matrix:
+#   * texts are cleaned as in the notebook and split on whitespace, which
+#     on cleaned text is exactly TfidfVectorizer's token pattern (runs of
+#     two or more letters); stop words are dropped before the bigrams,
+#   * term ids for the whole batch come from one dict lookup pass, and the
+#     l2-normalised TF-IDF dot product is two np.bincount calls,
+#   * the logit is scaled by a temperature fitted on the validation split,
+#     which leaves the 0.5 decision unchanged but spreads the (otherwise
+#     strongly regularised, near-0.5) probabilities so the uncertainty
+#     band reads as confidence.
+# A review costs a few microseconds, against an embedding, convolution and
+# dense layers plus Keras call overhead for the CNN.
+class LinearSentiment:
+    def __init__(self, vocabulary, idf, coef, intercept, stop_words, temperature=1.0):
+        self.index = dict(vocabulary)
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.weights = np.asarray(coef, dtype=np.float64) * self.idf
+        self.intercept = float(intercept)
+        self.stop_words = frozenset(stop_words)
+        self.temperature = float(temperature)
+
+    @classmethod
+    def from_sklearn(cls, vectorizer, model, temperature=1.0):
+        if vectorizer.ngram_range != (1, 2) or vectorizer.norm != "l2" or vectorizer.sublinear_tf:
+            raise ValueError("only l2-normalised unigram+bigram TF-IDF is supported")
+        return cls(
+            vectorizer.vocabulary_, vectorizer.idf_, model.coef_[0], model.intercept_[0],
+            vectorizer.get_stop_words() or (), temperature,
+        )
+
+    def _terms(self, texts):
+        stop_words = self.stop_words
+        terms, counts = [], []
+        for words in clean_words(texts):
+            words = [w for w in words if len(w) > 1 and w not in stop_words]
+            terms.extend(words)
+            terms.extend(map(" ".join, zip(words, words[1:])))
+            counts.append(2 * len(words) - 1 if words else 0)
+        return terms, counts
+
+    def decision_function(self, texts):
+        n = len(texts)
+        terms, counts = self._terms(texts)
+        ids = np.fromiter(map(self.index.get, terms, repeat(-1)), dtype=np.int64, count=len(terms))
+        rows = np.repeat(np.arange(n), counts)
+        keep = ids >= 0
+        ids, rows = ids[keep], rows[keep]
+
+        # term frequency per (row, term)
+        pairs, tf = np.unique(rows * len(self.idf) + ids, return_counts=True)
+        rows, ids = np.divmod(pairs, len(self.idf))
+        dot = np.bincount(rows, tf * self.weights[ids], minlength=n)
+        norm = np.sqrt(np.bincount(rows, (tf * self.idf[ids]) ** 2, minlength=n))
+        return np.divide(dot, norm, out=np.zeros(n), where=norm > 0) + self.intercept
+
+    def predict_proba(self, texts):
+        return 1.0 / (1.0 + np.exp(-self.decision_function(texts) / self.temperature))
+
+
+def load_linear_sentiment(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# Cascade
+# Every text is scored by the linear model; only those whose positive
+# probability lies strictly inside the uncertainty band (low, high) are
+# rescored by the CNN, whose answer replaces the linear one. With an audit
+# rate, that fraction of the confidently scored texts is also sent to the
+# CNN and counted as agreeing or not, to watch the fast path in production.
+class SentimentCascade:
+    def __init__(self, band=BAND, audit_rate=AUDIT_RATE, enabled=CASCADE_ENABLED):
+        low, high = band
+        if not 0.0 <= low <= 0.5 <= high <= 1.0:
+            raise ValueError(f"uncertainty band must satisfy 0 <= low <= 0.5 <= high <= 1, got {band}")
+        self.band = (low, high)
+        self.audit_rate = audit_rate
+        self.enabled = enabled
+
+        self.scored = {"linear": 0, "cnn": 0}
+        self.audited = {"agree": 0, "disagree": 0}
+        self._rng = np.random.default_rng()
+        self._lock = threading.Lock()
+
+    def score(self, texts, linear, cnn):
+        probs = np.asarray(linear.predict_proba(texts), dtype=np.float64)
+        low, high = self.band
+        uncertain = (probs > low) & (probs < high)
+
+        audit = np.zeros_like(uncertain)
+        if self.audit_rate > 0:
+            audit = ~uncertain & (self._rng.random(len(probs)) < self.audit_rate)
+
+        agree = 0
+        rescore = np.flatnonzero(uncertain | audit)
+        if len(rescore):
+            cnn_probs = np.asarray(cnn([texts[i] for i in rescore]), dtype=np.float64)
+            replaced = uncertain[rescore]
+            agree = int(((cnn_probs[~replaced] > 0.5) == (probs[rescore[~replaced]] > 0.5)).sum())
+            probs[rescore[replaced]] = cnn_probs[replaced]
+
+        n_cnn = int(uncertain.sum())
+        n_audit = int(audit.sum())
+        with self._lock:
+            self.scored["linear"] += len(probs) - n_cnn
+            self.scored["cnn"] += n_cnn
+            self.audited["agree"] += agree
+            self.audited["disagree"] += n_audit - agree
+
+        return probs, np.where(uncertain, "cnn", "linear")
+
+    def stats(self):
+        total = sum(self.scored.values())
+        audited = sum(self.audited.values())
+        return {
+            "enabled": self.enabled,
+            "band": list(self.band),
+            "scored": dict(self.scored),
+            "cnn_share": self.scored["cnn"] / total if total else None,
+            "audited": dict(self.audited),
+            "audit_agreement": self.audited["agree"] / audited if audited else None,
+        }
+
+
+cascade = SentimentCascade()
+
+
+# Building (the notebook's cleaning, label encoding and 70/15/15 split)
+def load_reviews(path=REVIEWS_CSV):
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    df = pd.read_csv(path).rename(columns={
+        "Feedback": "feedback", "Sentiment Label": "sentiment", "Ratings": "rating"
+    }).drop_duplicates()
+    texts = df["feedback"].fillna("").astype(str)
+    labels = (df["sentiment"] == df["sentiment"].max()).astype(int)
+
+    X_train, X_temp, y_train, y_temp = train_test_split(
+        texts, labels, test_size=0.3, stratify=labels, random_state=SEED
+    )
+    X_val, X_test, y_val, y_test = train_test_split(
+        X_temp, y_temp, test_size=0.5, stratify=y_temp, random_state=SEED
+    )
+    return {
+        "train": (X_train.tolist(), y_train.to_numpy()),
+        "val": (X_val.tolist(), y_val.to_numpy()),
+        "test": (X_test.tolist(), y_test.to_numpy()),
+    }
+
+
+def train(texts, labels, val_texts, val_labels):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    vectorizer = TfidfVectorizer(max_features=20000, ngram_range=(1, 2), stop_words="english")
+    X = vectorizer.fit_transform([clean_text(text) for text in texts])
+    model = LogisticRegression(max_iter=1000, class_weight="balanced", random_state=SEED)
+    model.fit(X, labels)
+
+    # Temperature: a one-parameter logistic fit of the validation labels on
+    # the logit, without intercept
+    logits = model.decision_function(vectorizer.transform([clean_text(t) for t in val_texts]))
+    scaling = LogisticRegression(fit_intercept=False, C=1e6).fit(logits.reshape(-1, 1), val_labels)
+    temperature = 1.0 / max(float(scaling.coef_[0, 0]), 1e-3)
+
+    return LinearSentiment.from_sklearn(vectorizer, model, temperature), (vectorizer, model)
+
+
+def save(model, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+# Evaluation
+# Scores the texts with each model alone, then runs the cascade per band:
+# share sent to the CNN, agreement with CNN-only labels, accuracy against
+# the review labels and CPU time per review. Texts go through in batches
+# of batch_size (the micro-batcher's size for /sentiment, a bulk chunk for
+# files): the CNN's per-call overhead is skipped entirely for batches the
+# linear model settles alone.
+def evaluate(texts, labels, bands, batch_size=1024, repeat=3):
+    from inference import predict_sentiment_cnn
+    from loaders import registry
+
+    linear = registry.get("sentiment_linear")
+    predict_sentiment_cnn(texts[:8])    # first-call tracing is not part of the comparison
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    def timed(fn):
+        best = None
+        for _ in range(repeat):
+            start = time.process_time()
+            out = [fn(batch) for batch in batches]
+            elapsed = time.process_time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return out, best / len(texts) * 1e6
+
+    cnn_probs, cnn_us = timed(lambda batch: np.asarray(predict_sentiment_cnn(batch)))
+    cnn_labels = np.concatenate(cnn_probs) > 0.5
+    linear_probs, linear_us = timed(linear.predict_proba)
+
+    rows = [
+        ("cnn only", 1.0, cnn_labels, cnn_us),
+        ("linear only", 0.0, np.concatenate(linear_probs) > 0.5, linear_us),
+    ]
+    for band in bands:
+        runner = SentimentCascade(band, audit_rate=0, enabled=True)
+        scored, us = timed(lambda batch: runner.score(batch, linear, predict_sentiment_cnn))
+        probs = np.concatenate([p for p, _ in scored])
+        stages = np.concatenate([m for _, m in scored])
+        rows.append((f"cascade {band[0]:g}-{band[1]:g}", (stages == "cnn").mean(), probs > 0.5, us))
+
+    print(f"{'mode':<18} {'to cnn':>7} {'agree cnn':>10} {'accuracy':>9} {'cpu us/review':>14} {'speedup':>8}")
+    for name, share, predicted, us in rows:
+        print(f"{name:<18} {share:>7.1%} {(predicted == cnn_labels).mean():>10.1%} "
+              f"{(predicted == labels).mean():>9.1%} {us:>14.0f} {cnn_us / us:>7.1f}x")
+
+
+# Command Line
+# python sentiment_cascade.py build       (fits on the notebook's training split)
+# python sentiment_cascade.py evaluate --bands 0.1-0.9,0.2-0.8,0.3-0.7
+def main():
+    from loaders import registry
+
+    parser = argparse.ArgumentParser(description="Linear first stage for the sentiment cascade")
+    parser.add_argument("command", choices=["build", "evaluate"])
+    parser.add_argument("--input", default=str(REVIEWS_CSV), help="reviews CSV (Feedback, Sentiment Label)")
+    parser.add_argument("--split", default="test", choices=["train", "val", "test", "all"],
+                        help="texts to evaluate on ('train' and 'all' include the linear model's training texts)")
+    parser.add_argument("--bands", default="0.1-0.9,0.2-0.8,0.3-0.7")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--output", default=str(registry.source_path("sentiment_linear")))
+    args = parser.parse_args()
+
+    splits = load_reviews(args.input)
+    if args.command == "build":
+        # Pickled under the importable module name, not __main__
+        from sentiment_cascade import train
+
+        start = time.perf_counter()
+        model, (vectorizer, reference) = train(*splits["train"], *splits["val"])
+        for name in ("val", "test"):
+            texts, labels = splits[name]
+            expected = reference.decision_function(vectorizer.transform([clean_text(t) for t in texts]))
+            if not np.allclose(model.decision_function(texts), expected):
+                raise SystemExit(f"compiled model disagrees with scikit-learn on the {name} split")
+            accuracy = ((model.predict_proba(texts) > 0.5) == labels).mean()
+            print(f"{name} accuracy {accuracy:.3f} ({len(texts)} reviews)")
+        save(model, args.output)
+        print(f"{len(model.index)} terms, temperature {model.temperature:.3f} -> {args.output} "
+              f"in {time.perf_counter() - start:.1f} s")
+        return
+
+    if args.split == "all":
+        texts = [t for s in splits.values() for t in s[0]]
+        labels = np.concatenate([s[1] for s in splits.values()])
+    else:
+        texts, labels = splits[args.split]
+    bands = [tuple(float(v) for v in band.split("-")) for band in args.bands.split(",")]
+    evaluate(texts, labels, bands, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+from early_warning import GATE_ENABLED, EarlyWarningGate
+from inference import check_sequence
+from loaders import registry
+
+
+# Session configuration (environment overrides)
+MAX_SESSIONS = int(os.environ.get("HEALTHAI_SEQUENCE_MAX_SESSIONS", 1000))
+SESSION_IDLE_SECONDS = float(os.environ.get("HEALTHAI_SEQUENCE_IDLE_SECONDS", 900))
+SESSION_WINDOW = int(os.environ.get("HEALTHAI_SEQUENCE_WINDOW", 48))
+
+
+class SessionLimitError(RuntimeError):
+    pass
+
+
+# Incremental RNN Evaluation
+# The deployed sequence model is SimpleRNN -> Dropout -> Dense. Running it
+# over t timesteps is the same as applying the recurrent cell once per
+# timestep, so a session only needs to keep the hidden state.
+ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "linear": lambda x: x,
+}
+
+
+class RecurrentStepper:
+    def __init__(self, kernel, recurrent_kernel, bias, activation,
+                 out_kernel, out_bias, out_activation):
+        self.kernel = kernel
+        self.recurrent_kernel = recurrent_kernel
+        self.bias = bias
+        self.activation = activation
+        self.out_kernel = out_kernel
+        self.out_bias = out_bias
+        self.out_activation = out_activation
+        self.units = recurrent_kernel.shape[0]
+
+    @classmethod
+    def from_model(cls, model):
+        # Only Keras models expose their layers (not e.g. TFLite)
+        if not hasattr(model, "layers"):
+            return None
+
+        layers = [
+            layer for layer in model.layers
+            if type(layer).__name__ not in ("Dropout", "InputLayer")
+        ]
+        if len(layers) != 2:
+            return None
+
+        rnn, dense = layers
+        if type(rnn).__name__ != "SimpleRNN" or rnn.return_sequences:
+            return None
+        if type(dense).__name__ != "Dense":
+            return None
+
+        activation = ACTIVATIONS.get(rnn.activation.__name__)
+        out_activation = ACTIVATIONS.get(dense.activation.__name__)
+        if activation is None or out_activation is None:
+            return None
+
+        kernel, recurrent_kernel, *bias = rnn.get_weights()
+        out_kernel, *out_bias = dense.get_weights()
+
+        return cls(
+            kernel.astype(np.float32),
+            recurrent_kernel.astype(np.float32),
+            bias[0].astype(np.float32) if bias else 0.0,
+            activation,
+            out_kernel.astype(np.float32),
+            out_bias[0].astype(np.float32) if out_bias else 0.0,
+            out_activation,
+        )
+
+    def initial_state(self, n=1):
+        return np.zeros((n, self.units), dtype=np.float32)
+
+    def step(self, x, state):
+        state = self.activation(x @ self.kernel + state @ self.recurrent_kernel + self.bias)
+        output = self.out_activation(state @ self.out_kernel + self.out_bias)
+        return state, output[:, 0]
+
+
+_steppers = {}
+
+
+def get_stepper():
+    model = registry.get("sequence_model")
+    key = id(model)
+    if key not in _steppers:
+        _steppers.clear()
+        _steppers[key] = RecurrentStepper.from_model(model)
+    return _steppers[key]
+
+
+# Monitoring Sessions
+# With an early-warning gate, rows the model skipped wait in `unscored`
+# and are stepped through (in order) the next time it runs, so the hidden
+# state and prediction then match scoring every tick.
+class MonitoringSession:
+    def __init__(self, session_id, window):
+        self.id = session_id
+        self.state = None
+        self.window = deque(maxlen=window)
+        self.unscored = []
+        self.timesteps = 0
+        self.prediction = None
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+        self.vitals_stats = None
+        self.warning = None
+        self.warning_score = None
+        self.skipped = 0
+
+    def info(self):
+        info = {
+            "session_id": self.id,
+            "timesteps": self.timesteps,
+            "prediction": self.prediction,
+        }
+        if self.warning_score is not None:
+            info["warning_score"] = self.warning_score
+            info["model_evaluated"] = self.skipped == 0
+        return info
+
+
+class SessionManager:
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_seconds=SESSION_IDLE_SECONDS,
+                 window=SESSION_WINDOW, gate=None):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.window = window
+        self.gate = gate if gate is not None else (EarlyWarningGate() if GATE_ENABLED else None)
+        self.evaluated = 0
+        self.skipped = 0
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.evicted = 0
+
+    def evict_idle(self):
+        now = time.monotonic()
+        cutoff = now - self.idle_seconds
+        with self._lock:
+            self._last_sweep = now
+            idle = [sid for sid, s in self._sessions.items() if s.last_seen < cutoff]
+            for sid in idle:
+                del self._sessions[sid]
+            self.evicted += len(idle)
+        return len(idle)
+
+    def open(self, session_id=None):
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return session
+
+        # Sweep at most once a second, or when the cap is reached
+        if (len(self._sessions) >= self.max_sessions
+                or time.monotonic() - self._last_sweep >= 1.0):
+            self.evict_idle()
+
+        with self._lock:
+            if session_id in self._sessions:
+                return self._sessions[session_id]
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(
+                    f"session limit reached ({self.max_sessions} active sessions)"
+                )
+            session = MonitoringSession(session_id or uuid.uuid4().hex, self.window)
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None or session.last_seen < time.monotonic() - self.idle_seconds:
+            raise KeyError(session_id)
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def push(self, session_id, values):
+        return self.push_many([session_id], [values])[0]
+
+    def push_many(self, session_ids, rows):
+        if len(set(session_ids)) != len(session_ids):
+            raise ValueError("each session can only be pushed once per call")
+        sessions = [self.get(sid) for sid in session_ids]
+
+        # Rejected before any state changes: one NaN or inf would poison the
+        # session's hidden state for every later tick
+        sequence_scaler = registry.get("sequence_scaler")
+        X = check_sequence(rows, sequence_scaler.n_features_in_)
+        X_scaled = sequence_scaler.transform(X).astype(np.float32)
+
+        # Lock in a fixed order so concurrent multi-session pushes cannot deadlock
+        ordered = sorted(sessions, key=lambda s: s.id)
+        for session in ordered:
+            session.lock.acquire()
+        try:
+            if self.gate is not None:
+                run = self.gate.check(sessions, X, X_scaled)
+            else:
+                run = np.ones(len(sessions), dtype=bool)
+            predictions = self._step(sessions, X_scaled, run)
+
+            now = time.monotonic()
+            for session, prediction, evaluated in zip(sessions, predictions, run):
+                session.timesteps += 1
+                session.prediction = float(prediction)
+                session.skipped = 0 if evaluated else session.skipped + 1
+                session.last_seen = now
+            n_run = int(run.sum())
+            self.evaluated += n_run
+            self.skipped += len(sessions) - n_run
+        finally:
+            for session in ordered:
+                session.lock.release()
+
+        return [session.info() for session in sessions]
+
+    # run: which sessions the model scores this tick (the others keep their
+    # last prediction)
+    def _step(self, sessions, X_scaled, run):
+        for session, x in zip(sessions, X_scaled):
+            session.window.append(x)
+            session.unscored.append(x)
+
+        outputs = [session.prediction for session in sessions]
+        scored = [sessions[i] for i in np.flatnonzero(run)]
+        if not scored:
+            return outputs
+
+        stepper = get_stepper()
+
+        if stepper is not None:
+            state = np.stack([
+                s.state if s.state is not None else stepper.initial_state()[0]
+                for s in scored
+            ])
+            # One step per pending row: step d advances the sessions with
+            # more than d rows waiting
+            pending = np.array([len(s.unscored) for s in scored])
+            last = np.zeros(len(scored), dtype=np.float32)
+            for d in range(pending.max()):
+                active = np.flatnonzero(pending > d)
+                x = np.stack([scored[i].unscored[d] for i in active])
+                state[active], last[active] = stepper.step(x, state[active])
+            for session, s_state in zip(scored, state):
+                session.state = s_state
+                session.unscored.clear()
+            scored_outputs = last
+        else:
+            # Unsupported architecture: re-run the model over each scaled window
+            sequence_model = registry.get("sequence_model")
+            scored_outputs = []
+            for session in scored:
+                window = np.stack(session.window)[np.newaxis]
+                scored_outputs.append(sequence_model.predict(window, verbose=0)[0][0])
+                session.unscored.clear()
+
+        for i, output in zip(np.flatnonzero(run), scored_outputs):
+            outputs[i] = output
+        return outputs
+
+    def stats(self):
+        self.evict_idle()
+        return {
+            "active_sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "idle_seconds": self.idle_seconds,
+            "evicted": self.evicted,
+            **({
+                "model_evaluations": self.evaluated,
+                "model_skips": self.skipped,
+            } if self.gate is not None else {}),
+        }
+
+
+sessions = SessionManager()
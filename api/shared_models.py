@@ -0,0 +1,120 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from tree_ensemble import CompiledTreeEnsemble
+
+
+# Shared-model configuration (environment overrides)
+MMAP_MODELS = os.environ.get("HEALTHAI_MMAP_MODELS", "0") != "0"
+
+SUFFIX = ".joblib"
+
+
+def shared_path(path):
+    return Path(path).with_suffix(SUFFIX)
+
+
+# Source Signatures
+# Each export records the size and mtime of the artifact it was made from
+# next to it; a copy whose source has since been replaced or retrained no
+# longer matches and is ignored until it is exported again.
+def source_signature(source):
+    stat = Path(source).stat()
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def signature_path(source):
+    return shared_path(source).with_suffix(SUFFIX + ".source")
+
+
+def is_current(source):
+    try:
+        recorded = signature_path(source).read_text().strip()
+        return shared_path(source).exists() and recorded == source_signature(source)
+    except FileNotFoundError:
+        return False
+
+
+# Shared Artifacts
+# Uncompressed joblib files store every numpy array as one aligned raw
+# block, so joblib.load(mmap_mode="r") maps them read-only instead of
+# copying: every worker on the host (forked or spawned) reads the same
+# page-cache pages. Compiled tree ensembles are exported without their
+# scikit-learn estimator, whose Tree objects always copy their nodes into
+# private memory when unpickled.
+def _as_arrays(obj):
+    # np.memmap slices and ufunc results carry memmap bookkeeping; plain
+    # ndarray views of the same mapping avoid it on the hot path
+    for key, value in vars(obj).items():
+        if isinstance(value, np.memmap):
+            setattr(obj, key, value.view(np.ndarray))
+
+
+def load_shared(path, source=None):
+    model = joblib.load(path, mmap_mode="r")
+    if hasattr(model, "__dict__"):
+        _as_arrays(model)
+    if isinstance(model, CompiledTreeEnsemble):
+        model.source = source
+    return model
+
+
+def array_bytes(obj):
+    return sum(v.nbytes for v in vars(obj).values() if isinstance(v, np.ndarray)) if hasattr(obj, "__dict__") else 0
+
+
+def export(registry, names):
+    exported = {}
+    for name in names:
+        source = registry.source_path(name)
+        loader = registry.artifacts[name][2]
+        model = loader(source)
+        if isinstance(model, CompiledTreeEnsemble):
+            model = model.detached()
+        if not array_bytes(model):
+            # e.g. the sentiment tokenizer: plain dicts, nothing to map
+            continue
+
+        path = shared_path(source)
+        signature = source_signature(source)
+        tmp = path.with_suffix(".tmp")
+        joblib.dump(model, tmp, compress=0)
+        os.replace(tmp, path)
+        # Written last: the copy only counts once its signature is in place
+        tmp = signature_path(source).with_suffix(".tmp")
+        tmp.write_text(signature)
+        os.replace(tmp, signature_path(source))
+        exported[name] = {
+            "path": str(path),
+            "array_mb": array_bytes(model) / 2**20,
+            "file_mb": path.stat().st_size / 2**20,
+        }
+    return exported
+
+
+# Command Line
+# python shared_models.py export    (then serve with HEALTHAI_MMAP_MODELS=1)
+def main():
+    from loaders import SHAREABLE_LOADERS, registry
+
+    parser = argparse.ArgumentParser(description="Export scikit-learn artifacts for memory-mapped serving")
+    parser.add_argument("command", choices=["export"])
+    parser.add_argument("--names", help="comma-separated artifact names (default: all shareable)")
+    args = parser.parse_args()
+
+    names = args.names.split(",") if args.names else [
+        name for name, (_, _, loader) in registry.artifacts.items() if loader in SHAREABLE_LOADERS
+    ]
+    start = time.perf_counter()
+    for name, info in export(registry, names).items():
+        print(f"{name:<16} {info['array_mb']:>7.1f} MB arrays -> {info['path']}")
+    print(f"done in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
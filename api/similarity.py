@@ -0,0 +1,456 @@
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+# Similarity configuration (environment overrides)
+COMPACT_ROWS = int(os.environ.get("HEALTHAI_SIMILAR_COMPACT_ROWS", 50_000))
+REFRESH_SECONDS = float(os.environ.get("HEALTHAI_SIMILAR_REFRESH_SECONDS", 5))
+MAX_K = int(os.environ.get("HEALTHAI_SIMILAR_MAX_K", 100))
+
+# Segmentation features (notebooks/3-patient_segmentation) and the outcomes
+# returned with every neighbour
+FEATURES = [
+    "age", "hemoglobin", "total_leukocyte_count", "platelet_count",
+    "glucose_level", "creatinine_level", "urea_level",
+]
+RISK_CONDITIONS = [
+    "diabetes_mellitus", "hypertension", "coronary_artery_disease", "chronic_kidney_disease",
+]
+OUTCOMES = {"length_of_stay_days": np.int16, "icu_stay_days": np.int16, "risk_level": np.int8}
+
+# Per-list arrays, sorted by list; the delta holds rows added since the
+# last compaction and is scanned exhaustively
+ROW_ARRAYS = ["vectors", "ids", "segments"] + list(OUTCOMES)
+META = "meta.json"
+
+
+# Similarity Index (IVF)
+# Patients live in the segment scaler's space. They are partitioned into
+# inverted lists around k-means centroids, and every list records its
+# radius (farthest member from the centroid). A query visits lists
+# nearest-centroid first and stops once |q - c| - radius exceeds the k-th
+# best distance found, so results are exact while most lists are skipped.
+#
+# The directory holds plain .npy files (memory-mapped on load) and a
+# meta.json written last; add() appends to a small delta that compact()
+# folds into the lists without retraining the centroids.
+#
+# Everything a query reads is loaded into one IndexState and swapped in
+# with a single assignment; search() and neighbours() read self.state
+# once, so a refresh from another thread never mixes arrays of two
+# versions.
+class TornReadError(Exception):
+    pass
+
+
+# The index is built at deploy time (python similarity.py build) from the
+# segmentation models being served; without one, or with one built from
+# other models, /similar answers 503 instead of neighbours in another space
+class IndexUnavailableError(RuntimeError):
+    pass
+
+
+class IndexState:
+    def __init__(self, path):
+        def array(name, mmap=True):
+            array = np.load(path / f"{name}.npy", mmap_mode="r" if mmap else None)
+            # Plain ndarray views of the mapping index faster than np.memmap
+            return array.view(np.ndarray)
+
+        self.meta = json.loads((path / META).read_text())
+        self.mtime = (path / META).stat().st_mtime_ns
+        self.offset = np.asarray(self.meta["scale_offset"], dtype=np.float32)
+        self.scale = np.asarray(self.meta["scale_factor"], dtype=np.float32)
+        self.segment_centroids = np.asarray(self.meta["segment_centroids"], dtype=np.float32)
+        self.segmentation = (None, None, False)
+
+        self.centroids = array("centroids", mmap=False)
+        self.radii = array("radii", mmap=False)
+        self.box_low = array("box_low", mmap=False)
+        self.box_high = array("box_high", mmap=False)
+        self.bounds = array("bounds", mmap=False)
+        self.rows = {name: array(name) for name in ROW_ARRAYS}
+        self.delta = {
+            name: array(f"delta_{name}", mmap=False) for name in ROW_ARRAYS
+        } if self.meta["delta_rows"] else None
+
+        # Writers replace the arrays one file at a time (meta.json last); a
+        # load that overlapped a write has sizes that disagree with meta
+        sizes = {len(a) for a in self.rows.values()} | {int(self.bounds[-1])}
+        delta_sizes = {len(a) for a in self.delta.values()} if self.delta else {0}
+        if (sizes != {self.meta["rows"]} or delta_sizes != {self.meta["delta_rows"]}
+                or len(self.bounds) != len(self.centroids) + 1
+                or (path / META).stat().st_mtime_ns != self.mtime):
+            raise TornReadError(f"{path} changed while loading")
+
+    # NaN, inf or values that overflow the float32 cast would match nothing
+    # (or everything at an infinite distance)
+    def transform(self, features):
+        with np.errstate(over="ignore", invalid="ignore"):
+            vector = self.offset + np.asarray(features, dtype=np.float32) * self.scale
+        if not np.isfinite(vector).all():
+            raise ValueError("features must be finite numbers")
+        return vector
+
+
+class SimilarityIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        if not (self.path / META).exists():
+            raise IndexUnavailableError(f"no similarity index in {self.path}; run similarity.py build")
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self, attempts=20):
+        for attempt in range(attempts):
+            try:
+                self.state = IndexState(self.path)
+                break
+            except (TornReadError, FileNotFoundError):
+                # Mid-write (or a compaction removing the delta): try again
+                # shortly; a refresh keeps serving the current state
+                if attempt == attempts - 1:
+                    if hasattr(self, "state"):
+                        break
+                    raise
+                time.sleep(0.01)
+        self.checked = time.monotonic()
+
+    def refresh(self):
+        # Picks up add()/compact() runs from other processes, checking the
+        # meta file at most every REFRESH_SECONDS
+        now = time.monotonic()
+        if now - self.checked < REFRESH_SECONDS:
+            return
+        self.checked = now
+        try:
+            mtime = (self.path / META).stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self.state.mtime:
+            with self.lock:
+                if mtime != self.state.mtime:
+                    self._load()
+
+    @property
+    def meta(self):
+        return self.state.meta
+
+    @property
+    def delta(self):
+        return self.state.delta
+
+    def __len__(self):
+        return self.meta["rows"] + self.meta["delta_rows"]
+
+    # Whether the index was built with these segmentation models: their
+    # scaling and centroids are stored in meta.json at build time
+    def built_with(self, scaler, kmeans, state=None):
+        state = state or self.state
+        if state.segmentation[0] is not scaler or state.segmentation[1] is not kmeans:
+            offset, factor = scaler_affine(scaler)
+            centroids = kmeans.cluster_centers_
+            matches = (
+                np.allclose(offset, state.meta["scale_offset"])
+                and np.allclose(factor, state.meta["scale_factor"])
+                and centroids.shape == state.segment_centroids.shape
+                and np.allclose(centroids, state.meta["segment_centroids"])
+            )
+            state.segmentation = (scaler, kmeans, matches)
+        return state.segmentation[2]
+
+    # Query
+    def transform(self, features):
+        return self.state.transform(features)
+
+    def segment(self, vector, state=None):
+        centroids = (state or self.state).segment_centroids
+        return int(np.argmin(((centroids - vector) ** 2).sum(axis=1)))
+
+    def search(self, features, k=10, state=None):
+        state = state or self.state
+        q = state.transform(features)
+        best_d = np.empty(0, dtype=np.float32)
+        best_src = np.empty(0, dtype=np.intp)
+
+        def merge(d, src):
+            nonlocal best_d, best_src
+            d = np.concatenate([best_d, d])
+            src = np.concatenate([best_src, src])
+            if len(d) > k:
+                keep = np.argpartition(d, k - 1)[:k]
+                d, src = d[keep], src[keep]
+            best_d, best_src = d, src
+
+        # Delta rows are encoded as -1 - position
+        if state.delta is not None:
+            d = ((state.delta["vectors"] - q) ** 2).sum(axis=1)
+            merge(d, -1 - np.arange(len(d)))
+
+        # Lower bound per list: the larger of the distances to its ball and
+        # to its bounding box. Lists are scanned in rounds of doubling size,
+        # nearest bound first.
+        centroid_d = np.sqrt(((state.centroids - q) ** 2).sum(axis=1))
+        ball = np.maximum(centroid_d - state.radii, 0) ** 2
+        box = (np.maximum(state.box_low - q, 0) + np.maximum(q - state.box_high, 0)) ** 2
+        lower = np.maximum(ball, box.sum(axis=1))
+        order = np.argsort(lower, kind="stable")
+        lower = lower[order]
+
+        vectors = state.rows["vectors"]
+        position, step, visited = 0, 4, 0
+        while position < len(order):
+            kth = best_d.max() if len(best_d) == k else np.inf
+            end = min(position + step, len(order))
+            end = position + int(np.searchsorted(lower[position:end], kth, side="right"))
+            if end == position:
+                break
+
+            lists = order[position:end]
+            starts, stops = state.bounds[lists], state.bounds[lists + 1]
+            rows = _ranges(starts, stops)
+            merge(((vectors[rows] - q) ** 2).sum(axis=1), rows)
+
+            visited += len(lists)
+            position, step = end, step * 2
+
+        order = np.argsort(best_d, kind="stable")
+        return np.sqrt(best_d[order]), best_src[order], visited
+
+    def neighbours(self, features, k=10):
+        state = self.state
+        distances, sources, visited = self.search(features, k, state)
+        results = []
+        for distance, src in zip(distances, sources):
+            rows, i = (state.rows, src) if src >= 0 else (state.delta, -1 - src)
+            vector = rows["vectors"][i].astype(np.float64)
+            results.append({
+                "patient_id": int(rows["ids"][i]),
+                "distance": round(float(distance), 4),
+                "segment": int(rows["segments"][i]),
+                "features": dict(zip(FEATURES, np.round((vector - state.offset) / state.scale, 2).tolist())),
+                **{name: int(rows[name][i]) for name in OUTCOMES},
+            })
+        return {
+            "segment": self.segment(state.transform(features), state),
+            "lists_visited": visited,
+            "neighbours": results,
+        }
+
+    # Updates
+    # Writers work on a copy of the current state's meta and load a new
+    # state when done
+    def add(self, frame, compact_rows=COMPACT_ROWS):
+        state = self.state
+        rows = _rows(frame, state.offset, state.scale, state.segment_centroids)
+        if state.delta is not None:
+            rows = {name: np.concatenate([state.delta[name], rows[name]]) for name in ROW_ARRAYS}
+
+        if len(rows["ids"]) >= compact_rows:
+            return self.compact(rows)
+
+        for name in ROW_ARRAYS:
+            _save(self.path, f"delta_{name}", rows[name])
+        meta = dict(state.meta)
+        meta["delta_rows"] = len(rows["ids"])
+        meta["max_id"] = max(meta["max_id"], int(rows["ids"].max()))
+        _save_meta(self.path, meta)
+        with self.lock:
+            self._load()
+        return self.meta
+
+    def compact(self, delta=None):
+        state = self.state
+        delta = delta if delta is not None else state.delta
+        merged = {name: np.concatenate([np.asarray(state.rows[name]), delta[name]]) for name in ROW_ARRAYS}
+        _write_lists(self.path, state.centroids, merged)
+
+        for name in ROW_ARRAYS:
+            (self.path / f"delta_{name}.npy").unlink(missing_ok=True)
+        meta = dict(
+            state.meta,
+            rows=len(merged["ids"]),
+            delta_rows=0,
+            max_id=max(state.meta["max_id"], int(merged["ids"].max())),
+        )
+        _save_meta(self.path, meta)
+        with self.lock:
+            self._load()
+        return self.meta
+
+
+# Row numbers of several [start, stop) ranges, without a Python loop
+def _ranges(starts, stops):
+    lengths = stops - starts
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return shifts + np.arange(lengths.sum())
+
+
+def load_similarity_index(path):
+    return SimilarityIndex(path)
+
+
+# Building
+def _save(directory, name, array):
+    tmp = Path(directory) / f"{name}.tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, Path(directory) / f"{name}.npy")
+
+
+def _save_meta(directory, meta):
+    tmp = Path(directory) / f"{META}.tmp"
+    tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, Path(directory) / META)
+
+
+def _nearest(X, centroids, chunk=65536):
+    labels = np.empty(len(X), dtype=np.intp)
+    norms = (centroids ** 2).sum(axis=1)
+    for start in range(0, len(X), chunk):
+        block = X[start:start + chunk]
+        labels[start:start + chunk] = np.argmin(norms - 2 * block @ centroids.T, axis=1)
+    return labels
+
+
+def _rows(frame, offset, scale, segment_centroids):
+    vectors = (offset + frame[FEATURES].to_numpy(dtype=np.float32) * scale).astype(np.float32)
+    rows = {
+        "vectors": vectors,
+        "ids": frame["patient_id"].to_numpy(dtype=np.int64),
+        "segments": _nearest(vectors, segment_centroids).astype(np.int8),
+    }
+    risk = (frame[RISK_CONDITIONS].to_numpy() != 0).any(axis=1)
+    for name, dtype in OUTCOMES.items():
+        rows[name] = (risk if name == "risk_level" else frame[name].to_numpy()).astype(dtype)
+    return rows
+
+
+def _write_lists(directory, centroids, rows):
+    labels = _nearest(rows["vectors"], centroids)
+    order = np.argsort(labels, kind="stable")
+    labels = labels[order]
+
+    bounds = np.searchsorted(labels, np.arange(len(centroids) + 1)).astype(np.int64)
+    vectors = rows["vectors"][order]
+    distances = np.sqrt(((vectors - centroids[labels]) ** 2).sum(axis=1))
+    radii = np.zeros(len(centroids), dtype=np.float32)
+    np.maximum.at(radii, labels, distances)
+
+    # Empty lists get an inverted box, which no query can fall inside
+    box_low = np.full(centroids.shape, np.inf, dtype=np.float32)
+    box_high = np.full(centroids.shape, -np.inf, dtype=np.float32)
+    np.minimum.at(box_low, labels, vectors)
+    np.maximum.at(box_high, labels, vectors)
+
+    for name in ROW_ARRAYS:
+        _save(directory, name, rows[name][order])
+    _save(directory, "radii", radii)
+    _save(directory, "box_low", box_low)
+    _save(directory, "box_high", box_high)
+    _save(directory, "bounds", bounds)
+
+
+# The segment scaler is affine per feature: scaled = offset + x * factor
+def scaler_affine(scaler):
+    import pandas as pd
+
+    names = getattr(scaler, "feature_names_in_", None)
+    if names is not None and list(names) != FEATURES:
+        raise ValueError(f"scaler was fitted on {list(names)}, expected {FEATURES}")
+
+    zeros = pd.DataFrame(np.zeros((1, len(FEATURES))), columns=FEATURES)
+    offset = scaler.transform(zeros)[0]
+    return offset, scaler.transform(zeros + 1)[0] - offset
+
+
+def build_index(path, frame, scaler, kmeans, n_lists=None, seed=0):
+    from sklearn.cluster import MiniBatchKMeans
+
+    offset, factor = scaler_affine(scaler)
+    rows = _rows(frame, offset.astype(np.float32), factor.astype(np.float32),
+                 kmeans.cluster_centers_.astype(np.float32))
+    X = rows["vectors"]
+
+    # About 4 * sqrt(n) lists (4000 at a million patients), trained on a sample
+    n_lists = n_lists or int(np.clip(4 * np.sqrt(len(X)), 1, 4096))
+    rng = np.random.default_rng(seed)
+    sample = X[rng.choice(len(X), min(len(X), 50 * n_lists), replace=False)]
+    quantizer = MiniBatchKMeans(n_clusters=n_lists, random_state=seed, n_init=3,
+                                batch_size=4096).fit(sample)
+    centroids = quantizer.cluster_centers_.astype(np.float32)
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    for stale in path.glob("delta_*.npy"):
+        stale.unlink()
+    _save(path, "centroids", centroids)
+    _write_lists(path, centroids, rows)
+    _save_meta(path, {
+        "features": FEATURES,
+        "rows": len(X),
+        "delta_rows": 0,
+        "lists": n_lists,
+        "max_id": int(rows["ids"].max()),
+        "scale_offset": offset.tolist(),
+        "scale_factor": factor.tolist(),
+        "segment_centroids": kmeans.cluster_centers_.tolist(),
+    })
+    return SimilarityIndex(path)
+
+
+# Patients (the cleaned-data store, keyed by serial number; rows of
+# cleaned_data.csv, keyed by position, without one)
+def load_patients(min_id=None):
+    import data_store
+
+    columns = FEATURES + RISK_CONDITIONS + ["length_of_stay_days", "icu_stay_days"]
+    try:
+        frame = data_store.load_cleaned(columns + [data_store.KEY], with_key=True)
+        frame = frame.rename(columns={data_store.KEY: "patient_id"})
+    except data_store.StoreError:
+        import pandas as pd
+        frame = pd.read_csv(data_store.DATA_DIR / "cleaned_data.csv", usecols=columns)
+        frame["patient_id"] = np.arange(len(frame))
+
+    if min_id is not None:
+        frame = frame[frame["patient_id"] > min_id]
+    return frame
+
+
+# Command Line
+# python similarity.py build [--lists N]
+# python similarity.py update   (adds store rows above the index's max id)
+def main():
+    from loaders import registry
+
+    parser = argparse.ArgumentParser(description="Build or update the similar-patient index")
+    parser.add_argument("command", choices=["build", "update", "compact"])
+    parser.add_argument("--lists", type=int)
+    parser.add_argument("--output", default=str(registry.source_path("similarity_index")))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "build":
+        index = build_index(args.output, load_patients(), registry.get("scaler"),
+                            registry.get("kmeans_model"), args.lists)
+    else:
+        index = SimilarityIndex(args.output)
+        if args.command == "update":
+            frame = load_patients(min_id=index.meta["max_id"])
+            if len(frame):
+                index.add(frame)
+        elif index.delta is not None:
+            index.compact()
+
+    print(f"{len(index)} patients ({index.meta['delta_rows']} in delta), {index.meta['lists']} "
+          f"lists ({time.perf_counter() - start:.2f} s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
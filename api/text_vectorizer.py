@@ -0,0 +1,122 @@
+import re
+from itertools import repeat
+
+import numpy as np
+
+
+# Compiled Sentiment Vocabulary
+# Reproduces Tokenizer.texts_to_sequences + pad_sequences (Keras defaults:
+# int32, value 0, "pre" padding and truncation) for a whole batch at once:
+#   * the batch is joined with a boundary marker, lower-cased, filtered and
+#     split in one pass (a character-class regex replaces str.translate,
+#     which has no fast path for non-ASCII text),
+#   * words map to their final ids through a dict restricted to the
+#     tokenizer's num_words (ids >= num_words and unknown words fold into
+#     the OOV id, or are dropped when there is no OOV token),
+#   * ids are scattered into a preallocated int32 matrix with numpy.
+EMPTY = -1
+BOUNDARY = -2
+BOUNDARY_CHAR = "\x00"
+
+
+class CompiledVocabulary:
+    def __init__(self, word_index, num_words=None, oov_token=None, lower=True,
+                 filters="", split=" ", maxlen=100, padding="pre", truncating="pre"):
+        oov_index = word_index.get(oov_token) if oov_token is not None else None
+
+        self.index = {
+            word: i for word, i in word_index.items()
+            if not num_words or i < num_words
+        }
+        self.index[""] = EMPTY
+        self.index[BOUNDARY_CHAR] = BOUNDARY
+        self.default = oov_index if oov_index is not None else EMPTY
+
+        self.lower = lower
+        self.split = split
+        self.maxlen = maxlen
+        self.padding = padding
+        self.truncating = truncating
+
+        self.filter_pattern = re.compile(f"[{re.escape(filters)}]") if filters else None
+        self.joinable = BOUNDARY_CHAR not in filters and BOUNDARY_CHAR != split
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer, maxlen=100, padding="pre", truncating="pre"):
+        if tokenizer.char_level or tokenizer.analyzer is not None:
+            raise ValueError("only word-level tokenizers without a custom analyzer are supported")
+
+        return cls(
+            tokenizer.word_index,
+            num_words=tokenizer.num_words,
+            oov_token=tokenizer.oov_token,
+            lower=tokenizer.lower,
+            filters=tokenizer.filters,
+            split=tokenizer.split,
+            maxlen=maxlen,
+            padding=padding,
+            truncating=truncating,
+        )
+
+    def _filter(self, text):
+        if self.lower:
+            text = text.lower()
+        if self.filter_pattern is not None:
+            text = self.filter_pattern.sub(self.split, text)
+        return text
+
+    def _tokens(self, texts):
+        # One pass over the joined batch when the boundary marker is unused
+        joined = BOUNDARY_CHAR.join(texts)
+        if self.joinable and joined.count(BOUNDARY_CHAR) == len(texts) - 1:
+            joined = self._filter(joined).replace(
+                BOUNDARY_CHAR, f"{self.split}{BOUNDARY_CHAR}{self.split}"
+            )
+            return joined.split(self.split)
+
+        tokens = []
+        for i, text in enumerate(texts):
+            if i:
+                tokens.append(BOUNDARY_CHAR)
+            tokens.extend(
+                word if word != BOUNDARY_CHAR else None
+                for word in self._filter(text).split(self.split)
+            )
+        return tokens
+
+    def transform(self, texts, out=None):
+        n = len(texts)
+        if out is None:
+            out = np.zeros((n, self.maxlen), dtype=np.int32)
+        else:
+            out[:n].fill(0)
+        if n == 0:
+            return out
+
+        tokens = self._tokens(texts)
+        ids = np.fromiter(
+            map(self.index.get, tokens, repeat(self.default)),
+            dtype=np.int32,
+            count=len(tokens)
+        )
+
+        rows = np.cumsum(ids == BOUNDARY)
+        keep = ids >= 0
+        ids, rows = ids[keep], rows[keep]
+
+        lengths = np.bincount(rows, minlength=n)
+        starts = np.cumsum(lengths) - lengths
+        position = np.arange(len(ids)) - starts[rows]
+
+        # Position of each kept token in its padded row
+        length = lengths[rows]
+        overflow = np.maximum(length - self.maxlen, 0)
+        offset = overflow if self.truncating == "pre" else 0
+        kept = (position >= offset) & (position < offset + self.maxlen)
+
+        column = position - offset
+        if self.padding == "pre":
+            column = column + (self.maxlen - np.minimum(length, self.maxlen))
+
+        out[rows[kept], column[kept]] = ids[kept]
+        return out
@@ -0,0 +1,193 @@
+import argparse
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+# TFLite configuration (environment overrides)
+TFLITE_THREADS = int(os.environ.get("HEALTHAI_TFLITE_THREADS", os.cpu_count() or 1))
+QUANT_MODES = ("float32", "float16", "dynamic", "int8")
+
+
+def tflite_path(keras_path, mode):
+    keras_path = Path(keras_path)
+    return keras_path.with_name(f"{keras_path.stem}.{mode}.tflite")
+
+
+def interpreter_class():
+    # The standalone runtimes avoid importing TensorFlow at all; the
+    # TensorFlow one is the fallback (and is required for recurrent models,
+    # which are converted with select TF ops).
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+# TFLite Model
+# Drop-in for the Keras models' predict(x, verbose=0) and predict_on_batch.
+# XNNPACK is applied by the interpreter for supported float ops; the input
+# tensor is resized when the batch (or sequence) shape changes.
+class TFLiteModel:
+    def __init__(self, path, num_threads=TFLITE_THREADS):
+        self.path = Path(path)
+        self.interpreter = interpreter_class()(model_path=str(path), num_threads=num_threads)
+
+        # Tensors are allocated on the first call, once the real input shape
+        # is known (dynamic dimensions default to 1, which may not be valid)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.input_shape = None
+        self.lock = threading.Lock()
+
+    def predict(self, x, verbose=0):
+        x = np.asarray(x, dtype=self.input["dtype"])
+
+        with self.lock:
+            if x.shape != self.input_shape:
+                self.interpreter.resize_tensor_input(self.input["index"], x.shape)
+                self.interpreter.allocate_tensors()
+                self.input_shape = x.shape
+
+            self.interpreter.set_tensor(self.input["index"], x)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output["index"]).copy()
+
+    def predict_on_batch(self, x):
+        return self.predict(x)
+
+
+def load_tflite(path):
+    return TFLiteModel(path)
+
+
+# Conversion
+# Keras 3 models are exported to a SavedModel first (converting them
+# directly crashes the MLIR converter). Recurrent layers keep a variable
+# time dimension through select TF ops, so any sequence length still works.
+def _is_recurrent(model):
+    return any("unroll" in layer.get_config() for layer in model.layers)
+
+
+def export_saved_model(model, directory):
+    import keras
+    import tensorflow as tf
+
+    shape = list(model.inputs[0].shape)
+    shape[0] = None
+    if _is_recurrent(model):
+        shape[1] = None
+
+    archive = keras.export.ExportArchive()
+    archive.track(model)
+    archive.add_endpoint(
+        "serve",
+        lambda x: model(x, training=False),
+        input_signature=[tf.TensorSpec(shape, model.inputs[0].dtype)]
+    )
+    archive.write_out(directory)
+
+
+def convert(model, mode, calibration=None):
+    import tensorflow as tf
+
+    if mode not in QUANT_MODES:
+        raise ValueError(f"mode must be one of {QUANT_MODES}")
+    if mode == "int8" and calibration is None:
+        raise ValueError("int8 quantization needs calibration samples")
+
+    with tempfile.TemporaryDirectory() as directory:
+        export_saved_model(model, directory)
+        converter = tf.lite.TFLiteConverter.from_saved_model(directory)
+
+        if _is_recurrent(model):
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS
+            ]
+            converter._experimental_lower_tensor_list_ops = False
+
+        if mode != "float32":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if mode == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        if mode == "int8":
+            dtype = model.inputs[0].dtype
+            converter.representative_dataset = lambda: (
+                [np.asarray(sample, dtype=dtype)[None]] for sample in calibration
+            )
+
+        return converter.convert()
+
+
+# Calibration Samples (local data)
+def calibration_samples(group, limit=200, image_dir=None):
+    from loaders import registry
+
+    root = Path(__file__).resolve().parents[1] / "data"
+
+    if group == "image":
+        from image_pipeline import decode_image, to_model_input
+
+        directory = Path(image_dir) if image_dir else root / "lung_cancer"
+        paths = sorted(
+            p for p in directory.rglob("*")
+            if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+        )[:limit]
+        if not paths:
+            raise FileNotFoundError(f"no JPEG/PNG images under {directory}")
+        return [to_model_input([decode_image(p.read_bytes())])[0].copy() for p in paths]
+
+    if group == "sequence":
+        import pandas as pd
+
+        scaler = registry.get("sequence_scaler")
+        return [
+            scaler.transform(pd.read_excel(p).values.astype(np.float64)).astype(np.float32)
+            for p in sorted((root / "time_seris" / "test_dataset").glob("*.xlsx"))
+        ][:limit]
+
+    if group == "sentiment":
+        import pandas as pd
+        from inference import vectorize_texts
+
+        texts = pd.read_csv(root / "hospital_reviews" / "hospital_reviews.csv")["Feedback"]
+        return list(vectorize_texts(texts.astype(str).tolist()[:limit]))
+
+    raise ValueError(f"no TFLite model in group '{group}'")
+
+
+# Command Line
+# python tflite_backend.py --group image --mode int8 --image-dir <scans>
+def main():
+    from loaders import KERAS_MODELS, load_keras, registry
+
+    parser = argparse.ArgumentParser(description="Convert a Keras model to TFLite")
+    parser.add_argument("--group", required=True, choices=sorted(KERAS_MODELS))
+    parser.add_argument("--mode", default="dynamic", choices=QUANT_MODES)
+    parser.add_argument("--image-dir", help="calibration images for the image model")
+    parser.add_argument("--calibration-size", type=int, default=200)
+    args = parser.parse_args()
+
+    name = KERAS_MODELS[args.group]
+    source = registry.source_path(name)
+    model = load_keras(source)
+
+    calibration = None
+    if args.mode == "int8":
+        calibration = calibration_samples(args.group, args.calibration_size, args.image_dir)
+
+    target = tflite_path(source, args.mode)
+    target.write_bytes(convert(model, args.mode, calibration))
+    print(f"wrote {target} ({target.stat().st_size / 2**20:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
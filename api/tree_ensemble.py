@@ -0,0 +1,201 @@
+import copy
+import os
+import pickle
+import threading
+
+import numpy as np
+
+
+# Tree configuration (environment overrides)
+TREE_BACKEND = os.environ.get("HEALTHAI_TREE_BACKEND", "compiled")
+TREE_MAX_ROWS = int(os.environ.get("HEALTHAI_TREE_MAX_ROWS", 64))
+
+FOREST_TYPES = (
+    "RandomForestClassifier", "RandomForestRegressor",
+    "ExtraTreesClassifier", "ExtraTreesRegressor",
+    "DecisionTreeClassifier", "DecisionTreeRegressor",
+)
+BOOSTING_TYPES = ("GradientBoostingClassifier", "GradientBoostingRegressor")
+
+
+# Compiled Tree Ensemble
+# All fitted trees are flattened into contiguous node arrays (global node
+# ids, leaves have left == -1). Rows walk down every tree at once, one
+# level per numpy step; only (row, tree) pairs not yet at a leaf are kept
+# active. Per-tree outputs are then added in estimator order, exactly as
+# scikit-learn accumulates them, so predictions are identical.
+#
+# Level-wise traversal costs O(rows * trees * depth) numpy work, which
+# beats scikit-learn's per-estimator dispatch on small batches only; larger
+# batches (> TREE_MAX_ROWS rows) are handed to the original estimator.
+class CompiledTreeEnsemble:
+    def __init__(self, estimator, max_rows=TREE_MAX_ROWS):
+        self._estimator = estimator
+        self.source = None
+        self.estimator_name = type(estimator).__name__
+        self.max_rows = max_rows
+        self.n_features_in_ = estimator.n_features_in_
+        self.classes_ = getattr(estimator, "classes_", None)
+
+        kind = type(estimator).__name__
+        self.is_classifier = kind.endswith("Classifier")
+        self.is_boosting = kind in BOOSTING_TYPES
+
+        if self.is_boosting:
+            self._compile_boosting(estimator)
+        elif hasattr(estimator, "estimators_"):
+            self._compile_trees([e.tree_ for e in estimator.estimators_], self._forest_values)
+        else:
+            self._compile_trees([estimator.tree_], self._forest_values)
+
+    @staticmethod
+    def supports(estimator):
+        kind = type(estimator).__name__
+        if kind in BOOSTING_TYPES:
+            # Constant (dummy or zero) init estimators only
+            init = getattr(estimator, "init_", None)
+            return init == "zero" or type(init).__name__.startswith("Dummy")
+        if kind not in FOREST_TYPES:
+            return False
+        return getattr(estimator, "n_outputs_", 1) == 1
+
+    # Shared copies (see shared_models.py) are stored without the estimator;
+    # it is unpickled from `source` the first time a large batch needs it.
+    _fallback_lock = threading.Lock()
+
+    @property
+    def estimator(self):
+        if self._estimator is None:
+            with self._fallback_lock:
+                if self._estimator is None:
+                    with open(self.source, "rb") as f:
+                        self._estimator = pickle.load(f)
+        return self._estimator
+
+    def detached(self):
+        compiled = copy.copy(self)
+        compiled._estimator = None
+        return compiled
+
+    def _forest_values(self, tree):
+        value = tree.value[:, 0, :].astype(np.float64)
+        if not self.is_classifier:
+            return value[:, :1]
+
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        return value / normalizer
+
+    def _compile_trees(self, trees, values_fn, columns=None):
+        feature, threshold, left, right, values, roots = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            values.append(values_fn(tree))
+            offset += tree.node_count
+
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.values = np.concatenate(values)
+        self.roots = np.array(roots, dtype=np.intp)
+        self.columns = columns
+
+    def _compile_boosting(self, estimator):
+        stages, n_outputs = estimator.estimators_.shape
+        scale = estimator.learning_rate
+
+        # Stage k adds scale * value to output column k, in stage order
+        trees = [estimator.estimators_[s, k].tree_ for s in range(stages) for k in range(n_outputs)]
+        columns = np.array([k for _ in range(stages) for k in range(n_outputs)])
+        self._compile_trees(trees, lambda tree: scale * tree.value[:, 0, :1], columns)
+
+        self.n_outputs = n_outputs
+        self.init_raw = (
+            np.zeros((1, n_outputs))
+            if estimator.init_ == "zero"
+            else estimator._raw_predict_init(np.zeros((1, self.n_features_in_), dtype=np.float32))
+        )
+
+    # Traversal
+    def _check(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1] if X.ndim else 0} features, but "
+                f"{self.estimator_name} is expecting {self.n_features_in_} features as input."
+            )
+        if not np.isfinite(X).all():
+            raise ValueError("features must be finite numbers")
+        return X
+
+    def apply(self, X):
+        n, n_features = X.shape
+        n_trees = len(self.roots)
+
+        flat = X.ravel()
+        base = np.repeat(np.arange(n) * n_features, n_trees)
+        node = np.tile(self.roots, n)
+
+        active = np.flatnonzero(self.left[node] >= 0)
+        while active.size:
+            current = node[active]
+            # float32 features against float64 thresholds, as in sklearn
+            go_left = flat[base[active] + self.feature[current]] <= self.threshold[current]
+            nxt = np.where(go_left, self.left[current], self.right[current])
+            node[active] = nxt
+            active = active[self.left[nxt] >= 0]
+
+        return node.reshape(n, n_trees)
+
+    def _raw(self, X):
+        leaves = self.apply(X)
+
+        if self.is_boosting:
+            out = np.repeat(self.init_raw.astype(np.float64), len(X), axis=0)
+            for t, k in enumerate(self.columns):
+                out[:, k] += self.values[leaves[:, t], 0]
+            return out
+
+        out = np.zeros((len(X), self.values.shape[1]))
+        for t in range(leaves.shape[1]):
+            out += self.values[leaves[:, t]]
+        out /= leaves.shape[1]
+        return out
+
+    # Estimator API
+    def predict(self, X):
+        X = self._check(X)
+        if len(X) > self.max_rows:
+            return self.estimator.predict(X)
+
+        raw = self._raw(X)
+        if self.is_boosting:
+            if not self.is_classifier:
+                return raw[:, 0]
+            if self.n_outputs == 1:
+                return self.classes_.take((raw[:, 0] >= 0).astype(int))
+            return self.classes_.take(np.argmax(raw, axis=1))
+
+        if self.is_classifier:
+            return self.classes_.take(np.argmax(raw, axis=1))
+        return raw[:, 0]
+
+    def predict_proba(self, X):
+        X = self._check(X)
+        if len(X) > self.max_rows or self.is_boosting:
+            return self.estimator.predict_proba(X)
+        return self._raw(X)
+
+
+def compile_tree_ensemble(estimator):
+    if TREE_BACKEND == "compiled" and CompiledTreeEnsemble.supports(estimator):
+        return CompiledTreeEnsemble(estimator)
+    return estimator
@@ -0,0 +1,114 @@
+import argparse
+import sys
+import time
+import tracemalloc
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+import associations
+
+
+# Baseline: level-wise apriori over a boolean matrix (what mlxtend does),
+# used when mlxtend itself is not installed
+def bool_apriori(matrix, min_support, max_len):
+    n = len(matrix)
+    support = matrix.mean(axis=0)
+    level = [(i,) for i in np.flatnonzero(support >= min_support)]
+    counts = {itemset: int(matrix[:, itemset].all(axis=1).sum()) for itemset in level}
+
+    while level and len(level[0]) < max_len:
+        frequent = set(level)
+        candidates = sorted({
+            tuple(sorted(set(a) | set(b)))
+            for a, b in combinations(level, 2)
+            if len(set(a) | set(b)) == len(a) + 1
+        })
+        candidates = [
+            c for c in candidates
+            if all(sub in frequent for sub in combinations(c, len(c) - 1))
+        ]
+        level = []
+        for itemset in candidates:
+            count = int(matrix[:, itemset].all(axis=1).sum())
+            if count >= min_support * n:
+                counts[itemset] = count
+                level.append(itemset)
+    return counts
+
+
+def mlxtend_apriori(items, matrix, min_support, max_len):
+    import pandas as pd
+    from mlxtend.frequent_patterns import apriori
+    frame = pd.DataFrame(matrix, columns=items)
+    return apriori(frame, min_support=min_support, use_colnames=True, max_len=max_len)
+
+
+def measure(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bitset Eclat vs boolean-matrix apriori")
+    parser.add_argument("--min-support", type=float, default=associations.MIN_SUPPORT)
+    parser.add_argument("--max-len", type=int, default=associations.MAX_ANTECEDENTS + 1)
+    parser.add_argument("--scale", type=int, default=1, help="repeat the transactions")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        import mlxtend  # noqa: F401
+        baseline_name = "mlxtend apriori"
+    except ImportError:
+        baseline_name = "bool apriori"
+
+    all_flags = associations.diagnosis_flags()
+
+    print(f"{'items':>5} {'rows':>8} {'itemsets':>9} {baseline_name + ' ms':>18} {'MB':>6} "
+          f"{'eclat ms':>9} {'MB':>6} {'speedup':>8}")
+    for conditions in (associations.CONDITIONS, all_flags):
+        items, matrix = associations.load_transactions(conditions)
+        matrix = np.tile(matrix, (args.scale, 1))
+
+        if baseline_name == "mlxtend apriori":
+            baseline = lambda: mlxtend_apriori(items, matrix, args.min_support, args.max_len)
+        else:
+            baseline = lambda: bool_apriori(matrix, args.min_support, args.max_len)
+        eclat = lambda: associations.frequent_itemsets(
+            associations.to_bitsets(matrix), len(matrix), args.min_support, args.max_len
+        )
+
+        base_s, base_mem, base_result = measure(baseline, args.repeats)
+        eclat_s, eclat_mem, counts = measure(eclat, args.repeats)
+        assert len(base_result) == len(counts)
+        print(f"{len(items):>5} {len(matrix):>8} {len(counts):>9} {base_s * 1e3:>18.1f} "
+              f"{base_mem / 2**20:>6.1f} {eclat_s * 1e3:>9.1f} {eclat_mem / 2**20:>6.1f} "
+              f"{base_s / eclat_s:>7.1f}x")
+
+    # Query latency against the notebook-configuration index
+    items, matrix = associations.load_transactions()
+    index = associations.build_index(items, matrix)
+    patient = index.items_for(["hypertension", "diabetes_mellitus"],
+                              {"glucose_level": 180, "age": 67, "gender": "M"})
+    n = 100000
+    start = time.perf_counter()
+    for _ in range(n):
+        index.match(patient)
+    print(f"\nmatch over {len(index.rules)} rules: {(time.perf_counter() - start) / n * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+from early_warning import EarlyWarningGate, HALF_LIFE, MAX_SKIP, PREDICTION_BAND, SCORE_DELTA, SLOPE_LIMIT, Z_LIMIT
+from ingestion import ALERT_THRESHOLD
+from sessions import SessionManager
+
+TRAJECTORIES = ROOT / "data" / "time_seris" / "test_dataset"
+
+
+def load_trajectories():
+    return {path.stem: pd.read_excel(path).to_numpy(np.float64) for path in sorted(TRAJECTORIES.glob("*.xlsx"))}
+
+
+# Replays every patient tick by tick (one push_many per tick, as the
+# ingestor does); returns predictions and evaluated flags (ticks x patients)
+# and CPU seconds
+def replay(manager, patients):
+    ids = list(patients)
+    for patient_id in ids:
+        manager.open(patient_id)
+    ticks = min(len(rows) for rows in patients.values())
+
+    predictions = np.zeros((ticks, len(ids)))
+    evaluated = np.zeros((ticks, len(ids)), dtype=bool)
+    start = time.process_time()
+    for t in range(ticks):
+        results = manager.push_many(ids, [patients[p][t] for p in ids])
+        predictions[t] = [r["prediction"] for r in results]
+        evaluated[t] = [r.get("model_evaluated", True) for r in results]
+    return predictions, evaluated, time.process_time() - start
+
+
+# Alert ticks: prediction at or above the ingestor's threshold. Onsets are
+# the ticks an alert starts (including a first tick already above it); an
+# onset is caught if the gated run alerts on the same tick.
+def compare(baseline, gated, evaluated, threshold=ALERT_THRESHOLD):
+    base_alert, gated_alert = baseline >= threshold, gated >= threshold
+    onset = base_alert & ~np.vstack([np.zeros((1, base_alert.shape[1]), bool), base_alert[:-1]])
+    alerts = base_alert.sum()
+    return {
+        "ticks": baseline.size,
+        "evaluated": int(evaluated.sum()),
+        "skip": 1 - evaluated.mean(),
+        "alert_recall": (gated_alert & base_alert).sum() / alerts if alerts else float("nan"),
+        "false_alerts": int((gated_alert & ~base_alert).sum()),
+        "onsets": int(onset.sum()),
+        "onsets_caught": int((onset & gated_alert).sum()),
+        "max_error": float(np.abs(gated - baseline).max()),
+    }
+
+
+def jittered(patients, replicas, jitter, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        f"{name}-{i}": rows * (1 + rng.normal(0, jitter, rows.shape))
+        for i in range(replicas) for name, rows in patients.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Early-warning gate: model skips and alert recall against scoring every tick")
+    parser.add_argument("--replicas", type=int, default=250, help="jittered copies per trajectory for the CPU comparison")
+    parser.add_argument("--jitter", type=float, default=0.02, help="relative noise on the copies")
+    parser.add_argument("--half-life", type=float, default=HALF_LIFE)
+    parser.add_argument("--z-limit", type=float, default=Z_LIMIT)
+    parser.add_argument("--slope-limit", type=float, default=SLOPE_LIMIT)
+    parser.add_argument("--score-delta", type=int, default=SCORE_DELTA)
+    parser.add_argument("--max-skip", type=int, default=MAX_SKIP)
+    parser.add_argument("--prediction-band", default=",".join(map(str, PREDICTION_BAND)))
+    args = parser.parse_args()
+
+    def gate():
+        return EarlyWarningGate(
+            args.half_life, args.z_limit, args.slope_limit, args.score_delta, args.max_skip,
+            tuple(float(v) for v in args.prediction_band.split(",")),
+        )
+
+    backend = os.environ.get("HEALTHAI_BACKEND_SEQUENCE", "keras")
+    patients = load_trajectories()
+    print(f"sequence backend: {backend}, alert threshold {ALERT_THRESHOLD}")
+    print(f"{'trajectory':<30} {'ticks':>5} {'model runs':>10} {'skipped':>8} {'alert recall':>12} "
+          f"{'onsets':>7} {'false alerts':>12} {'max |diff|':>10}")
+
+    rows = {}
+    for name, trajectory in patients.items():
+        baseline, _, _ = replay(SessionManager(gate=None), {name: trajectory})
+        gated, evaluated, _ = replay(SessionManager(gate=gate()), {name: trajectory})
+        rows[name] = compare(baseline, gated, evaluated)
+    baseline, _, _ = replay(SessionManager(gate=None), patients)
+    gated, evaluated, _ = replay(SessionManager(gate=gate()), patients)
+    rows["all four"] = compare(baseline, gated, evaluated)
+
+    for name, m in rows.items():
+        print(f"{name:<30} {m['ticks']:>5} {m['evaluated']:>10} {m['skip']:>8.1%} {m['alert_recall']:>12.1%} "
+              f"{m['onsets_caught']:>3}/{m['onsets']:<3} {m['false_alerts']:>12} {m['max_error']:>10.3f}")
+
+    if args.replicas:
+        population = jittered(patients, args.replicas, args.jitter)
+        baseline, _, base_cpu = replay(SessionManager(gate=None, max_sessions=len(population)), population)
+        gated, evaluated, gated_cpu = replay(SessionManager(gate=gate(), max_sessions=len(population)), population)
+        m = compare(baseline, gated, evaluated)
+        per_tick = 1e6 / m["ticks"]
+        print(f"\n{len(population)} jittered patients: {m['skip']:.1%} skipped, alert recall "
+              f"{m['alert_recall']:.1%}, onsets {m['onsets_caught']}/{m['onsets']}, "
+              f"{m['false_alerts']} false alerts")
+        print(f"cpu per patient-tick: every tick {base_cpu * per_tick:.1f} us, "
+              f"gated {gated_cpu * per_tick:.1f} us ({base_cpu / gated_cpu:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+import feature_store
+from schemas import ScoreInput, TabularInput
+
+
+# Synthetic admissions: real ones resampled, with sparse IDs so lookups
+# also miss
+def synthesize(frame, n, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = frame.iloc[rng.integers(len(frame), size=n)].reset_index(drop=True)
+    sample["admission_id"] = np.arange(n) * 3 + 1000
+    return sample
+
+
+def percentile_us(timings, q):
+    return np.percentile(timings, q) * 1e6
+
+
+def timed(fn, args):
+    timings = []
+    for arg in args:
+        t = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - t)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature store lookups and updates by admission ID")
+    parser.add_argument("--sizes", default="14622,1000000,3000000")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=100, help="IDs per multi-ID lookup")
+    args = parser.parse_args()
+
+    from loaders import registry
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    scaler = registry.get("scaler")
+    admissions, _ = feature_store.load_admissions()
+
+    # What a /los request costs today before the model runs: validating
+    # the 22-feature JSON vector, against an ID body
+    rng = np.random.default_rng(1)
+    vector = TabularInput(features=rng.random(len(feature_store.MODELS["los"])).tolist()).model_dump_json()
+    vector_us = np.median(timed(TabularInput.model_validate_json, [vector] * args.queries)) * 1e6
+    id_us = np.median(timed(ScoreInput.model_validate_json, ['{"admission_id": 12345}'] * args.queries)) * 1e6
+    print(f"JSON validation: 22-feature vector {vector_us:.1f} us, admission ID {id_us:.1f} us\n")
+
+    print(f"{'admissions':>10} {'build s':>8} {'MB':>7} {'1 id p50 us':>12} {'p99 us':>7} "
+          f"{f'{args.batch} ids p50 us':>15} {'update p50 us':>14} {'update p99 us':>14}")
+    for n in map(int, args.sizes.split(",")):
+        frame = admissions if n == len(admissions) else synthesize(admissions, n)
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            feature_store.build(frame, tmp, scaler)
+            build = time.perf_counter() - start
+            size = sum(p.stat().st_size for p in Path(tmp).iterdir()) / 2**20
+            del frame
+
+            # A fresh open, as a worker would; lookups read the three
+            # matrices a risk, LOS and segment request would
+            store = feature_store.FeatureStore(tmp)
+            ids = store.ids[rng.integers(len(store), size=args.queries)] + rng.integers(0, 2, args.queries)
+
+            def lookup(ids):
+                for matrix in ("risk", "los", feature_store.SCALED):
+                    store.rows(matrix, ids)
+
+            single = timed(lambda i: lookup([i]), ids.tolist())
+            batches = [ids[i:i + args.batch] for i in range(0, len(ids) - args.batch + 1, args.batch)]
+            many = timed(lookup, batches)
+            updates = timed(
+                lambda i: store.update(i, {"creatinine_level": 1.1, "hemoglobin": 12.0}, scaler),
+                store.ids[rng.integers(len(store), size=min(args.queries, 1000))].tolist(),
+            )
+
+            print(f"{len(store):>10} {build:>8.1f} {size:>7.0f} {percentile_us(single, 50):>12.1f} "
+                  f"{percentile_us(single, 99):>7.1f} {percentile_us(many, 50):>15.1f} "
+                  f"{percentile_us(updates, 50):>14.1f} {percentile_us(updates, 99):>14.1f}")
+            del store
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+
+def percentiles_ms(timings):
+    if not timings:
+        return "-"
+    p50, p99 = np.percentile(timings, [50, 99]) * 1e3
+    return f"{len(timings):>6} {p50:>8.2f} {p99:>8.2f} {max(timings) * 1e3:>9.1f}"
+
+
+# Calls predict() back to back on a client thread, recording
+# (start time, latency), until stop is set
+def hammer(predict, stop, timings):
+    while not stop.is_set():
+        start = time.perf_counter()
+        predict()
+        timings.append((start, time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request latency while a model version is swapped in")
+    parser.add_argument("--group", default="sentiment", choices=["sentiment", "image", "sequence", "risk", "los", "segment"])
+    parser.add_argument("--seconds", type=float, default=3.0, help="load before and after the swap")
+    args = parser.parse_args()
+
+    # A scratch copy of the model directory with the served files
+    # released as version "next"
+    tmp = Path(tempfile.mkdtemp())
+    shutil.copytree(ROOT / "api" / "models", tmp / "models", symlinks=False)
+    os.environ["HEALTHAI_MODEL_DIR"] = str(tmp / "models")
+    os.environ["HEALTHAI_MODEL_WATCH_SECONDS"] = "0"
+
+    import inference
+    from loaders import MODEL_GROUPS, registry
+    from model_versions import release, versions
+
+    calls = {
+        "sentiment": lambda: inference.predict_sentiment_batch(["the staff were kind and the room was clean"]),
+        "image": lambda: inference.predict_image_batch([np.zeros((224, 224, 3), dtype=np.uint8)]),
+        "sequence": lambda: inference.predict_sequence_batch(
+            [np.zeros((10, registry.get("sequence_scaler").n_features_in_))]),
+        "risk": lambda: inference.predict_risk([0.0] * registry.get("risk_model").n_features_in_),
+        "los": lambda: inference.predict_los([0.0] * registry.get("los_model").n_features_in_),
+        "segment": lambda: inference.predict_segment([0.0] * registry.get("scaler").n_features_in_),
+    }
+    predict = calls[args.group]
+
+    try:
+        release(args.group, "next")
+
+        # Restart-style reload: a fresh process loads (importing TensorFlow
+        # for Keras groups) and warms on the request path, so the first
+        # request waits for all of it
+        registry.preload([args.group], warmup=False)
+        start = time.perf_counter()
+        registry.warmup(args.group)
+        cold_warmup = time.perf_counter() - start
+        cold_load = sum(registry.load_stats[name]["load_seconds"] for name in MODEL_GROUPS[args.group])
+
+        # Hot swap under load
+        stop, timings = threading.Event(), []
+        client = threading.Thread(target=hammer, args=(predict, stop, timings))
+        client.start()
+        time.sleep(args.seconds)
+        swap_start = time.perf_counter()
+        versions.activate(args.group, "next", persist=False)
+        while registry.active[args.group] != "next":
+            time.sleep(0.001)
+        swap_end = time.perf_counter()
+        time.sleep(args.seconds)
+        stop.set()
+        client.join()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    phases = {
+        "before": [d for t, d in timings if t + d < swap_start],
+        "during swap": [d for t, d in timings if t + d >= swap_start and t < swap_end],
+        "after": [d for t, d in timings if t >= swap_end],
+    }
+    print(f"{args.group}: restart-style reload blocks the first request for "
+          f"{(cold_load + cold_warmup) * 1e3:.0f} ms (load {cold_load * 1e3:.0f} ms, "
+          f"warmup {cold_warmup * 1e3:.0f} ms)")
+    print(f"hot swap: loaded and warmed in the background in {(swap_end - swap_start) * 1e3:.0f} ms\n")
+    print(f"{'phase':<12} {'calls':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>9}")
+    for phase, durations in phases.items():
+        print(f"{phase:<12} {percentiles_ms(durations)}")
+
+
+if __name__ == "__main__":
+    main()
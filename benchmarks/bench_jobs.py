@@ -0,0 +1,95 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import orjson
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+
+def wait(queue, job_id):
+    while (job := queue.get(job_id))["status"] not in ("done", "failed", "cancelled"):
+        time.sleep(0.01)
+    return job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background job throughput against direct batch calls")
+    parser.add_argument("--kind", default="sentiment", choices=["sentiment", "segment", "risk", "los"])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--chunks", default="256,2048,8192", help="job chunk sizes (rows)")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    os.environ["HEALTHAI_JOB_POLL_SECONDS"] = "0.01"
+
+    import inference
+    from batch_score import TASKS, read_chunks
+    from features import encode
+    from jobs import JobQueue
+
+    # The input: hospital reviews or cleaned admissions, resampled to --rows
+    rng = np.random.default_rng(0)
+    if args.kind == "sentiment":
+        source = pd.read_csv(ROOT / "data" / "hospital_reviews" / "hospital_reviews.csv")
+        source = source[["Feedback"]].rename(columns={"Feedback": "text"})
+    else:
+        source = pd.read_csv(ROOT / "data" / "cleaned_data.csv", usecols=TASKS[args.kind][1])
+    frame = source.iloc[rng.integers(len(source), size=args.rows)].reset_index(drop=True)
+    path = tmp / "input.csv"
+    frame.to_csv(path, index=False)
+    del frame
+
+    # Synchronous: the same file read, scored and serialized in the
+    # caller's thread, 2048 rows per batch call (what a bulk request does)
+    def direct():
+        columns = ["text"] if args.kind == "sentiment" else TASKS[args.kind][1]
+        start = 0
+        for chunk in read_chunks(path, columns, 2048):
+            if args.kind == "sentiment":
+                results = inference.predict_sentiment_batch(chunk["text"].fillna("").astype(str).tolist())
+            else:
+                results = getattr(inference, f"predict_{args.kind}_batch")(encode(chunk, columns), start)
+            b"".join(orjson.dumps(result) + b"\n" for result in results)
+            start += len(chunk)
+
+    direct()  # loads and warms the models
+    start = time.perf_counter()
+    direct()
+    direct_seconds = time.perf_counter() - start
+    print(f"{args.kind}, {args.rows} rows: synchronous scoring {args.rows / direct_seconds:,.0f} rows/s\n")
+
+    print(f"{'chunk rows':>10} {'submit ms':>10} {'first result ms':>16} {'total s':>8} {'rows/s':>9} "
+          f"{'vs direct':>10}")
+    for chunk_rows in map(int, args.chunks.split(",")):
+        queue = JobQueue(tmp / f"jobs-{chunk_rows}", workers=1, max_running=1, chunk_rows=chunk_rows)
+        queue.start()
+        try:
+            with open(path, "rb") as f:
+                start = time.perf_counter()
+                job = queue.submit(args.kind, uploads=[("input.csv", f)])
+                submitted = time.perf_counter() - start
+
+            # Time until the first chunk's lines can be read
+            while queue.get(job["job_id"])["rows_done"] == 0:
+                time.sleep(0.001)
+            first = time.perf_counter() - start
+
+            job = wait(queue, job["job_id"])
+            total = time.perf_counter() - start
+        finally:
+            queue.stop()
+
+        rate = job["rows_done"] / total
+        print(f"{chunk_rows:>10} {submitted * 1e3:>10.1f} {first * 1e3:>16.0f} {total:>8.2f} {rate:>9,.0f} "
+              f"{rate * direct_seconds / args.rows:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+import metrics
+
+
+# Primitive Costs (per call, in this process)
+def primitives(number=200_000):
+    histogram = metrics.Histogram("bench_seconds", "", ["endpoint", "stage"])
+    counter = metrics.Counter("bench_total", "", ["endpoint"])
+    timer = metrics.RequestTimer({})
+    metrics.current_request.set(timer)
+
+    def timed_stage():
+        with metrics.stage("score"):
+            pass
+        timer.stages.clear()
+
+    def timed_model_stage():
+        with metrics.model_stage("bench", "predict"):
+            pass
+
+    cases = {
+        "histogram.observe": lambda: histogram.observe(0.003, "/risk", "score"),
+        "counter.inc": lambda: counter.inc("/risk"),
+        "stage() block": timed_stage,
+        "model_stage() block": timed_model_stage,
+    }
+    print(f"{'primitive':<22} {'ns/call':>8}")
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=number, repeat=3))
+        print(f"{name:<22} {seconds / number * 1e9:>8.0f}")
+
+    for i in range(50):
+        histogram.observe(i / 1000, f"/endpoint{i % 10}", f"stage{i % 5}")
+    registry = metrics.MetricsRegistry()
+    registry.add(histogram)
+    seconds = min(timeit.repeat(registry.render, number=100, repeat=3)) / 100
+    print(f"{'render 50 series':<22} {seconds * 1e9:>8.0f}")
+
+
+# End to End: the load test with instrumentation off, on, and profiling
+# every request (HEALTHAI_PROFILE_RATE=1)
+def end_to_end(endpoints, duration, concurrency):
+    variants = {
+        "metrics off": {"HEALTHAI_METRICS_ENABLED": "0"},
+        "metrics on": {"HEALTHAI_METRICS_ENABLED": "1"},
+        "profile all": {"HEALTHAI_PROFILE_RATE": "1", "HEALTHAI_PROFILE_DIR": tempfile.mkdtemp()},
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, env in variants.items():
+            output = Path(tmp) / f"{name.replace(' ', '-')}.json"
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.loadtest", "--endpoints", endpoints,
+                 "--concurrency", str(concurrency), "--duration", str(duration),
+                 "--output", str(output)],
+                cwd=ROOT, env={**os.environ, **env}, check=True, capture_output=True,
+            )
+            results[name] = json.loads(output.read_text())["endpoints"]
+
+    print(f"\n{'endpoint':<13} {'variant':<12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for endpoint in endpoints.split(","):
+        for name, result in results.items():
+            m = result[endpoint][str(concurrency)]
+            print(f"{endpoint:<13} {name:<12} {m['rps']:>8.1f} {m['p50_ms']:>8.2f} {m['p99_ms']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of the /metrics instrumentation")
+    parser.add_argument("--endpoints", default="risk,associations,similar")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--primitives-only", action="store_true")
+    args = parser.parse_args()
+
+    primitives()
+    if not args.primitives_only:
+        end_to_end(args.endpoints, args.duration, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
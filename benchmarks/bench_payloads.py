@@ -0,0 +1,108 @@
+import argparse
+import io
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import orjson
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+from payloads import decode_array
+from schemas import BatchTabularInput
+
+
+# Request Bodies
+def encode_bodies(X):
+    bodies = {"json": (orjson.dumps({"rows": X.tolist()}), "application/json")}
+
+    buffer = io.BytesIO()
+    np.save(buffer, X)
+    bodies["npy"] = (buffer.getvalue(), "application/x-npy")
+
+    try:
+        import pyarrow as pa
+        table = pa.table({f"f{i}": X[:, i] for i in range(X.shape[1])})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        bodies["arrow"] = (sink.getvalue().to_pybytes(), "application/vnd.apache.arrow.stream")
+    except ImportError:
+        print("pyarrow not installed, skipping Arrow")
+
+    try:
+        import msgpack
+        packed = {"rows": {"dtype": X.dtype.str, "shape": list(X.shape), "data": X.tobytes()}}
+        bodies["msgpack"] = (msgpack.packb(packed), "application/msgpack")
+    except ImportError:
+        print("msgpack not installed, skipping msgpack")
+
+    return bodies
+
+
+# Decoders (what the endpoint does before scoring)
+def pydantic_json(body, _):
+    # Previous path: stdlib JSON + pydantic model + numpy conversion
+    return np.array(BatchTabularInput(**json.loads(body)).rows, dtype=np.float64)
+
+
+def validated_json(body, _):
+    return np.array(BatchTabularInput.model_validate_json(body).rows, dtype=np.float64)
+
+
+def binary(body, content_type):
+    return decode_array(body, content_type, "rows")
+
+
+def measure(fn, body, content_type, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(body, content_type)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn(body, content_type)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request decode time and peak memory")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--cols", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    X = np.random.default_rng(0).normal(100, 30, (args.rows, args.cols))
+    bodies = encode_bodies(X)
+
+    cases = [
+        ("json (json + pydantic)", pydantic_json, "json"),
+        ("json (model_validate_json)", validated_json, "json"),
+    ] + [(f"{name}", binary, name) for name in bodies if name != "json"]
+
+    print(f"{args.rows}x{args.cols} float64 matrix ({X.nbytes / 2**20:.1f} MB)")
+    print(f"{'format':<28} {'body MB':>8} {'decode ms':>10} {'peak MB':>8}")
+    for label, fn, name in cases:
+        body, content_type = bodies[name]
+        seconds, peak, result = measure(fn, body, content_type, args.repeats)
+        assert np.array_equal(result, X), label
+        print(f"{label:<28} {len(body) / 2**20:>8.2f} {seconds * 1e3:>10.1f} {peak / 2**20:>8.1f}")
+
+    # Response encoding for one result per row
+    results = [{"index": i, "risk_class": int(i % 2)} for i in range(args.rows)]
+    for label, dumps in (("json.dumps", lambda r: json.dumps(r).encode()), ("orjson.dumps", orjson.dumps)):
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            dumps({"results": results})
+        print(f"response {label:<19} {(time.perf_counter() - start) / args.repeats * 1e3:>19.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+import similarity
+
+
+# Synthetic cohort: real patients resampled with multiplicative noise
+def synthesize(frame, n, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = frame.iloc[rng.integers(len(frame), size=n)].reset_index(drop=True)
+    noise = rng.normal(1.0, 0.05, (n, len(similarity.FEATURES)))
+    sample[similarity.FEATURES] = sample[similarity.FEATURES].to_numpy() * noise
+    sample["patient_id"] = np.arange(n)
+    return sample
+
+
+def percentile_ms(timings, q):
+    return np.percentile(timings, q) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF similar-patient search vs brute force")
+    parser.add_argument("--sizes", default="14622,100000,1000000")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, help="inverted lists (default ~sqrt(n))")
+    args = parser.parse_args()
+
+    from loaders import registry
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+    scaler, kmeans = registry.get("scaler"), registry.get("kmeans_model")
+    patients = similarity.load_patients()
+
+    print(f"{'patients':>9} {'lists':>6} {'build s':>8} {'visited':>8} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'brute p50 ms':>13} {'exact':>6}")
+    for n in map(int, args.sizes.split(",")):
+        frame = patients if n == len(patients) else synthesize(patients, n)
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            index = similarity.build_index(tmp, frame, scaler, kmeans, args.lists)
+            build = time.perf_counter() - start
+
+            X = index.transform(frame[similarity.FEATURES].to_numpy())
+            rng = np.random.default_rng(1)
+            queries = patients[similarity.FEATURES].to_numpy()[rng.integers(len(patients), size=args.queries)]
+            queries = queries * rng.normal(1.0, 0.05, queries.shape)
+
+            timings, brute, visited, exact = [], [], [], 0
+            for features in queries:
+                t = time.perf_counter()
+                distances, _, lists = index.search(features, args.k)
+                timings.append(time.perf_counter() - t)
+                visited.append(lists)
+
+                t = time.perf_counter()
+                d = ((X - index.transform(features)) ** 2).sum(axis=1)
+                reference = np.sqrt(np.sort(d[np.argpartition(d, args.k)[:args.k]]))
+                brute.append(time.perf_counter() - t)
+                exact += np.allclose(distances, reference, atol=1e-4)
+
+            print(f"{n:>9} {index.meta['lists']:>6} {build:>8.1f} {np.mean(visited):>8.1f} "
+                  f"{percentile_ms(timings, 50):>7.2f} {percentile_ms(timings, 99):>7.2f} "
+                  f"{percentile_ms(brute, 50):>13.2f} {exact / len(queries):>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+import data_store
+
+
+# Synthetic extract: the master CSV repeated with fresh serial numbers
+def synthesize(path, scale):
+    master = pd.read_csv(data_store.MASTER_CSV, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    with open(path, "w", newline="") as fp:
+        for i in range(scale):
+            block = master.copy()
+            block["SNO"] = (np.arange(len(master)) + 1 + i * len(master)).astype(str)
+            block.to_csv(fp, header=i == 0, index=False)
+    return scale * len(master)
+
+
+# Workloads (each runs in its own process so peak RSS is not shared)
+def notebook_clean(source, store):
+    # notebooks/data_cleaning.ipynb, whole file in memory
+    df = pd.read_csv(source, encoding="utf-8-sig")
+    rename, _ = data_store.derive_schema()
+    df = df.rename(columns=rename)
+    df = df.drop(["date_of_admission", "date_of_discharge", "serial_no", "admission_no",
+                  "admission_month_year", "outcome"], axis=1)
+    df.replace("EMPTY", 0, inplace=True)
+    labs = data_store.LAB_COLUMNS
+    df[labs] = df[labs].replace(r"^\s*$", np.nan, regex=True)
+    df = df[~(df[labs].isna() | (df[labs] == 0)).any(axis=1)].reset_index(drop=True)
+    df = df.drop(["bnp_level", "ejection_fraction"], axis=1)
+    df[labs] = df[labs].apply(pd.to_numeric, errors="coerce")
+    df.to_csv(Path(store) / "cleaned.csv", index=False)
+    return len(df)
+
+
+def pipeline_build(source, store, chunk_rows):
+    return data_store.build(source, store, chunk_rows)["rows_written"]
+
+
+def read_csv(source, store):
+    return len(pd.read_csv(Path(store) / "cleaned.csv"))
+
+
+def read_store(source, store):
+    return len(data_store.load_cleaned(store_dir=store))
+
+
+WORKLOADS = {
+    "notebook clean -> csv": notebook_clean,
+    "pipeline build": pipeline_build,
+    "read cleaned csv": read_csv,
+    "read store": read_store,
+}
+
+
+def worker(args):
+    fn = WORKLOADS[args.worker]
+    extra = (args.chunk_rows,) if fn is pipeline_build else ()
+    start = time.perf_counter()
+    rows = fn(args.source, args.store, *extra)
+    print(json.dumps({
+        "rows": rows,
+        "seconds": time.perf_counter() - start,
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def run(workload, source, store, chunk_rows):
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", workload, "--source", str(source),
+         "--store", str(store), "--chunk-rows", str(chunk_rows)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notebook cleaning vs chunked columnar store")
+    parser.add_argument("--scales", default="1,10,50")
+    parser.add_argument("--chunk-rows", type=int, default=data_store.CHUNK_ROWS)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    parser.add_argument("--store", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args)
+
+    for scale in map(int, args.scales.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "master.csv"
+            rows = synthesize(source, scale)
+            size = source.stat().st_size / 2**20
+            print(f"\n[x{scale}] {rows} admissions, {size:.0f} MB CSV, chunks of {args.chunk_rows} rows")
+            print(f"{'workload':<24} {'rows':>9} {'seconds':>8} {'peak RSS MB':>12}")
+
+            for workload in WORKLOADS:
+                stats = run(workload, source, tmp, args.chunk_rows)
+                print(f"{workload:<24} {stats['rows']:>9} {stats['seconds']:>8.2f} {stats['peak_mb']:>12.0f}")
+
+            # Appending one more day of admissions to the grown source
+            extra = pd.read_csv(data_store.MASTER_CSV, dtype=str, keep_default_na=False,
+                                encoding="utf-8-sig", nrows=50)
+            extra["SNO"] = (np.arange(50) + rows + 1).astype(str)
+            extra.to_csv(source, mode="a", header=False, index=False)
+            start = time.perf_counter()
+            stats = data_store.append(source, tmp, args.chunk_rows)
+            print(f"{'append 50 rows':<24} {stats['rows_written']:>9} "
+                  f"{time.perf_counter() - start:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
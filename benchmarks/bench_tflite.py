@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+MODES = ["float32", "float16", "dynamic", "int8"]
+
+
+# Evaluation Inputs (model-ready arrays, identical for every backend)
+def synthetic_scans(n, seed=0):
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    scans = []
+    for _ in range(n):
+        noise = rng.integers(0, 256, (224, 224, 3), dtype=np.uint8)
+        scans.append(cv2.GaussianBlur(noise, (0, 0), rng.uniform(2, 12)))
+    return scans
+
+
+def eval_inputs(group, n, image_dir=None):
+    if group == "image":
+        from image_pipeline import decode_image, to_model_input
+
+        if image_dir:
+            paths = sorted(
+                p for p in Path(image_dir).rglob("*")
+                if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+            )[:n]
+            images = [decode_image(p.read_bytes()) for p in paths]
+        else:
+            images = synthetic_scans(n)
+        return to_model_input(images).copy()
+
+    if group == "sequence":
+        from loaders import registry
+        from tflite_backend import calibration_samples
+
+        rng = np.random.default_rng(0)
+        trajectories = calibration_samples("sequence")
+        windows = []
+        for i in range(n):
+            base = trajectories[i % len(trajectories)]
+            rows = base[np.arange(48) % len(base)]
+            windows.append(rows + rng.normal(0, 0.1, rows.shape))
+        return np.array(windows, dtype=np.float32)
+
+    if group == "sentiment":
+        from tflite_backend import calibration_samples
+        return np.array(calibration_samples("sentiment", limit=n))
+
+    raise ValueError(group)
+
+
+# Worker (one process per backend so RSS is not shared)
+def worker(args):
+    from loaders import KERAS_MODELS, current_rss_mb, registry
+
+    rss_start = current_rss_mb()
+    x = np.load(args.inputs)
+
+    start = time.perf_counter()
+    model = registry.get(KERAS_MODELS[args.group])
+    load_seconds = time.perf_counter() - start
+
+    predictions = np.concatenate([
+        model.predict(x[i:i + 32], verbose=0)[:, 0] for i in range(0, len(x), 32)
+    ])
+    np.save(args.output, predictions)
+
+    latency = {}
+    for batch in (1, 32):
+        sample = x[:batch]
+        model.predict(sample, verbose=0)
+        timings = []
+        for _ in range(args.repeats):
+            t = time.perf_counter()
+            model.predict(sample, verbose=0)
+            timings.append(time.perf_counter() - t)
+        latency[batch] = float(np.median(timings) * 1e3)
+
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "rss_mb": current_rss_mb(),
+        "rss_delta_mb": current_rss_mb() - rss_start,
+        "latency_ms": latency,
+    }))
+
+
+def run_backend(group, backend, inputs, repeats):
+    env = dict(os.environ, TF_CPP_MIN_LOG_LEVEL="3")
+    key = group.upper()
+    if backend == "keras":
+        env[f"HEALTHAI_BACKEND_{key}"] = "keras"
+    else:
+        env[f"HEALTHAI_BACKEND_{key}"] = "tflite"
+        env[f"HEALTHAI_TFLITE_{key}_MODE"] = backend
+
+    # Written by the worker next to its inputs, in the caller's temp dir
+    output = str(Path(inputs).with_name(f"{group}-{backend}.npy"))
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", "--group", group, "--inputs", inputs,
+         "--output", output, "--repeats", str(repeats)],
+        env=env, cwd=ROOT / "api", capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1]
+
+    stats = json.loads(proc.stdout.strip().splitlines()[-1])
+    return np.load(output), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TFLite vs Keras parity, latency and RSS")
+    parser.add_argument("--groups", default="image,sequence,sentiment")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--samples", type=int, default=256)
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--image-dir", help="real scans (synthetic images otherwise)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--group", help=argparse.SUPPRESS)
+    parser.add_argument("--inputs", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args)
+
+    from loaders import KERAS_MODELS, registry
+    from tflite_backend import tflite_path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for group in args.groups.split(","):
+            inputs = str(Path(tmp) / f"{group}-inputs.npy")
+            np.save(inputs, eval_inputs(group, args.samples, args.image_dir))
+
+            print(f"\n[{group}] {args.samples} samples")
+            print(f"{'backend':<9} {'size MB':>8} {'load s':>7} {'RSS MB':>7} {'b=1 ms':>8} "
+                  f"{'b=32 ms':>8} {'max |dp|':>9} {'mean |dp|':>10} {'agree':>7}")
+
+            reference = None
+            for backend in ["keras"] + args.modes.split(","):
+                path = registry.source_path(KERAS_MODELS[group])
+                if backend != "keras":
+                    path = tflite_path(path, backend)
+                    if not path.exists():
+                        print(f"{backend:<9} not converted ({path.name})")
+                        continue
+
+                predictions, stats = run_backend(group, backend, inputs, args.repeats)
+                if predictions is None:
+                    print(f"{backend:<9} failed: {stats}")
+                    continue
+                if reference is None:
+                    reference = predictions
+
+                diff = np.abs(predictions - reference)
+                agree = np.mean((predictions >= 0.5) == (reference >= 0.5))
+                print(f"{backend:<9} {path.stat().st_size / 2**20:>8.2f} {stats['load_seconds']:>7.2f} "
+                      f"{stats['rss_mb']:>7.0f} {stats['latency_ms']['1']:>8.2f} "
+                      f"{stats['latency_ms']['32']:>8.2f} {diff.max():>9.5f} {diff.mean():>10.6f} "
+                      f"{agree:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
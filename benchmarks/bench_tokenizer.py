@@ -0,0 +1,88 @@
+import argparse
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+from text_vectorizer import CompiledVocabulary
+
+REVIEWS = ROOT / "data" / "hospital_reviews" / "hospital_reviews.csv"
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "!!!???",
+    "UPPER case Words",
+    "tabs\tand\nnewlines\r\nmixed",
+    "unknownwordzzz another_unknown",
+    "word " * 250,
+    "Ünïcödé façade — naïve café",
+    "null\x00byte inside",
+]
+
+
+def load_tokenizer(args):
+    if args.fit:
+        from tensorflow.keras.preprocessing.text import Tokenizer
+
+        # Same settings as notebooks/7-sentiment_analysis.ipynb
+        tokenizer = Tokenizer(num_words=20000, oov_token="<OOV>")
+        tokenizer.fit_on_texts(pd.read_csv(REVIEWS)["Feedback"].astype(str))
+        return tokenizer
+
+    from loaders import registry
+    with open(args.tokenizer or registry.path("sentiment_tokenizer"), "rb") as f:
+        return pickle.load(f)
+
+
+def keras_path(tokenizer, texts):
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+    return pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=100)
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled vocabulary vs Keras Tokenizer")
+    parser.add_argument("--tokenizer", help="path to cnn_tokenizer.pkl")
+    parser.add_argument("--fit", action="store_true", help="fit a tokenizer on the reviews instead")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    tokenizer = load_tokenizer(args)
+    vocabulary = CompiledVocabulary.from_tokenizer(tokenizer, maxlen=100)
+    reviews = pd.read_csv(REVIEWS)["Feedback"].astype(str).tolist()
+
+    # Parity (batched and one text at a time)
+    texts = reviews + EDGE_CASES
+    expected = keras_path(tokenizer, texts)
+    assert np.array_equal(vocabulary.transform(texts), expected), "batch output differs"
+    for text, row in zip(texts, expected):
+        assert np.array_equal(vocabulary.transform([text])[0], row), f"differs on {text!r}"
+    print(f"parity: {len(texts)} texts bit-identical (dtype {expected.dtype})")
+
+    # Latency
+    print(f"{'batch':>6} {'keras (ms)':>12} {'compiled (ms)':>14} {'speedup':>8}")
+    for size in (1, 32, len(reviews)):
+        batch = reviews[:size]
+        keras_time = best_of(lambda: keras_path(tokenizer, batch), args.repeats)
+        compiled_time = best_of(lambda: vocabulary.transform(batch), args.repeats)
+        print(f"{size:>6} {keras_time * 1e3:>12.3f} {compiled_time * 1e3:>14.3f} "
+              f"{keras_time / compiled_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+from features import LOS_FEATURES, RISK_FEATURES
+from tree_ensemble import CompiledTreeEnsemble
+
+CLEANED = ROOT / "data" / "cleaned_data.csv"
+
+FEATURES = {"risk_model": RISK_FEATURES, "los_model": LOS_FEATURES}
+
+
+def load_rows(name):
+    df = pd.read_csv(CLEANED)
+    df["gender"] = df["gender"].map({"M": 1, "F": 0})
+    df["admission_type"] = df["admission_type"].map({"E": 1, "O": 0})
+    df["residence_type"] = df["residence_type"].map({"R": 1, "U": 0})
+    return df[FEATURES[name]].values.astype(np.float64)
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled tree ensemble vs pickled estimator")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--sizes", default="1,8,32,128,256,1024,10000")
+    args = parser.parse_args()
+
+    from loaders import load_pickle, registry
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    for name in ("risk_model", "los_model"):
+        estimator = load_pickle(registry.source_path(name))
+        compiled = CompiledTreeEnsemble(estimator, max_rows=np.inf)
+        rows = load_rows(name)
+
+        same = np.array_equal(compiled.predict(rows), estimator.predict(rows))
+        print(f"\n[{name}] {type(estimator).__name__}, {len(compiled.roots)} trees, "
+              f"{len(compiled.feature)} nodes; identical on {len(rows)} rows: {same}")
+        print(f"{'rows':>6} {'sklearn ms':>11} {'compiled ms':>12} {'speedup':>8}")
+
+        for size in map(int, args.sizes.split(",")):
+            X = rows[np.arange(size) % len(rows)]
+            repeats = args.repeats if size <= 1024 else max(3, args.repeats // 5)
+            sk = best_of(lambda: estimator.predict(X), repeats)
+            co = best_of(lambda: compiled.predict(X), repeats)
+            print(f"{size:>6} {sk * 1e3:>11.3f} {co * 1e3:>12.3f} {sk / co:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
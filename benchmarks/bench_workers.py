@@ -0,0 +1,141 @@
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+API = ROOT / "api"
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(API))
+
+from benchmarks.loadtest.runner import process_tree
+from prefork import memory_mb
+from shared_models import is_current
+
+GROUPS = "risk,los,segment,similar,associations"
+REQUESTS = {
+    "/risk": [60, 1, 0, 0, 13, 9, 250, 110, 30, 1.0],
+    "/los": [30, 9, 250, 13, 110, 60, 1.0] + [0] * 15,
+    "/segment": [60, 13, 9, 250, 110, 1.0, 30],
+    "/similar": [60, 13, 9, 250, 110, 1.0, 30],
+}
+
+# name: (command, extra environment)
+MODES = {
+    "uvicorn --workers": (["-m", "uvicorn", "main:app", "--log-level", "warning"], {}),
+    "prefork": (["prefork.py"], {"HEALTHAI_MMAP_MODELS": "0"}),
+    "prefork + mmap": (["prefork.py"], {"HEALTHAI_MMAP_MODELS": "1"}),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Server processes, without multiprocessing's resource tracker
+def server_pids(pid):
+    pids = []
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/cmdline", "rb") as f:
+                if b"resource_tracker" in f.read():
+                    continue
+        except OSError:
+            continue
+        pids.append(p)
+    return pids
+
+
+# Starts a server, waits until every worker has answered (new connection
+# per request, so the kernel spreads them), then measures the process tree
+def measure(mode, workers, timeout=300):
+    command, env = MODES[mode]
+    port = free_port()
+    log = tempfile.TemporaryFile()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, *command, "--port", str(port), "--workers", str(workers)],
+        cwd=API, stdout=log, stderr=subprocess.STDOUT,
+        env={**os.environ, "HEALTHAI_ENABLED_MODELS": GROUPS, **env},
+    )
+
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None or time.monotonic() > deadline:
+                log.seek(0)
+                raise RuntimeError(f"{mode} did not start:\n{log.read().decode()[-2000:]}")
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/models")
+                break
+            except httpx.TransportError:
+                time.sleep(0.2)
+        first_response = time.perf_counter() - start
+
+        # Workers are the supervisor's children once all are up (a single
+        # uvicorn worker runs in the main process)
+        expected = 1 if workers == 1 and "uvicorn" in mode else workers + 1
+        while len(server_pids(process.pid)) < expected and time.monotonic() < deadline:
+            time.sleep(0.2)
+        for _ in range(20 * workers):
+            for path, features in REQUESTS.items():
+                httpx.post(f"http://127.0.0.1:{port}{path}", json={"features": features},
+                           headers={"Connection": "close"}).raise_for_status()
+
+        pids = server_pids(process.pid)
+        supervisor = memory_mb(pids[0]) if len(pids) > 1 else {"pss": 0.0}
+        children = [memory_mb(pid) for pid in pids[1:] or pids]
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+    log.seek(0)
+    spawns = [float(s) for s in re.findall(rb"ready in ([\d.]+) s", log.read())]
+    return {
+        "first_response_s": first_response,
+        "worker_spawn_s": sum(spawns) / len(spawns) if spawns else None,
+        "total_pss_mb": supervisor["pss"] + sum(m["pss"] for m in children),
+        "worker_uss_mb": sum(m["uss"] for m in children) / len(children),
+        "worker_rss_mb": sum(m["rss"] for m in children) / len(children),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and spawn time per additional worker")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--modes", default=",".join(MODES))
+    args = parser.parse_args()
+
+    from loaders import registry
+    if not is_current(registry.source_path("risk_model")):
+        raise SystemExit("no current shared artifacts; run: python api/shared_models.py export")
+
+    print(f"{'mode':<18} {'workers':>7} {'ready s':>8} {'spawn s':>8} {'total PSS':>10} "
+          f"{'per +worker':>11} {'worker USS':>10} {'worker RSS':>10}")
+    for mode in args.modes.split(","):
+        baseline = None
+        for workers in map(int, args.workers.split(",")):
+            m = measure(mode, workers)
+            if baseline is None:
+                baseline = (workers, m["total_pss_mb"])
+            marginal = (
+                (m["total_pss_mb"] - baseline[1]) / (workers - baseline[0])
+                if workers > baseline[0] else float("nan")
+            )
+            spawn = f"{m['worker_spawn_s']:.2f}" if m["worker_spawn_s"] is not None else "-"
+            print(f"{mode:<18} {workers:>7} {m['first_response_s']:>8.2f} {spawn:>8} "
+                  f"{m['total_pss_mb']:>10.1f} {marginal:>11.1f} {m['worker_uss_mb']:>10.1f} "
+                  f"{m['worker_rss_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+TEST_DATASET = ROOT / "data" / "time_seris" / "test_dataset"
+
+
+# Synthetic Patients
+# Every simulated patient replays one of the four test trajectories
+# (cycled past its end) with a little per-patient noise.
+def load_trajectories():
+    return [
+        pd.read_excel(path).values.astype(np.float64)
+        for path in sorted(TEST_DATASET.glob("*.xlsx"))
+    ]
+
+
+def make_ticks(trajectories, n_patients, n_ticks, seed=42):
+    rng = np.random.default_rng(seed)
+    patients = []
+    for p in range(n_patients):
+        base = trajectories[p % len(trajectories)]
+        rows = base[np.arange(n_ticks) % len(base)]
+        noise = rng.normal(0, 0.01, rows.shape) * np.abs(rows)
+        patients.append((f"patient-{p}", (rows + noise).tolist()))
+    return patients
+
+
+# In-process Load (measures the ingestion engine itself)
+async def run_in_process(patients, n_ticks):
+    from ingestion import VitalsIngestor
+    from loaders import registry
+
+    registry.preload(["sequence"], warmup=False)
+    ingestor = VitalsIngestor(max_patients=len(patients))
+
+    start = time.perf_counter()
+    for t in range(n_ticks):
+        ingestor.push([(pid, rows[t]) for pid, rows in patients])
+        await ingestor.process_pending()
+    elapsed = time.perf_counter() - start
+
+    return ingestor.stats(), elapsed
+
+
+# HTTP Load (pushes to a running API)
+def run_http(patients, n_ticks, url):
+    import requests
+
+    start = time.perf_counter()
+    for t in range(n_ticks):
+        readings = [{"patient_id": pid, "values": rows[t]} for pid, rows in patients]
+        requests.post(f"{url}/ingest/vitals", json={"readings": readings}, timeout=60).raise_for_status()
+
+    while requests.get(f"{url}/ingest/stats", timeout=10).json()["pending_rows"]:
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    return requests.get(f"{url}/ingest/stats", timeout=10).json(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vitals ingestion load generator")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=48)
+    parser.add_argument("--url", help="push to a running API instead of in-process")
+    args = parser.parse_args()
+
+    patients = make_ticks(load_trajectories(), args.patients, args.ticks)
+
+    if args.url:
+        stats, elapsed = run_http(patients, args.ticks, args.url)
+    else:
+        stats, elapsed = asyncio.run(run_in_process(patients, args.ticks))
+
+    total = args.patients * args.ticks
+    print(f"patients        : {args.patients}")
+    print(f"ticks           : {args.ticks}")
+    print(f"patient-ticks   : {total}")
+    print(f"elapsed (s)     : {elapsed:.3f}")
+    print(f"patient-ticks/s : {total / elapsed:,.0f}")
+    print(f"alerts          : {stats['alerts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# End-to-end load tests for api/main.py: python -m benchmarks.loadtest --help
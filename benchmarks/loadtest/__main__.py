@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from . import report
+from .payloads import GROUPS, SCENARIOS
+from .runner import InProcessTarget, UvicornTarget, run_level, warm_up
+
+RESULTS = report.ROOT / "benchmarks" / "results"
+
+
+# python -m benchmarks.loadtest [--target asgi|uvicorn] [--endpoints risk,los]
+#     [--concurrency 1,4,16] [--baseline results/<previous>.json]
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end load test of the inference API")
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--endpoints", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    parser.add_argument("--warmup", type=int, default=20, help="requests before measuring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true",
+                        help="keep the result cache on (repeated payloads then measure the cache)")
+    parser.add_argument("--output", help=f"results JSON (default {RESULTS}/<target>-<commit>.json)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--thresholds", default=str(report.THRESHOLDS))
+    args = parser.parse_args()
+
+    args.endpoints = args.endpoints.split(",")
+    unknown = set(args.endpoints) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown endpoints {sorted(unknown)}; expected any of {list(SCENARIOS)}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    return args
+
+
+# Only the models the selected endpoints need are loaded
+def server_env(args):
+    groups = sorted({group for name in args.endpoints for group in GROUPS[name]})
+    return {
+        "HEALTHAI_ENABLED_MODELS": ",".join(groups),
+        "HEALTHAI_CACHE_ENABLED": "1" if args.cache else "0",
+        "TF_CPP_MIN_LOG_LEVEL": "3",
+    }
+
+
+async def run(args):
+    scenarios = {name: SCENARIOS[name]() for name in args.endpoints}
+    env = server_env(args)
+    target = InProcessTarget(env) if args.target == "asgi" else UvicornTarget(env, args.workers)
+
+    results = {"run": report.run_info(args), "endpoints": {}}
+    async with target:
+        for name, make in scenarios.items():
+            await warm_up(target, make, args.warmup, args.seed)
+            levels = results["endpoints"][name] = {}
+            for concurrency in args.concurrency:
+                levels[str(concurrency)] = await run_level(
+                    target, make, concurrency, args.duration, args.seed
+                )
+                m = levels[str(concurrency)]
+                print(f"  {name} x{concurrency}: {m['rps']:.1f} req/s, p99 {m['p99_ms']:.1f} ms",
+                      file=sys.stderr)
+    return results
+
+
+def main():
+    args = parse_args()
+    cwd = os.getcwd()
+    results = asyncio.run(run(args))
+    os.chdir(cwd)
+
+    report.print_table(results)
+    output = args.output or RESULTS / f"{args.target}-{results['run']['commit'] or 'local'}.json"
+    print(f"\nresults -> {report.save(results, output)}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        failures = report.compare(results, baseline, report.load_thresholds(args.thresholds))
+        if failures:
+            print(f"\n{len(failures)} regressions against {args.baseline}:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print(f"\nno regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "api"))
+
+from features import LOS_FEATURES, RISK_FEATURES, SEGMENT_FEATURES
+
+DATA = ROOT / "data"
+CLEANED = DATA / "cleaned_data.csv"
+REVIEWS = DATA / "hospital_reviews"
+TEST_DATASET = DATA / "time_seris" / "test_dataset"
+CONDITIONS = [
+    "diabetes_mellitus", "hypertension", "coronary_artery_disease",
+    "prior_cardiomyopathy", "chronic_kidney_disease",
+]
+
+# Endpoint -> model groups it needs loaded
+GROUPS = {
+    "risk": ["risk"],
+    "los": ["los"],
+    "segment": ["segment"],
+    "risk_batch": ["risk"],
+    "sequence": ["sequence"],
+    "sentiment": ["sentiment"],
+    "image": ["image"],
+    "similar": ["similar"],
+    "associations": ["associations"],
+}
+
+
+def cleaned_frame():
+    df = pd.read_csv(CLEANED)
+    df["gender"] = df["gender"].map({"M": 1, "F": 0})
+    df["admission_type"] = df["admission_type"].map({"E": 1, "O": 0})
+    df["residence_type"] = df["residence_type"].map({"R": 1, "U": 0})
+    return df
+
+
+# Request Generators
+# Each returns make(rng) -> (method, path, httpx request kwargs). Inputs
+# are jittered so the result cache (if enabled) does not hide model cost.
+def _rows(df, columns, jitter=True):
+    rows = df[columns].to_numpy(dtype=np.float64)
+
+    def sample(rng, n=None):
+        picked = rows[rng.integers(len(rows), size=n or 1)]
+        if jitter:
+            picked = picked * rng.uniform(0.98, 1.02, picked.shape)
+        return picked if n else picked[0]
+    return sample
+
+
+def tabular(path, columns):
+    def factory():
+        sample = _rows(cleaned_frame(), columns)
+        return lambda rng: ("POST", path, {"json": {"features": sample(rng).tolist()}})
+    return factory
+
+
+def risk_batch(size=64):
+    def factory():
+        sample = _rows(cleaned_frame(), RISK_FEATURES)
+        return lambda rng: ("POST", "/risk/batch", {"json": {"rows": sample(rng, size).tolist()}})
+    return factory
+
+
+def sequence(steps=48):
+    def factory():
+        trajectories = [
+            pd.read_excel(path).to_numpy(dtype=np.float64)
+            for path in sorted(TEST_DATASET.glob("*.xlsx"))
+        ]
+
+        def make(rng):
+            base = trajectories[rng.integers(len(trajectories))]
+            start = rng.integers(len(base))
+            window = base[(start + np.arange(steps)) % len(base)]
+            window = window * rng.uniform(0.99, 1.01, window.shape)
+            return "POST", "/sequence", {"json": {"sequence": window.tolist()}}
+        return make
+    return factory
+
+
+def sentiment():
+    texts = {}
+    for path in sorted(REVIEWS.glob("*.csv")):
+        frame = pd.read_csv(path)
+        column = next(c for c in frame.columns if c.lower() == "feedback")
+        texts.update(dict.fromkeys(frame[column].dropna().astype(str)))
+    texts = list(texts)
+
+    def make(rng):
+        text = f"{texts[rng.integers(len(texts))]} #{rng.integers(1_000_000)}"
+        return "POST", "/sentiment", {"json": {"text": text}}
+    return make
+
+
+def image(size=512, variants=8):
+    def factory():
+        import cv2
+
+        rng = np.random.default_rng(0)
+        scans = []
+        for _ in range(variants):
+            noise = rng.integers(0, 256, (size, size), dtype=np.uint8)
+            scan = cv2.GaussianBlur(noise, (0, 0), rng.uniform(2, 12))
+            scans.append(cv2.imencode(".jpg", cv2.cvtColor(scan, cv2.COLOR_GRAY2BGR))[1].tobytes())
+
+        def make(rng):
+            # A random trailing byte keeps the content hash unique
+            data = scans[rng.integers(len(scans))] + bytes([rng.integers(256)])
+            return "POST", "/image", {"files": {"file": ("scan.jpg", data, "image/jpeg")}}
+        return make
+    return factory
+
+
+def associations():
+    df = pd.read_csv(CLEANED)
+
+    def make(rng):
+        row = df.iloc[rng.integers(len(df))]
+        body = {
+            "conditions": [name for name in CONDITIONS if row[name]],
+            "measurements": {
+                "age": float(row["age"]), "gender": row["gender"],
+                "glucose_level": float(row["glucose_level"]),
+                "creatinine_level": float(row["creatinine_level"]),
+                "urea_level": float(row["urea_level"]),
+                "hemoglobin": float(row["hemoglobin"]),
+            },
+        }
+        return "POST", "/associations", {"json": body}
+    return make
+
+
+def similar(k=10):
+    def factory():
+        sample = _rows(cleaned_frame(), SEGMENT_FEATURES)
+        return lambda rng: ("POST", f"/similar?k={k}", {"json": {"features": sample(rng).tolist()}})
+    return factory
+
+
+SCENARIOS = {
+    "risk": tabular("/risk", RISK_FEATURES),
+    "los": tabular("/los", LOS_FEATURES),
+    "segment": tabular("/segment", SEGMENT_FEATURES),
+    "risk_batch": risk_batch(),
+    "sequence": sequence(),
+    "sentiment": sentiment,
+    "image": image(),
+    "similar": similar(),
+    "associations": associations,
+}
@@ -0,0 +1,91 @@
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+THRESHOLDS = Path(__file__).with_name("thresholds.json")
+
+# Metrics where a larger value is a regression (rps is the exception)
+LOWER_IS_BETTER = ["p50_ms", "p95_ms", "p99_ms", "cpu_seconds", "peak_rss_mb"]
+HIGHER_IS_BETTER = ["rps"]
+
+
+def run_info(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "target": args.target,
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+    }
+
+
+def save(results, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def print_table(results):
+    print(f"{'endpoint':<13} {'conc':>4} {'ok':>6} {'err%':>5} {'req/s':>8} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'cpu%':>6} {'peak MB':>8}")
+    for endpoint, levels in results["endpoints"].items():
+        for level, m in levels.items():
+            print(f"{endpoint:<13} {level:>4} {m['ok']:>6} {m['error_rate'] * 100:>5.1f} "
+                  f"{m['rps']:>8.1f} {m['p50_ms']:>8.1f} {m['p95_ms']:>8.1f} {m['p99_ms']:>8.1f} "
+                  f"{m['cpu_percent']:>6.0f} {m['peak_rss_mb']:>8.0f}")
+
+
+# Regression Check
+# thresholds.json gives the allowed relative worsening per metric against
+# the baseline run, an absolute error-rate ceiling, and a latency slack in
+# ms below which differences are treated as noise. Per-endpoint overrides
+# go under "endpoints": {"image": {"p99_ms": 0.5}}.
+def load_thresholds(path=THRESHOLDS):
+    return json.loads(Path(path).read_text())
+
+
+def compare(results, baseline, thresholds):
+    failures = []
+    slack = thresholds.get("min_ms_delta", 0.0)
+
+    for endpoint, levels in results["endpoints"].items():
+        limits = {**thresholds.get("relative", {}), **thresholds.get("endpoints", {}).get(endpoint, {})}
+        for level, current in levels.items():
+            if current["error_rate"] > thresholds.get("max_error_rate", 0.0):
+                failures.append(f"{endpoint}@{level}: error rate {current['error_rate']:.2%}")
+
+            previous = baseline.get("endpoints", {}).get(endpoint, {}).get(level)
+            if previous is None:
+                continue
+
+            for metric, allowed in limits.items():
+                new, old = current.get(metric), previous.get(metric)
+                if new is None or old is None or math.isnan(new) or math.isnan(old) or old == 0:
+                    continue
+                if metric in HIGHER_IS_BETTER:
+                    change = (old - new) / old
+                else:
+                    change = (new - old) / old
+                    if metric.endswith("_ms") and new - old < slack:
+                        continue
+                if change > allowed:
+                    failures.append(
+                        f"{endpoint}@{level}: {metric} {old:.2f} -> {new:.2f} "
+                        f"({change:+.0%} worse, limit {allowed:.0%})"
+                    )
+    return failures
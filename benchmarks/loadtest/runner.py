@@ -0,0 +1,188 @@
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+API = ROOT / "api"
+
+
+# Process Metrics (from /proc, so they cover a uvicorn server and its
+# worker processes too)
+def process_tree(pid):
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    except OSError:
+        pass
+    return pids
+
+
+def cpu_seconds(pid=None):
+    if pid is None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        total += int(fields[11]) + int(fields[12])
+    return total / os.sysconf("SC_CLK_TCK")
+
+
+# Summed over processes: the high-water marks of workers that share pages
+# with the supervisor overstate the total somewhat
+def peak_rss_mb(pid=None):
+    if pid is None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+        except (OSError, StopIteration):
+            continue
+    return total / 1024
+
+
+# Targets
+# In-process: httpx over the ASGI app, with the app's startup/shutdown
+# handlers run through its lifespan. CPU and RSS then include the load
+# generator. Uvicorn: a child server on a free local port.
+class InProcessTarget:
+    name = "asgi"
+    pid = None
+
+    def __init__(self, env):
+        self.env = env
+
+    async def __aenter__(self):
+        import httpx
+
+        os.environ.update(self.env)
+        sys.path.insert(0, str(API))
+        os.chdir(API)
+        import main
+
+        self.lifespan = main.app.router.lifespan_context(main.app)
+        await self.lifespan.__aenter__()
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app), base_url="http://loadtest", timeout=120
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        await self.lifespan.__aexit__(*exc)
+
+
+class UvicornTarget:
+    name = "uvicorn"
+
+    def __init__(self, env, workers=1, startup_timeout=300):
+        self.env = env
+        self.workers = workers
+        self.startup_timeout = startup_timeout
+
+    async def __aenter__(self):
+        import httpx
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+             "--workers", str(self.workers), "--log-level", "warning"],
+            cwd=API, env={**os.environ, **self.env},
+        )
+        self.pid = self.process.pid
+        self.client = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=120,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=None),
+        )
+
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {self.process.returncode}")
+            try:
+                await self.client.get("/models")
+                return self
+            except httpx.TransportError:
+                await asyncio.sleep(0.5)
+        raise TimeoutError("uvicorn did not start")
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+# Closed-loop Load
+# `concurrency` clients each send their next request as soon as the
+# previous one completes, for `duration` seconds.
+async def run_level(target, make, concurrency, duration, seed=0):
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + duration
+
+    async def client(rng):
+        while time.perf_counter() < deadline:
+            method, path, kwargs = make(rng)
+            start = time.perf_counter()
+            try:
+                response = await target.client.request(method, path, **kwargs)
+                status = response.status_code
+            except Exception as exc:
+                status = type(exc).__name__
+            elapsed = time.perf_counter() - start
+
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    cpu_before = cpu_seconds(target.pid)
+    wall = time.perf_counter()
+    await asyncio.gather(*(
+        client(np.random.default_rng([seed, i])) for i in range(concurrency)
+    ))
+    wall = time.perf_counter() - wall
+    cpu = cpu_seconds(target.pid) - cpu_before
+
+    ms = np.array(latencies) * 1e3
+    total = sum(statuses.values())
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (np.nan,) * 3
+    return {
+        "requests": total,
+        "ok": len(latencies),
+        "error_rate": 1 - len(latencies) / total if total else 1.0,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "rps": len(latencies) / wall,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()) if len(ms) else float("nan"),
+        "cpu_seconds": cpu,
+        "cpu_percent": 100 * cpu / wall,
+        "peak_rss_mb": peak_rss_mb(target.pid),
+    }
+
+
+async def warm_up(target, make, requests, seed=0):
+    rng = np.random.default_rng([seed, 999])
+    for _ in range(requests):
+        method, path, kwargs = make(rng)
+        await target.client.request(method, path, **kwargs)
@@ -0,0 +1,121 @@
+import argparse
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "api"))
+
+from features import RISK_FEATURES
+
+CLEANED = ROOT / "data" / "cleaned_data.csv"
+REVIEWS = ROOT / "data" / "hospital_reviews" / "hospital_reviews.csv"
+
+
+# Request Generators
+# Inputs are drawn at random so the result cache does not hide model cost.
+def tabular_requests(rng):
+    df = pd.read_csv(CLEANED)
+    df["gender"] = df["gender"].map({"M": 1, "F": 0})
+    rows = df[RISK_FEATURES].values.astype(float)
+
+    def make():
+        row = rows[rng.integers(len(rows))] * rng.uniform(0.95, 1.05)
+        return "post", "/risk", {"json": {"features": row.tolist()}}
+    return make
+
+
+def image_requests(rng, size):
+    import cv2
+
+    images = []
+    for _ in range(4):
+        noise = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+        images.append(cv2.imencode(".jpg", noise)[1].tobytes())
+
+    def make():
+        img = images[rng.integers(len(images))]
+        # A random trailing byte keeps the content hash unique
+        data = img + bytes([rng.integers(256)])
+        return "post", "/image", {"files": {"file": ("scan.jpg", data, "image/jpeg")}}
+    return make
+
+
+def sentiment_requests(rng):
+    texts = pd.read_csv(REVIEWS)["Feedback"].astype(str).tolist()
+
+    def make():
+        text = f"{texts[rng.integers(len(texts))]} #{rng.integers(1_000_000)}"
+        return "post", "/sentiment", {"json": {"text": text}}
+    return make
+
+
+# Load Loop
+def client(url, make, deadline, latencies, statuses, lock):
+    import requests
+
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        method, path, kwargs = make()
+        start = time.perf_counter()
+        try:
+            status = session.request(method, url + path, timeout=60, **kwargs).status_code
+        except requests.RequestException:
+            status = "error"
+        elapsed = time.perf_counter() - start
+
+        with lock:
+            statuses[path][status] += 1
+            if status == 200:
+                latencies[path].append(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail latency under mixed traffic")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--tabular-clients", type=int, default=8)
+    parser.add_argument("--image-clients", type=int, default=2)
+    parser.add_argument("--sentiment-clients", type=int, default=4)
+    parser.add_argument("--image-size", type=int, default=2048, help="side of the uploaded JPEGs")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    makers = (
+        [tabular_requests(rng)] * args.tabular_clients
+        + [image_requests(rng, args.image_size)] * args.image_clients
+        + [sentiment_requests(rng)] * args.sentiment_clients
+    )
+
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    threads = [
+        threading.Thread(target=client, args=(args.url, make, deadline, latencies, statuses, lock))
+        for make in makers
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"{'endpoint':<12} {'ok':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'503':>6}")
+    for path in sorted(statuses):
+        ms = np.array(latencies[path]) * 1e3 if latencies[path] else np.zeros(1)
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        print(f"{path:<12} {len(latencies[path]):>7} {len(latencies[path]) / args.duration:>8.1f} "
+              f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {ms.max():>8.1f} {statuses[path][503]:>6}")
+        others = {k: v for k, v in statuses[path].items() if k not in (200, 503)}
+        if others:
+            print(f"{'':<12} other statuses: {others}")
+
+
+if __name__ == "__main__":
+    main()
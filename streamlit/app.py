@@ -502,17 +502,24 @@ if menu == "Sequence Modeling":
         start_btn = st.button("Start Monitoring")
 
         if start_btn:
-            history = []
             monitor_box = st.empty()
 
+            # Open a monitoring session; the API keeps the patient's history
+            session = requests.post(
+                f"{API_BASE_URL}/sequence/sessions",
+                timeout=10
+            )
+            if session.status_code != 200:
+                st.error(f"API Error: {session.status_code}")
+                st.stop()
+            session_id = session.json()["session_id"]
+
             with st.spinner("Monitoring patient in real time..."):
                 for i in range(len(df)):
-                    history.append(df.iloc[i].values.tolist())
-
-                    payload = {"sequence": history}
+                    payload = {"values": df.iloc[i].values.tolist()}
 
                     response = requests.post(
-                        f"{API_BASE_URL}/sequence",
+                        f"{API_BASE_URL}/sequence/sessions/{session_id}",
                         json=payload,
                         timeout=10
                     )
@@ -582,6 +589,10 @@ if menu == "Sequence Modeling":
                                         st.success(f"""**Risk Probability :** **{round(prediction, 2)}**""")
                     time.sleep(interval)
 
+            requests.delete(
+                f"{API_BASE_URL}/sequence/sessions/{session_id}",
+                timeout=10
+            )
             st.info("Patient monitoring completed.")
 
 # 7. Sentiment Analysis
@@ -684,21 +695,45 @@ if menu == "Sentiment Analysis":
                         sentiments = []
                         confidences = []
 
-                        with st.spinner("Analyzing feedback sentiments..."):
-                            for text in df["text"]:
-                                response = requests.post(
-                                    f"{API_BASE_URL}/sentiment",
-                                    json={"text": str(text)},
-                                    timeout=10
+                        # Submitted as a background job; the page polls its
+                        # progress instead of holding one long request open
+                        response = requests.post(
+                            f"{API_BASE_URL}/jobs",
+                            data={"kind": "sentiment"},
+                            files={
+                                "file": (
+                                    uploaded_file.name,
+                                    uploaded_file.getvalue(),
+                                    uploaded_file.type
                                 )
+                            },
+                            timeout=30
+                        )
 
-                                if response.status_code == 200:
-                                    res = response.json()
-                                    sentiments.append(res["label"])
-                                    confidences.append(round(res["probability"], 3))
-                                else:
-                                    sentiments.append("Error")
-                                    confidences.append(None)
+                        job = response.json() if response.status_code == 202 else None
+                        progress = st.progress(0.0, text="Analyzing feedback sentiments...")
+                        while job is not None and job["status"] in ("queued", "running"):
+                            time.sleep(1)
+                            job = requests.get(f"{API_BASE_URL}/jobs/{job['job_id']}", timeout=10).json()
+                            rate = job["throughput"]["rows_per_second"]
+                            progress.progress(
+                                min(job["rows_done"] / len(df), 1.0),
+                                text=f"{job['rows_done']} of {len(df)} reviews scored"
+                                + (f" ({rate:,.0f}/s)" if rate else "")
+                            )
+                        progress.empty()
+
+                        if job is not None and job["status"] == "done":
+                            results = requests.get(
+                                f"{API_BASE_URL}/jobs/{job['job_id']}/results", timeout=60
+                            )
+                            for line in results.text.splitlines():
+                                res = json.loads(line)
+                                sentiments.append(res["label"])
+                                confidences.append(round(res["probability"], 3))
+                        else:
+                            sentiments = ["Error"] * len(df)
+                            confidences = [None] * len(df)
 
                         df["sentiment"] = sentiments
                         df["confidence"] = confidences